@@ -8,7 +8,7 @@ from sqlalchemy.ext.asyncio import async_engine_from_config
 from alembic import context
 
 # Import models so Alembic can detect them
-from app.models.lead import Lead, Sale  # noqa: F401
+import app.models  # noqa: F401
 from app.db.database import Base
 from app.config import settings
 
@@ -0,0 +1,31 @@
+"""leads pagination indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keyset-пагінація: (created_at, id) і найчастіші фільтри перед ним.
+    # Фільтри по business_domain і ai_score відсікаються по тому ж індексу.
+    op.create_index("ix_leads_created_at_id", "leads", ["created_at", "id"])
+    op.create_index("ix_leads_stage_created_at_id", "leads", ["stage", "created_at", "id"])
+    op.create_index("ix_leads_source_created_at_id", "leads", ["source", "created_at", "id"])
+    op.create_index("ix_leads_ai_analyzed_at", "leads", ["ai_analyzed_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_leads_ai_analyzed_at", table_name="leads")
+    op.drop_index("ix_leads_source_created_at_id", table_name="leads")
+    op.drop_index("ix_leads_stage_created_at_id", table_name="leads")
+    op.drop_index("ix_leads_created_at_id", table_name="leads")
@@ -0,0 +1,56 @@
+"""analysis input fingerprints and stale-analysis index
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Копія app.models.lead.INPUT_FINGERPRINT_SQL на момент міграції
+INPUT_FINGERPRINT_SQL = (
+    "md5("
+    "(CASE source WHEN 'scanner' THEN 'scanner' WHEN 'partner' THEN 'partner' "
+    "WHEN 'manual' THEN 'manual' END) || '|' || "
+    "(CASE stage WHEN 'new' THEN 'new' WHEN 'contacted' THEN 'contacted' "
+    "WHEN 'qualified' THEN 'qualified' WHEN 'transferred' THEN 'transferred' "
+    "WHEN 'lost' THEN 'lost' END) || '|' || "
+    "messages_count::text || '|' || "
+    "(CASE WHEN business_domain IS NULL THEN '0' ELSE '1' END)"
+    ")"
+)
+
+
+def upgrade() -> None:
+    # STORED generated column переписує таблицю під ACCESS EXCLUSIVE — запускати у вікно
+    op.add_column(
+        "leads",
+        sa.Column("input_fingerprint", sa.String(32), sa.Computed(INPUT_FINGERPRINT_SQL, persisted=True)),
+    )
+    op.add_column("leads", sa.Column("ai_input_fingerprint", sa.String(32), nullable=True))
+    # Входи вже збережених оцінок невідомі — вважаємо їх актуальними,
+    # інакше перший прогін планувальника переоцінив би всю таблицю
+    op.execute(
+        "UPDATE leads SET ai_input_fingerprint = input_fingerprint WHERE ai_analyzed_at IS NOT NULL"
+    )
+    op.create_index(
+        "ix_leads_stale_analysis",
+        "leads",
+        ["ai_analyzed_at"],
+        # Передані ліди не переоцінюються — інакше вони осідали б в індексі назавжди
+        postgresql_where=sa.text("ai_input_fingerprint <> input_fingerprint AND stage <> 'transferred'"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_leads_stale_analysis", table_name="leads")
+    op.drop_column("leads", "ai_input_fingerprint")
+    op.drop_column("leads", "input_fingerprint")
@@ -0,0 +1,49 @@
+"""full-text search over ai_reason
+
+Revision ID: 0008
+Revises: 0007
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from alembic import op
+
+revision: str = "0008"
+down_revision: Union[str, None] = "0007"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Копія app.models.lead.REASON_SEARCH_SQL на момент міграції
+REASON_SEARCH_SQL = "to_tsvector('english'::regconfig, coalesce(ai_reason, ''))"
+
+
+def upgrade() -> None:
+    # STORED generated column переписує таблицю під ACCESS EXCLUSIVE — запускати у вікно
+    op.add_column(
+        "leads",
+        sa.Column("ai_reason_tsv", postgresql.TSVECTOR(), sa.Computed(REASON_SEARCH_SQL, persisted=True)),
+    )
+    # Індекс будується без блокування записів; CONCURRENTLY не можна в транзакції
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_leads_ai_reason_tsv",
+            "leads",
+            ["ai_reason_tsv"],
+            postgresql_using="gin",
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_leads_ai_reason_tsv",
+            table_name="leads",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+    op.drop_column("leads", "ai_reason_tsv")
@@ -0,0 +1,75 @@
+"""partitioned stage history
+
+Revision ID: 0009
+Revises: 0008
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from alembic import op
+
+revision: str = "0009"
+down_revision: Union[str, None] = "0008"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Партиції на поточний місяць і стільки наступних; далі їх створює воркер
+PARTITIONS_AHEAD = 3
+
+
+def _month_start(year: int, month: int) -> datetime:
+    year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+    return datetime(year, month, 1, tzinfo=timezone.utc)
+
+
+def upgrade() -> None:
+    op.add_column("leads", sa.Column("stage_changed_at", sa.DateTime(timezone=True), nullable=True))
+    op.add_column("sales", sa.Column("stage_changed_at", sa.DateTime(timezone=True), nullable=True))
+    # Стадії не повертаються назад, тож new означає «з моменту створення».
+    # Для решти момент входу невідомий — перший перехід піде без часу в стадії
+    op.execute("UPDATE leads SET stage_changed_at = created_at WHERE stage = 'new'")
+    op.execute("UPDATE sales SET stage_changed_at = created_at WHERE stage = 'new'")
+
+    op.create_table(
+        "stage_history",
+        sa.Column("id", sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column("changed_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("entity_type", sa.String(8), nullable=False),
+        sa.Column("entity_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("lead_id", postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column("from_stage", sa.String(16), nullable=True),
+        sa.Column("to_stage", sa.String(16), nullable=False),
+        sa.Column("from_entered_at", sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint("id", "changed_at"),
+        postgresql_partition_by="RANGE (changed_at)",
+    )
+    op.create_index(
+        "ix_stage_history_entity_type_changed_at",
+        "stage_history",
+        ["entity_type", "changed_at"],
+        postgresql_include=["from_stage", "to_stage", "from_entered_at"],
+    )
+    op.create_index(
+        "ix_stage_history_entity_id_changed_at", "stage_history", ["entity_id", "changed_at"]
+    )
+
+    now = datetime.now(timezone.utc)
+    for offset in range(PARTITIONS_AHEAD + 1):
+        start = _month_start(now.year, now.month + offset)
+        end = _month_start(start.year, start.month + 1)
+        op.execute(
+            f"CREATE TABLE stage_history_y{start.year}m{start.month:02d} PARTITION OF stage_history "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+    op.execute("CREATE TABLE stage_history_default PARTITION OF stage_history DEFAULT")
+
+
+def downgrade() -> None:
+    # Партиції видаляються разом з батьківською таблицею
+    op.drop_table("stage_history")
+    op.drop_column("sales", "stage_changed_at")
+    op.drop_column("leads", "stage_changed_at")
@@ -0,0 +1,44 @@
+"""pipeline stats counters
+
+Revision ID: 0010
+Revises: 0009
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0010"
+down_revision: Union[str, None] = "0009"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "pipeline_stats",
+        sa.Column("entity_type", sa.String(8), nullable=False),
+        sa.Column("stage", sa.String(16), nullable=False),
+        sa.Column("source", sa.String(16), nullable=False),
+        sa.Column("business_domain", sa.String(16), nullable=False),
+        sa.Column("shard", sa.SmallInteger(), nullable=False),
+        sa.Column("count", sa.BigInteger(), nullable=False),
+        sa.PrimaryKeyConstraint("entity_type", "stage", "source", "business_domain", "shard"),
+    )
+    # Початкові значення; далі — дельти з сервісу і звірка воркером
+    op.execute(
+        "INSERT INTO pipeline_stats "
+        "SELECT 'lead', stage::text, source::text, coalesce(business_domain::text, 'none'), 0, count(*) "
+        "FROM leads GROUP BY 2, 3, 4"
+    )
+    op.execute(
+        "INSERT INTO pipeline_stats "
+        "SELECT 'sale', s.stage::text, l.source::text, coalesce(l.business_domain::text, 'none'), 0, count(*) "
+        "FROM sales s JOIN leads l ON l.id = s.lead_id GROUP BY 2, 3, 4"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("pipeline_stats")
@@ -0,0 +1,103 @@
+"""archive tables for lost leads and closed sales
+
+Revision ID: 0011
+Revises: 0010
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from alembic import op
+
+revision: str = "0011"
+down_revision: Union[str, None] = "0010"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def _enum(*values, name):
+    # Типи вже створені міграцією 0001
+    return postgresql.ENUM(*values, name=name, create_type=False)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "leads_archive",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("source", _enum("scanner", "partner", "manual", name="leadsource"), nullable=False),
+        sa.Column(
+            "stage",
+            _enum("new", "contacted", "qualified", "transferred", "lost", name="coldstage"),
+            nullable=False,
+        ),
+        sa.Column("business_domain", _enum("first", "second", "third", name="businessdomain"), nullable=True),
+        sa.Column("messages_count", sa.Integer(), nullable=False),
+        sa.Column("stage_changed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("ai_score", sa.Float(), nullable=True),
+        sa.Column("ai_recommendation", sa.String(64), nullable=True),
+        sa.Column("ai_reason", sa.Text(), nullable=True),
+        sa.Column("ai_analyzed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("ai_input_fingerprint", sa.String(32), nullable=True),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("archived_at", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.create_table(
+        "sales_archive",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("lead_id", postgresql.UUID(as_uuid=True), nullable=False, unique=True),
+        sa.Column(
+            "stage",
+            _enum("new", "kyc", "agreement", "paid", "lost", name="salestage"),
+            nullable=False,
+        ),
+        sa.Column("stage_changed_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("version", sa.Integer(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("updated_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("archived_at", sa.DateTime(timezone=True), nullable=False),
+    )
+
+    # Часткові індекси кандидатів будуються без блокування записів у гарячі таблиці
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_leads_archive_candidates",
+            "leads",
+            ["updated_at"],
+            postgresql_where=sa.text("stage = 'lost'"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "ix_sales_archive_candidates",
+            "sales",
+            ["updated_at"],
+            postgresql_where=sa.text("stage IN ('paid', 'lost')"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+LEAD_COLUMNS = (
+    "id, source, stage, business_domain, messages_count, stage_changed_at, ai_score, "
+    "ai_recommendation, ai_reason, ai_analyzed_at, ai_input_fingerprint, version, "
+    "created_at, updated_at"
+)
+SALE_COLUMNS = "id, lead_id, stage, stage_changed_at, version, created_at, updated_at"
+
+
+def downgrade() -> None:
+    # Архівовані рядки повертаються в гарячі таблиці, щоб не загубитись разом з архівом
+    op.execute(f"INSERT INTO leads ({LEAD_COLUMNS}) SELECT {LEAD_COLUMNS} FROM leads_archive")
+    op.execute(f"INSERT INTO sales ({SALE_COLUMNS}) SELECT {SALE_COLUMNS} FROM sales_archive")
+    with op.get_context().autocommit_block():
+        for name, table in (
+            ("ix_sales_archive_candidates", "sales"),
+            ("ix_leads_archive_candidates", "leads"),
+        ):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+    op.drop_table("sales_archive")
+    op.drop_table("leads_archive")
@@ -0,0 +1,45 @@
+"""stale-analysis index without transferred leads
+
+Revision ID: 0012
+Revises: 0011
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0012"
+down_revision: Union[str, None] = "0011"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+OLD_WHERE = "ai_input_fingerprint <> input_fingerprint"
+NEW_WHERE = "ai_input_fingerprint <> input_fingerprint AND stage <> 'transferred'"
+
+
+def _rebuild(where: str) -> None:
+    # Індекс, створений 0006 до виправлення, містить передані ліди: будуємо
+    # новий поруч і підміняємо, без блокування записів у leads
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_leads_stale_analysis_new",
+            "leads",
+            ["ai_analyzed_at"],
+            postgresql_where=sa.text(where),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            "ix_leads_stale_analysis", table_name="leads", postgresql_concurrently=True, if_exists=True
+        )
+    op.execute("ALTER INDEX ix_leads_stale_analysis_new RENAME TO ix_leads_stale_analysis")
+
+
+def upgrade() -> None:
+    _rebuild(NEW_WHERE)
+
+
+def downgrade() -> None:
+    _rebuild(OLD_WHERE)
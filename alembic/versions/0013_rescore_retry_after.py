@@ -0,0 +1,48 @@
+"""retry time for failed re-analysis, stale-analysis index ordered by it
+
+Revision ID: 0013
+Revises: 0012
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0013"
+down_revision: Union[str, None] = "0012"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+STALE_WHERE = "ai_input_fingerprint <> input_fingerprint AND stage <> 'transferred'"
+# Копія app.models.lead.STALE_ANALYSIS_ORDER_SQL на момент міграції
+STALE_ORDER_SQL = "coalesce(ai_retry_after, ai_analyzed_at)"
+
+
+def _rebuild(expression) -> None:
+    # Новий індекс поруч зі старим і підміна — без блокування записів у leads
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_leads_stale_analysis_new",
+            "leads",
+            [expression],
+            postgresql_where=sa.text(STALE_WHERE),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.drop_index(
+            "ix_leads_stale_analysis", table_name="leads", postgresql_concurrently=True, if_exists=True
+        )
+    op.execute("ALTER INDEX ix_leads_stale_analysis_new RENAME TO ix_leads_stale_analysis")
+
+
+def upgrade() -> None:
+    # Nullable без default — тільки зміна каталогу, таблиця не переписується
+    op.add_column("leads", sa.Column("ai_retry_after", sa.DateTime(timezone=True), nullable=True))
+    _rebuild(sa.text(STALE_ORDER_SQL))
+
+
+def downgrade() -> None:
+    _rebuild("ai_analyzed_at")
+    op.drop_column("leads", "ai_retry_after")
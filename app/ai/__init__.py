@@ -1,3 +1,9 @@
-from app.ai.claude_service import analyze_lead
+from app.ai.admission import AIOverloadedError
+from app.ai.claude_service import (
+    analyze_lead, analysis_fingerprint, start_client, close_client, admission_stats, PROMPT_VERSION,
+)
 
-__all__ = ["analyze_lead"]
+__all__ = [
+    "analyze_lead", "analysis_fingerprint", "start_client", "close_client", "admission_stats",
+    "AIOverloadedError", "PROMPT_VERSION",
+]
@@ -0,0 +1,255 @@
+"""
+Контроль допуску викликів Claude: скільки запитів і як швидко пускати в API.
+
+Три обмеження, перевірені по черзі для кожного виклику:
+  - token bucket на API-ключ — темп запитів. Ліміти Anthropic рахуються на
+    ключ, тож і відро одне на ключ; його темп і залишок синхронізуються із
+    заголовками anthropic-ratelimit-requests-* (їх бачать усі процеси з тим
+    самим ключем, а не тільки цей);
+  - адаптивна паралельність (AIMD) — ліміт одночасних викликів зростає на
+    1/ліміт після кожної відповіді з запасом квоти і падає вдвічі на 429/529
+    або коли залишок квоти нижче AI_RATELIMIT_LOW_WATERMARK. Верхня межа —
+    AI_MAX_CONCURRENCY;
+  - черга очікування — не більше AI_ADMISSION_QUEUE_SIZE викликів чекають
+    своєї черги (FIFO), кожен не довше AI_ADMISSION_TIMEOUT_SECONDS.
+
+Повна черга або вичерпаний дедлайн — AIOverloadedError з оцінкою, коли
+повторити (API віддає 503 + Retry-After). Після 429 з retry-after допуск
+призупиняється до вказаного моменту для всіх викликів з цим ключем.
+
+Все синхронне між await-ами і живе в одному event loop — без блокувань.
+"""
+
+import asyncio
+import math
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from app import metrics
+
+# Відповіді, що означають «upstream перевантажений»: rate limit і overloaded_error
+OVERLOAD_STATUSES = {429, 529}
+
+# Квоти Anthropic — на хвилину
+QUOTA_WINDOW_SECONDS = 60.0
+
+# Не зменшувати ліміт частіше: пачка 429 з одного вікна — одна подія перевантаження
+DECREASE_COOLDOWN_SECONDS = 1.0
+
+
+class AIOverloadedError(Exception):
+    """Claude перевантажений або черга допуску повна; retry_after — через скільки секунд повторити."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class TokenBucket:
+    """Відро на rate токенів за секунду, місткістю burst."""
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        # До цього моменту (monotonic) токени не видаються — після 429 з retry-after
+        self.paused_until = 0.0
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self) -> float:
+        """Забирає токен і повертає 0 або повертає, скільки секунд чекати до наступного."""
+        now = time.monotonic()
+        if now < self.paused_until:
+            return self.paused_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate if self.rate > 0 else 1.0
+
+    def sync(self, limit: int | None, remaining: int | None, window_seconds: float) -> None:
+        """Підлаштовується під квоту з заголовків: limit за window_seconds, remaining лишилось."""
+        self._refill(time.monotonic())
+        if limit:
+            self.rate = limit / window_seconds
+            self.capacity = min(self.capacity, float(limit))
+        if remaining is not None:
+            # Квоту ділять усі процеси з цим ключем — довіряємо меншому
+            self.tokens = min(self.tokens, float(remaining))
+
+    def pause(self, seconds: float) -> None:
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+
+def _int_header(headers, name: str) -> int | None:
+    try:
+        return int(headers[name])
+    except (KeyError, ValueError):
+        return None
+
+
+def retry_after_seconds(headers, default: float = 1.0) -> float:
+    try:
+        return max(0.0, float(headers["retry-after"]))
+    except (KeyError, ValueError):
+        return default
+
+
+class AdmissionController:
+    def __init__(
+        self,
+        max_concurrency: int,
+        requests_per_minute: float,
+        burst: int,
+        queue_size: int,
+        queue_timeout: float,
+        low_watermark: float,
+    ):
+        self.max_concurrency = max_concurrency
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.requests_per_minute = requests_per_minute
+        self.burst = burst
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.low_watermark = low_watermark
+        self._buckets: dict[str, TokenBucket] = {}
+        self._queue: deque[object] = deque()
+        self._changed = asyncio.Event()
+        self._last_decrease = 0.0
+
+    def bucket(self, key: str) -> TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(self.requests_per_minute / QUOTA_WINDOW_SECONDS, self.burst)
+        return bucket
+
+    # ── Допуск ────────────────────────────────────────────────────────────────
+
+    def _notify(self) -> None:
+        # Будимо всіх, хто чекає; пройде тільки голова черги
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def _retry_after(self, bucket: TokenBucket) -> float:
+        """Оцінка, коли черга звільниться: пауза після 429 або час на видачу токенів усій черзі."""
+        paused = max(0.0, bucket.paused_until - time.monotonic())
+        drain = (len(self._queue) + 1) / bucket.rate if bucket.rate > 0 else self.queue_timeout
+        return max(paused, min(drain, 60.0), 1.0)
+
+    def _reject(self, reason: str, bucket: TokenBucket) -> AIOverloadedError:
+        metrics.ai_admission_rejections.labels(reason).inc()
+        return AIOverloadedError(f"AI analysis is overloaded ({reason})", self._retry_after(bucket))
+
+    async def acquire(self, key: str) -> None:
+        bucket = self.bucket(key)
+        if not self._queue and self.in_flight < int(self.limit) and bucket.take() == 0:
+            self.in_flight += 1
+            return
+        if len(self._queue) >= self.queue_size:
+            raise self._reject("queue_full", bucket)
+        started = time.monotonic()
+        deadline = started + self.queue_timeout
+        if bucket.paused_until > deadline:
+            # Claude попросив зачекати довше, ніж дозволено стояти в черзі
+            raise self._reject("paused", bucket)
+
+        ticket = object()
+        self._queue.append(ticket)
+        try:
+            while True:
+                wait = None
+                if self._queue[0] is ticket and self.in_flight < int(self.limit):
+                    wait = bucket.take()
+                    if wait == 0:
+                        self.in_flight += 1
+                        metrics.ai_admission_wait.observe(time.monotonic() - started)
+                        return
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or (wait is not None and wait > remaining):
+                    raise self._reject("timeout", bucket)
+                changed = self._changed
+                try:
+                    await asyncio.wait_for(changed.wait(), min(wait or remaining, remaining))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._queue.remove(ticket)
+            # Наступний у черзі міг стати головою
+            self._notify()
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._notify()
+
+    @asynccontextmanager
+    async def admit(self, key: str):
+        await self.acquire(key)
+        try:
+            yield
+        finally:
+            self.release()
+
+    # ── Зворотний зв'язок від API ─────────────────────────────────────────────
+
+    def observe(self, key: str, status_code: int, headers) -> None:
+        """Відповідь Claude (кожна спроба SDK, включно з повторами): підлаштувати темп і ліміт."""
+        bucket = self.bucket(key)
+        limit = _int_header(headers, "anthropic-ratelimit-requests-limit")
+        remaining = _int_header(headers, "anthropic-ratelimit-requests-remaining")
+        if limit or remaining is not None:
+            bucket.sync(limit, remaining, QUOTA_WINDOW_SECONDS)
+
+        if status_code in OVERLOAD_STATUSES:
+            bucket.pause(retry_after_seconds(headers))
+            self._decrease()
+        elif self._quota_left(headers) < self.low_watermark:
+            self._decrease()
+        elif status_code < 400:
+            self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+        metrics.ai_admission_limit.set(self.limit)
+        self._notify()
+
+    @staticmethod
+    def _quota_left(headers) -> float:
+        """Найменша частка квоти, що лишилась: запити або токени. 1.0 — заголовків немає."""
+        left = 1.0
+        for kind in ("requests", "tokens", "input-tokens", "output-tokens"):
+            limit = _int_header(headers, f"anthropic-ratelimit-{kind}-limit")
+            remaining = _int_header(headers, f"anthropic-ratelimit-{kind}-remaining")
+            if limit and remaining is not None:
+                left = min(left, remaining / limit)
+        return left
+
+    def _decrease(self) -> None:
+        now = time.monotonic()
+        if now - self._last_decrease < DECREASE_COOLDOWN_SECONDS:
+            return
+        self._last_decrease = now
+        self.limit = max(1.0, self.limit / 2)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "limit": round(self.limit, 2),
+            "in_flight": self.in_flight,
+            "queued": len(self._queue),
+            "buckets": {
+                # Ключ не показуємо — тільки його хвіст
+                f"...{key[-4:]}": {
+                    "rate_per_second": round(b.rate, 3),
+                    "tokens": round(b.tokens, 2),
+                    "paused_seconds": round(max(0.0, b.paused_until - now), 2),
+                }
+                for key, b in self._buckets.items()
+            },
+        }
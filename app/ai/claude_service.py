@@ -15,16 +15,37 @@ AI Service відповідає ТІЛЬКИ за взаємодію з Claude A
 Що AI не вирішує:
   - Чи передавати ліда в продажі
   - Зміну етапів — тільки рекомендує
+
+Клієнт один на процес: створюється при першому виклику (start_client) і
+тримає пул HTTP-з'єднань. SDK anthropic імпортується там же — процес, який
+не викликає Claude (API без /analyze, alembic, CLI), його не вантажить.
+Кожен виклик проходить контроль допуску (app.ai.admission): темп і
+паралельність підлаштовуються під заголовки rate limit кожної відповіді,
+а перевантаження (черга повна, 429/529 після повторів SDK) — AIOverloadedError.
 """
 
+from __future__ import annotations
+
+import hashlib
 import json
 import re
+import time
+from typing import TYPE_CHECKING
 
-import anthropic
-
+from app import metrics
+from app.ai.admission import (
+    OVERLOAD_STATUSES, AdmissionController, AIOverloadedError, retry_after_seconds,
+)
 from app.config import settings
 from app.schemas.lead import AIResult
 
+if TYPE_CHECKING:
+    import anthropic
+    import httpx
+
+# Змінювати при кожній зміні промптів — старі кешовані оцінки перестануть підходити
+PROMPT_VERSION = "1"
+
 _SYSTEM_PROMPT = """You are a CRM AI assistant that evaluates sales leads.
 Analyze the provided lead data and return a JSON object with exactly these fields:
 - score: float between 0.0 and 1.0 (probability of successful deal)
@@ -42,6 +63,83 @@ _USER_PROMPT_TEMPLATE = """Evaluate this lead:
 Return JSON with score, recommendation, reason."""
 
 
+_client: anthropic.AsyncAnthropic | None = None
+_admission: AdmissionController | None = None
+
+
+async def _count_retry(request: httpx.Request) -> None:
+    """SDK ставить номер повтору в заголовок кожного HTTP-запиту."""
+    if request.headers.get("x-stainless-retry-count", "0") != "0":
+        metrics.ai_retries.inc()
+
+
+async def _observe_response(response: httpx.Response) -> None:
+    """Кожна HTTP-відповідь, включно з повторами SDK, — зворотний зв'язок для допуску."""
+    if _admission is not None:
+        _admission.observe(settings.ANTHROPIC_API_KEY, response.status_code, response.headers)
+
+
+def start_client() -> anthropic.AsyncAnthropic:
+    """Створює спільний клієнт з пулом з'єднань. Повторний виклик нічого не робить."""
+    global _client, _admission
+    if _client is None:
+        if not settings.ANTHROPIC_API_KEY:
+            raise ValueError("ANTHROPIC_API_KEY is not configured")
+        import anthropic
+        import httpx
+
+        http_client = anthropic.DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=settings.AI_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.AI_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=settings.AI_KEEPALIVE_EXPIRY_SECONDS,
+            ),
+            event_hooks={"request": [_count_retry], "response": [_observe_response]},
+        )
+        _client = anthropic.AsyncAnthropic(
+            api_key=settings.ANTHROPIC_API_KEY,
+            base_url=settings.ANTHROPIC_BASE_URL,
+            timeout=settings.AI_TIMEOUT_SECONDS,
+            max_retries=settings.AI_MAX_RETRIES,
+            http_client=http_client,
+        )
+        _admission = AdmissionController(
+            max_concurrency=settings.AI_MAX_CONCURRENCY,
+            requests_per_minute=settings.AI_REQUESTS_PER_MINUTE,
+            burst=settings.AI_BURST,
+            queue_size=settings.AI_ADMISSION_QUEUE_SIZE,
+            queue_timeout=settings.AI_ADMISSION_TIMEOUT_SECONDS,
+            low_watermark=settings.AI_RATELIMIT_LOW_WATERMARK,
+        )
+    return _client
+
+
+async def close_client() -> None:
+    """Закриває пул з'єднань при зупинці застосунку."""
+    global _client, _admission
+    if _client is not None:
+        client, _client, _admission = _client, None, None
+        await client.close()
+
+
+def admission_stats() -> dict | None:
+    """Стан контролю допуску процесу; None — клієнт ще не створено."""
+    return _admission.stats() if _admission is not None else None
+
+
+def analysis_fingerprint(
+    source: str,
+    stage: str,
+    messages_count: int,
+    has_business_domain: bool,
+) -> str:
+    """Ключ кешу: вхідні дані аналізу + версія промпту + модель."""
+    raw = json.dumps(
+        [source, stage, messages_count, has_business_domain, PROMPT_VERSION, settings.AI_MODEL]
+    )
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
 async def analyze_lead(
     source: str,
     stage: str,
@@ -52,10 +150,8 @@ async def analyze_lead(
     Викликає Claude API і повертає структурований AIResult
     ValueError якщо API ключ не налаштований
     """
-    if not settings.ANTHROPIC_API_KEY:
-        raise ValueError("ANTHROPIC_API_KEY is not configured")
-
-    client = anthropic.AsyncAnthropic(api_key=settings.ANTHROPIC_API_KEY)
+    # Поза lifespan (скрипти, воркери) клієнт створюється при першому виклику
+    client = start_client()
 
     user_message = _USER_PROMPT_TEMPLATE.format(
         source=source,
@@ -64,23 +160,47 @@ async def analyze_lead(
         has_domain="yes" if has_business_domain else "no",
     )
 
-    message = await client.messages.create(
-        model="claude-opus-4-6",
-        max_tokens=256,
-        system=_SYSTEM_PROMPT,
-        messages=[{"role": "user", "content": user_message}],
-    )
-
-    raw_text = message.content[0].text.strip()
-
-    # Strip markdown code fences if present
-    raw_text = re.sub(r"^```(?:json)?\s*", "", raw_text)
-    raw_text = re.sub(r"\s*```$", "", raw_text)
-
-    data = json.loads(raw_text)
-
-    return AIResult(
-        score=float(data["score"]),
-        recommendation=str(data["recommendation"]),
-        reason=str(data["reason"]),
-    )
+    import anthropic  # уже завантажений start_client — тут тільки для типів винятків
+
+    async with _admission.admit(settings.ANTHROPIC_API_KEY):
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            message = await client.messages.create(
+                model=settings.AI_MODEL,
+                max_tokens=256,
+                system=_SYSTEM_PROMPT,
+                messages=[{"role": "user", "content": user_message}],
+            )
+            outcome = "ok"
+        except anthropic.APIStatusError as e:
+            # 429 / 529 лишились і після повторів SDK — це перевантаження, а не помилка сервісу
+            if e.status_code not in OVERLOAD_STATUSES:
+                raise
+            outcome = "overloaded"
+            raise AIOverloadedError(
+                f"Claude API is overloaded ({e.status_code})", retry_after_seconds(e.response.headers)
+            ) from e
+        finally:
+            metrics.ai_request_duration.labels(outcome).observe(time.perf_counter() - started)
+
+    metrics.ai_tokens.labels("input").inc(message.usage.input_tokens)
+    metrics.ai_tokens.labels("output").inc(message.usage.output_tokens)
+
+    try:
+        raw_text = message.content[0].text.strip()
+
+        # Strip markdown code fences if present
+        raw_text = re.sub(r"^```(?:json)?\s*", "", raw_text)
+        raw_text = re.sub(r"\s*```$", "", raw_text)
+
+        data = json.loads(raw_text)
+
+        return AIResult(
+            score=float(data["score"]),
+            recommendation=str(data["recommendation"]),
+            reason=str(data["reason"]),
+        )
+    except (IndexError, AttributeError, KeyError, TypeError, ValueError):
+        metrics.ai_parse_failures.inc()
+        raise
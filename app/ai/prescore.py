@@ -0,0 +1,199 @@
+"""
+Локальна попередня оцінка ліда — без мережі, за ті самі чотири ознаки,
+що йдуть у Claude (source, stage, messages_count, has_business_domain).
+
+Модель — логістична регресія з one-hot ознаками, навчена на історичних
+ai_score і фактичних результатах продажів (див. services.prescore_service).
+Оцінювання векторизоване: вся таблиця лідів — одне множення матриць.
+
+Як модель використовується (score_cache):
+  - оцінка поза смугою невизначеності [PRESCORE_BAND_LOW, PRESCORE_BAND_HIGH] —
+    результат локальний, Claude не викликається;
+  - всередині смуги — рішення за Claude;
+  - Claude недоступний — локальна оцінка як запасний варіант.
+"""
+
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Sequence
+
+import numpy as np
+
+from app.config import settings
+from app.models.lead import LeadSource, ColdStage
+from app.schemas.lead import AIResult
+
+logger = logging.getLogger(__name__)
+
+MODEL_FORMAT_VERSION = 1
+
+# Пороги рекомендацій — ті самі категорії, що повертає Claude
+TRANSFER_THRESHOLD = 0.6
+NURTURE_THRESHOLD = 0.3
+
+FEATURES = (
+    "bias",
+    *(f"source={s.value}" for s in LeadSource),
+    *(f"stage={s.value}" for s in ColdStage),
+    "has_business_domain",
+    "log_messages_count",
+)
+
+_SOURCE_INDEX = {s.value: 1 + i for i, s in enumerate(LeadSource)}
+_STAGE_INDEX = {s.value: 1 + len(LeadSource) + i for i, s in enumerate(ColdStage)}
+_DOMAIN_INDEX = len(FEATURES) - 2
+_MESSAGES_INDEX = len(FEATURES) - 1
+
+
+def encode(
+    sources: Sequence[str],
+    stages: Sequence[str],
+    messages_counts: Sequence[int],
+    has_business_domain: Sequence[bool],
+) -> np.ndarray:
+    """Входи → матриця ознак (n, len(FEATURES))."""
+    n = len(sources)
+    rows = np.arange(n)
+    x = np.zeros((n, len(FEATURES)))
+    x[:, 0] = 1.0
+    x[rows, [_SOURCE_INDEX[s] for s in sources]] = 1.0
+    x[rows, [_STAGE_INDEX[s] for s in stages]] = 1.0
+    x[:, _DOMAIN_INDEX] = np.asarray(has_business_domain, dtype=float)
+    x[:, _MESSAGES_INDEX] = np.log1p(np.asarray(messages_counts, dtype=float))
+    return x
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30.0, 30.0)))
+
+
+@dataclass
+class PrescoreModel:
+    weights: np.ndarray
+    fitted_at: str = ""
+    samples: int = 0
+    metrics: dict = field(default_factory=dict)
+
+    def score(
+        self,
+        sources: Sequence[str],
+        stages: Sequence[str],
+        messages_counts: Sequence[int],
+        has_business_domain: Sequence[bool],
+    ) -> np.ndarray:
+        """Оцінки 0..1 для масиву лідів."""
+        return _sigmoid(encode(sources, stages, messages_counts, has_business_domain) @ self.weights)
+
+    def score_one(
+        self, source: str, stage: str, messages_count: int, has_business_domain: bool
+    ) -> float:
+        return float(self.score([source], [stage], [messages_count], [has_business_domain])[0])
+
+    def to_dict(self) -> dict:
+        return {
+            "format_version": MODEL_FORMAT_VERSION,
+            "features": list(FEATURES),
+            "weights": [round(float(w), 8) for w in self.weights],
+            "fitted_at": self.fitted_at,
+            "samples": self.samples,
+            "metrics": self.metrics,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PrescoreModel":
+        if data.get("format_version") != MODEL_FORMAT_VERSION or data.get("features") != list(FEATURES):
+            raise ValueError("Pre-score model was fitted for a different feature set, refit it")
+        return cls(
+            weights=np.asarray(data["weights"], dtype=float),
+            fitted_at=data.get("fitted_at", ""),
+            samples=data.get("samples", 0),
+            metrics=data.get("metrics", {}),
+        )
+
+
+def fit(
+    x: np.ndarray,
+    targets: np.ndarray,
+    sample_weight: np.ndarray | None = None,
+    l2: float = 1.0,
+    max_iter: int = 50,
+    tol: float = 1e-8,
+) -> PrescoreModel:
+    """
+    Зважена логістична регресія з м'якими мітками (0..1) методом Ньютона (IRLS).
+    Детермінована: ті самі дані — ті самі ваги. L2 не штрафує bias.
+    """
+    n, d = x.shape
+    if n == 0:
+        raise ValueError("No training data for pre-score model")
+    sw = np.ones(n) if sample_weight is None else np.asarray(sample_weight, dtype=float)
+    penalty = np.full(d, l2)
+    penalty[0] = 0.0
+
+    w = np.zeros(d)
+    for _ in range(max_iter):
+        p = _sigmoid(x @ w)
+        gradient = x.T @ (sw * (p - targets)) + penalty * w
+        hessian = (x * (sw * p * (1.0 - p))[:, None]).T @ x + np.diag(penalty) + 1e-9 * np.eye(d)
+        step = np.linalg.solve(hessian, gradient)
+        w -= step
+        if np.max(np.abs(step)) < tol:
+            break
+
+    predicted = _sigmoid(x @ w)
+    return PrescoreModel(
+        weights=w,
+        fitted_at=datetime.now(timezone.utc).isoformat(),
+        samples=int(n),
+        metrics={"mae": round(float(np.average(np.abs(predicted - targets), weights=sw)), 4)},
+    )
+
+
+def to_result(score: float, reason: str) -> AIResult:
+    recommendation = (
+        "transfer_to_sales" if score >= TRANSFER_THRESHOLD
+        else "continue_nurturing" if score >= NURTURE_THRESHOLD
+        else "mark_as_lost"
+    )
+    return AIResult(score=round(score, 4), recommendation=recommendation, reason=reason)
+
+
+def is_confident(score: float) -> bool:
+    """Поза смугою невизначеності — Claude не потрібен."""
+    return not settings.PRESCORE_BAND_LOW <= score <= settings.PRESCORE_BAND_HIGH
+
+
+# ── Модель процесу ────────────────────────────────────────────────────────────
+
+_model: PrescoreModel | None = None
+_loaded = False
+
+
+def save_model(model: PrescoreModel, path: str) -> None:
+    Path(path).write_text(json.dumps(model.to_dict(), indent=2))
+
+
+def get_model() -> PrescoreModel | None:
+    """
+    Модель з PRESCORE_MODEL_PATH, завантажена один раз на процес.
+    None — попередня оцінка вимкнена (шлях не задано, файлу немає або він не підходить).
+    """
+    global _model, _loaded
+    if not _loaded:
+        _loaded = True
+        path = settings.PRESCORE_MODEL_PATH
+        if path and Path(path).exists():
+            try:
+                _model = PrescoreModel.from_dict(json.loads(Path(path).read_text()))
+            except (ValueError, KeyError) as e:
+                logger.warning("Pre-score model %s ignored: %s", path, e)
+    return _model
+
+
+def reset_model() -> None:
+    """Перечитати файл моделі при наступному get_model (після повторного навчання)."""
+    global _model, _loaded
+    _model, _loaded = None, False
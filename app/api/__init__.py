@@ -1,4 +1,12 @@
 from app.api.leads import router as leads_router
 from app.api.sales import router as sales_router
+from app.api.jobs import router as jobs_router
+from app.api.metrics import router as metrics_router
+from app.api.events import router as events_router
+from app.api.analytics import router as analytics_router
+from app.api.stats import router as stats_router
 
-__all__ = ["leads_router", "sales_router"]
+__all__ = [
+    "leads_router", "sales_router", "jobs_router", "metrics_router", "events_router",
+    "analytics_router", "stats_router",
+]
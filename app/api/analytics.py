@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta, timezone
+from typing import Literal, Optional
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import get_read_db
+from app.schemas.lead import (
+    StageDwellReport, StageDwellStats, StageTransitionCount, StageTransitionReport,
+)
+from app.services import stage_history
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+DEFAULT_WINDOW = timedelta(days=30)
+# Вікно не більше року — до 13 місячних партицій
+MAX_WINDOW = timedelta(days=366)
+
+Entity = Literal["lead", "sale"]
+
+
+def _aware(value: Optional[datetime]) -> Optional[datetime]:
+    # Час без зони в параметрах вважаємо UTC — як і все в stage_history
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+
+def _window(start: Optional[datetime], end: Optional[datetime]) -> tuple[datetime, datetime]:
+    start, end = _aware(start), _aware(end)
+    end = end or datetime.now(timezone.utc)
+    start = start or end - DEFAULT_WINDOW
+    if end <= start:
+        raise HTTPException(status_code=422, detail="end must be after start")
+    if end - start > MAX_WINDOW:
+        raise HTTPException(status_code=422, detail=f"Window is limited to {MAX_WINDOW.days} days")
+    return start, end
+
+
+@router.get("/stage-dwell", response_model=StageDwellReport)
+async def stage_dwell_endpoint(
+    entity: Entity = "lead",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Скільки часу сутності проводять у кожній стадії (середнє, p50, p90 у секундах).
+
+    Враховуються переходи, що відбулися у вікні `[start, end)`; за замовчуванням —
+    останні 30 днів.
+    """
+    start, end = _window(start, end)
+    rows = await stage_history.dwell_times(db, entity, start, end)
+    return StageDwellReport(
+        entity=entity,
+        start=start,
+        end=end,
+        stages=[StageDwellStats(**row._mapping) for row in rows],
+    )
+
+
+@router.get("/stage-transitions", response_model=StageTransitionReport)
+async def stage_transitions_endpoint(
+    entity: Entity = "lead",
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """Кількість переходів між стадіями у вікні `[start, end)` (за замовчуванням — 30 днів)."""
+    start, end = _window(start, end)
+    rows = await stage_history.transition_counts(db, entity, start, end)
+    return StageTransitionReport(
+        entity=entity,
+        start=start,
+        end=end,
+        transitions=[StageTransitionCount(**row._mapping) for row in rows],
+    )
@@ -0,0 +1,104 @@
+"""
+Умовні GET: ETag / Last-Modified, If-None-Match / If-Modified-Since.
+
+ETag сильний і будується з id + updated_at, тому для 304 достатньо
+прочитати ці два поля (або взяти їх з read-кешу) без гідратації ORM.
+"""
+
+import hashlib
+import uuid
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Awaitable, Callable, Iterable
+
+from fastapi import Request
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from app.services import read_cache
+
+
+def make_etag(stamps: Iterable[tuple[uuid.UUID, datetime]], extra: str = "") -> str:
+    digest = hashlib.blake2b(digest_size=16)
+    for entity_id, updated_at in stamps:
+        digest.update(entity_id.bytes)
+        digest.update(updated_at.isoformat().encode())
+    digest.update(extra.encode())
+    return f'"{digest.hexdigest()}"'
+
+
+def http_date(value: datetime) -> str:
+    return format_datetime(value.astimezone(timezone.utc), usegmt=True)
+
+
+def validator_headers(etag: str, last_modified: datetime | None) -> dict[str, str]:
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = http_date(last_modified)
+    return headers
+
+
+def has_conditions(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def is_not_modified(request: Request, etag: str, last_modified: datetime | None) -> bool:
+    """If-None-Match має пріоритет над If-Modified-Since (RFC 9110)."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        if if_none_match.strip() == "*":
+            return True
+        # Для If-None-Match порівняння слабке: W/"x" збігається з "x"
+        tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        return etag in tags
+
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since is not None and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+        # HTTP-дата має точність до секунди
+        return last_modified.replace(microsecond=0) <= since
+    return False
+
+
+def not_modified(etag: str, last_modified: datetime | None) -> Response:
+    return Response(status_code=304, headers=validator_headers(etag, last_modified))
+
+
+async def conditional_get(
+    request: Request,
+    key: tuple[str, uuid.UUID],
+    load: Callable[[], Awaitable[object | None]],
+    load_stamp: Callable[[], Awaitable[tuple[uuid.UUID, datetime] | None]],
+    schema: type[BaseModel],
+) -> Response | None:
+    """
+    GET одного об'єкта з read-кешем і валідаторами.
+
+    При умовному запиті спершу перевіряє кеш, потім — дешевий запит (id, updated_at);
+    повна відповідь будується тільки якщо об'єкт змінився. None — не знайдено.
+    """
+    if has_conditions(request):
+        entry = read_cache.peek(key)
+        stamp = (entry.entity_id, entry.updated_at) if entry else await load_stamp()
+        if stamp is None:
+            return None
+        etag = make_etag([stamp])
+        if is_not_modified(request, etag, stamp[1]):
+            return not_modified(etag, stamp[1])
+
+    entry = await read_cache.read_through(key, load, schema)
+    if entry is None:
+        return None
+    etag = make_etag([(entry.entity_id, entry.updated_at)])
+    if is_not_modified(request, etag, entry.updated_at):
+        return not_modified(etag, entry.updated_at)
+    return Response(
+        entry.payload,
+        media_type="application/json",
+        headers=validator_headers(etag, entry.updated_at),
+    )
@@ -0,0 +1,102 @@
+import asyncio
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.db import AsyncSessionLocal, get_read_db
+from app.schemas.lead import EventPage
+from app.services import event_feed
+from app.services.event_feed import InvalidEventCursorError, broadcaster
+
+router = APIRouter(prefix="/events", tags=["Events"])
+
+
+def _decode(cursor: Optional[str]):
+    try:
+        return event_feed.decode_cursor(cursor) if cursor else None
+    except InvalidEventCursorError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+
+def _check_types(types: Optional[List[str]]) -> None:
+    unknown = set(types or ()) - set(event_feed.EVENT_TYPES)
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown event types: {sorted(unknown)}")
+
+
+@router.get("/changes", response_model=EventPage)
+async def list_changes(
+    cursor: Optional[str] = None,
+    limit: int = Query(event_feed.DEFAULT_PAGE_SIZE, ge=1, le=event_feed.MAX_PAGE_SIZE),
+    types: Optional[List[str]] = Query(None),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Події після `cursor` (без нього — від найстаріших збережених) у порядку комітів.
+
+    Порожня сторінка повертає той самий `next_cursor` — його можна опитувати далі.
+    """
+    _check_types(types)
+    position = _decode(cursor)
+    rows = await event_feed.fetch_changes(db, position, limit, types)
+    items = [event_feed.to_response(row) for row in rows]
+    return EventPage(items=items, next_cursor=items[-1].cursor if items else cursor)
+
+
+@router.get("/stream")
+async def stream_events(
+    cursor: Optional[str] = None,
+    types: Optional[List[str]] = Query(None),
+    last_event_id: Optional[str] = Header(None),
+):
+    """
+    Server-Sent Events з подіями лідів і продажів.
+
+    Без `cursor` — події з моменту підключення. Після обриву EventSource сам
+    передає `Last-Event-ID`, і стрім дочитує пропущене з БД. Якщо клієнт не
+    встигає читати, стрім закривається — перепідключення продовжить з місця.
+    """
+    _check_types(types)
+    position = _decode(last_event_id or cursor)
+
+    async def body():
+        # Primary, не репліка: позиція broadcaster-а береться з primary,
+        # і відставання репліки дало б пропуск подій
+        async with AsyncSessionLocal() as db:
+            last = position if position is not None else await event_feed.tail_position(db)
+        # Спершу підписка, потім дочитування з БД: події, що прийдуть під час
+        # дочитування, будуть у черзі, а вже надіслані відсіюються за позицією
+        subscriber = broadcaster.subscribe(last, types)
+        try:
+            async with AsyncSessionLocal() as db:
+                while True:
+                    rows = await event_feed.fetch_changes(db, last, event_feed.MAX_PAGE_SIZE, types)
+                    for row in rows:
+                        yield event_feed.sse_frame(event_feed.to_response(row))
+                    if rows:
+                        last = (rows[-1].txid, rows[-1].id)
+                    if len(rows) < event_feed.MAX_PAGE_SIZE:
+                        break
+
+            while not subscriber.overflowed:
+                try:
+                    event_position, frame = await asyncio.wait_for(
+                        subscriber.queue.get(), settings.EVENTS_HEARTBEAT_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+                    continue
+                if event_position > last:
+                    last = event_position
+                    yield frame
+        finally:
+            broadcaster.unsubscribe(subscriber)
+
+    return StreamingResponse(
+        body(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
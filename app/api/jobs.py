@@ -0,0 +1,20 @@
+import uuid
+
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import get_db
+from app.schemas.lead import AnalysisJobResponse
+from app.services.job_service import get_job
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+@router.get("/{job_id}", response_model=AnalysisJobResponse)
+async def get_job_endpoint(job_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
+    """Статус асинхронного AI-аналізу (`POST /leads/{id}/analyze?async=true`)."""
+    # Primary, не репліка: клієнт опитує одразу після 202, відставання дало б 404
+    job = await get_job(db, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
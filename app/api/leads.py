@@ -1,16 +1,37 @@
+import json
 import uuid
+from datetime import datetime
+from typing import Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db import get_db
-from app.schemas.lead import LeadCreate, LeadStageUpdate, LeadMessagesUpdate, LeadResponse, AIResult
+from app.ai import AIOverloadedError
+from app.api.conditional import (
+    conditional_get, is_not_modified, make_etag, not_modified, validator_headers,
+)
+from app.api.streaming import export_response
+from app.db import get_db, get_read_db
+from app.models.lead import LeadSource, BusinessDomain, ColdStage
+from app.schemas.fast import encode_lead_page, encode_lead_search_page
+from app.schemas.lead import (
+    LeadCreate, LeadStageUpdate, LeadMessagesUpdate, LeadResponse, LeadPage, LeadSearchPage,
+    AIResult,
+    AnalysisJobResponse,
+    BulkLeadItemResult, BulkLeadResult, BatchAnalysisRequest, BatchAnalysisResult,
+    BulkLeadStageRequest, BulkStageResult,
+)
 from app.services import (
-    create_lead, get_lead, list_leads,
-    update_lead_stage, update_messages_count,
-    run_ai_analysis,
-    StageValidationError,
+    create_lead, bulk_create_leads, get_lead, get_lead_stamp, list_lead_rows, search_lead_rows,
+    update_lead_stage, bulk_update_lead_stages, update_messages_count,
+    run_ai_analysis, run_batch_ai_analysis,
+    StageValidationError, ConcurrencyConflictError, InvalidCursorError,
 )
+from app.services.export_service import export_leads
+from app.services.job_service import enqueue_analysis
+from app.services.lead_service import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, MAX_BULK_ITEMS
 
 router = APIRouter(prefix="/leads", tags=["Leads"])
 
@@ -28,16 +49,235 @@ async def create_lead_endpoint(data: LeadCreate, db: AsyncSession = Depends(get_
     return await create_lead(db, data)
 
 
-@router.get("/", response_model=list[LeadResponse])
-async def list_leads_endpoint(db: AsyncSession = Depends(get_db)):
-    """Список всіх лідів."""
-    return await list_leads(db)
+def _parse_bulk_body(raw: bytes, content_type: str) -> list:
+    """
+    Тіло bulk-запиту → список сирих елементів.
+    NDJSON: рядок, який не парситься, стає ValueError на своїй позиції.
+    """
+    if content_type.startswith("application/x-ndjson"):
+        items = []
+        for line in raw.splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except ValueError as e:
+                items.append(ValueError(f"Invalid JSON: {e}"))
+        return items
+
+    try:
+        items = json.loads(raw)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=f"Invalid JSON: {e}")
+    if not isinstance(items, list):
+        raise HTTPException(status_code=422, detail="Expected a JSON array of leads")
+    return items
+
+
+@router.post("/bulk", response_model=BulkLeadResult)
+async def bulk_create_leads_endpoint(request: Request, db: AsyncSession = Depends(get_db)):
+    """
+    Масове створення лідів: JSON-масив або NDJSON (`Content-Type: application/x-ndjson`),
+    кожен елемент — як тіло `POST /leads`.
+
+    Невалідні елементи не зупиняють імпорт — результат повертається по кожному.
+    """
+    raw_items = _parse_bulk_body(await request.body(), request.headers.get("content-type", ""))
+    if len(raw_items) > MAX_BULK_ITEMS:
+        raise HTTPException(
+            status_code=413, detail=f"Too many items: {len(raw_items)} > {MAX_BULK_ITEMS}"
+        )
+
+    results: list[BulkLeadItemResult] = []
+    valid: list[LeadCreate] = []
+    for index, raw in enumerate(raw_items):
+        try:
+            if isinstance(raw, ValueError):
+                raise raw
+            valid.append(LeadCreate.model_validate(raw))
+            results.append(BulkLeadItemResult(index=index, status="created"))
+        except ValidationError as e:
+            errors = [
+                f"{'.'.join(map(str, err['loc']))}: {err['msg']}" if err["loc"] else err["msg"]
+                for err in e.errors()
+            ]
+            results.append(BulkLeadItemResult(index=index, status="invalid", errors=errors))
+        except ValueError as e:
+            results.append(BulkLeadItemResult(index=index, status="invalid", errors=[str(e)]))
+
+    ids = iter(await bulk_create_leads(db, valid))
+    for item in results:
+        if item.status == "created":
+            item.id = next(ids)
+            if item.id is None:
+                item.status = "failed"
+
+    counts = {"created": 0, "invalid": 0, "failed": 0}
+    for item in results:
+        counts[item.status] += 1
+    return BulkLeadResult(**counts, items=results)
+
+
+@router.post("/analyze/batch", response_model=BatchAnalysisResult)
+async def batch_analyze_endpoint(
+    data: BatchAnalysisRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Пакетний AI-аналіз: за списком `lead_ids` або за фільтрами.
+
+    Однакові входи аналізуються один раз, Claude викликається паралельно з обмеженням.
+    Помилки AI не зупиняють пакет — вони рахуються у `failed`.
+    """
+    filters = data.model_dump(exclude={"lead_ids", "limit"})
+    if not data.lead_ids and not any(v is not None for v in filters.values()):
+        raise HTTPException(status_code=422, detail="Provide lead_ids or at least one filter")
+    return await run_batch_ai_analysis(db, data.lead_ids, limit=data.limit, **filters)
+
+
+@router.post("/stage/bulk", response_model=BulkStageResult)
+async def bulk_update_stage_endpoint(
+    data: BulkLeadStageRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Масова зміна стадій лідів (до 1000 за запит), правила ті самі, що й у `PATCH /{id}/stage`.
+
+    Результат по кожному елементу: `applied`, `invalid_transition`, `locked`,
+    `not_found`, `conflict` (версія не збіглася або лід змінили паралельно)
+    чи `duplicate`. Відхилені елементи не заважають іншим.
+    """
+    return await bulk_update_lead_stages(db, data.items)
+
+
+@router.get("/", response_model=LeadPage)
+async def list_leads_endpoint(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    stage: Optional[ColdStage] = None,
+    source: Optional[LeadSource] = None,
+    business_domain: Optional[BusinessDomain] = None,
+    min_score: Optional[float] = Query(None, ge=0.0, le=1.0),
+    max_score: Optional[float] = Query(None, ge=0.0, le=1.0),
+    analyzed_from: Optional[datetime] = None,
+    analyzed_to: Optional[datetime] = None,
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Список лідів посторінково, від нових до старих.
+
+    Наступна сторінка — передати `next_cursor` з попередньої відповіді у `cursor`
+    (з тими ж фільтрами).
+    """
+    try:
+        rows, next_cursor = await list_lead_rows(
+            db,
+            limit=limit,
+            cursor=cursor,
+            stage=stage,
+            source=source,
+            business_domain=business_domain,
+            min_score=min_score,
+            max_score=max_score,
+            analyzed_from=analyzed_from,
+            analyzed_to=analyzed_to,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    # ETag сторінки: склад і версії лідів на ній
+    etag = make_etag(((row.id, row.updated_at) for row in rows), next_cursor or "")
+    last_modified = max((row.updated_at for row in rows), default=None)
+    if is_not_modified(request, etag, last_modified):
+        return not_modified(etag, last_modified)
+    # Рядки з власної БД — кодуємо напряму, без повторної валідації в LeadResponse
+    return Response(
+        encode_lead_page(rows, next_cursor),
+        media_type="application/json",
+        headers=validator_headers(etag, last_modified),
+    )
+
+
+@router.get("/search", response_model=LeadSearchPage)
+async def search_leads_endpoint(
+    q: str = Query(..., min_length=1, max_length=200),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    recommendation: Optional[Literal["transfer_to_sales", "continue_nurturing", "mark_as_lost"]] = None,
+    stage: Optional[ColdStage] = None,
+    min_score: Optional[float] = Query(None, ge=0.0, le=1.0),
+    max_score: Optional[float] = Query(None, ge=0.0, le=1.0),
+    db: AsyncSession = Depends(get_read_db),
+):
+    """
+    Пошук лідів за текстом AI-пояснення (`ai_reason`), від найрелевантніших.
+
+    `q` — як у пошуковику: слова, `"фраза в лапках"`, `or`, `-виключити`.
+    Наступна сторінка — `next_cursor` у `cursor` з тими ж `q` і фільтрами.
+    """
+    try:
+        rows, next_cursor = await search_lead_rows(
+            db,
+            q,
+            limit=limit,
+            cursor=cursor,
+            recommendation=recommendation,
+            stage=stage,
+            min_score=min_score,
+            max_score=max_score,
+        )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return Response(encode_lead_search_page(rows, next_cursor), media_type="application/json")
+
+
+@router.get("/export")
+async def export_leads_endpoint(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    gzip: bool = False,
+    stage: Optional[ColdStage] = None,
+    source: Optional[LeadSource] = None,
+    business_domain: Optional[BusinessDomain] = None,
+    min_score: Optional[float] = Query(None, ge=0.0, le=1.0),
+    max_score: Optional[float] = Query(None, ge=0.0, le=1.0),
+    analyzed_from: Optional[datetime] = None,
+    analyzed_to: Optional[datetime] = None,
+):
+    """
+    Потокове вивантаження лідів у NDJSON або CSV (опційно gzip).
+    Фільтри ті самі, що й у списку.
+    """
+    filters = dict(
+        stage=stage,
+        source=source,
+        business_domain=business_domain,
+        min_score=min_score,
+        max_score=max_score,
+        analyzed_from=analyzed_from,
+        analyzed_to=analyzed_to,
+    )
+    return export_response(
+        lambda db: export_leads(db, format, gzip, **filters),
+        format, gzip, "leads",
+    )
 
 
 @router.get("/{lead_id}", response_model=LeadResponse)
-async def get_lead_endpoint(lead_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
-    """Отримати ліда за ID."""
-    return await _get_lead_or_404(lead_id, db)
+async def get_lead_endpoint(
+    lead_id: uuid.UUID, request: Request, db: AsyncSession = Depends(get_read_db)
+):
+    """Отримати ліда за ID. Підтримує If-None-Match / If-Modified-Since (304)."""
+    response = await conditional_get(
+        request,
+        ("lead", lead_id),
+        lambda: get_lead(db, lead_id, include_archived=True),
+        lambda: get_lead_stamp(db, lead_id, include_archived=True),
+        LeadResponse,
+    )
+    if response is None:
+        raise HTTPException(status_code=404, detail="Lead not found")
+    return response
 
 
 @router.patch("/{lead_id}/stage", response_model=LeadResponse)
@@ -47,11 +287,15 @@ async def update_stage_endpoint(
     db: AsyncSession = Depends(get_db),
 ):
     """Змінити стадію ліда. Не можна пропускати стадії."""
-    lead = await _get_lead_or_404(lead_id, db)
     try:
-        return await update_lead_stage(db, lead, data.stage)
+        lead = await update_lead_stage(db, lead_id, data.stage, data.expected_version)
+    except ConcurrencyConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except StageValidationError as e:
         raise HTTPException(status_code=422, detail=str(e))
+    if not lead:
+        raise HTTPException(status_code=404, detail="Lead not found")
+    return lead
 
 
 @router.patch("/{lead_id}/messages", response_model=LeadResponse)
@@ -61,13 +305,20 @@ async def update_messages_endpoint(
     db: AsyncSession = Depends(get_db),
 ):
     """Оновити кількість повідомлень з лідом."""
-    lead = await _get_lead_or_404(lead_id, db)
-    return await update_messages_count(db, lead, data.messages_count)
+    lead = await update_messages_count(db, lead_id, data.messages_count)
+    if not lead:
+        raise HTTPException(status_code=404, detail="Lead not found")
+    return lead
 
 
-@router.post("/{lead_id}/analyze", response_model=AIResult)
+@router.post(
+    "/{lead_id}/analyze",
+    response_model=AIResult,
+    responses={202: {"model": AnalysisJobResponse}},
+)
 async def analyze_lead_endpoint(
     lead_id: uuid.UUID,
+    run_async: bool = Query(False, alias="async"),
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -77,10 +328,26 @@ async def analyze_lead_endpoint(
     AI повертає: score, recommendation, reason.
     Результат зберігається в базі.
     Рішення про передачу в продажі приймає менеджер.
+
+    `?async=true` — не чекати на Claude: задача ставиться в чергу, відповідь 202
+    з ID задачі, статус — `GET /jobs/{job_id}`.
+
+    503 з `Retry-After` — забагато одночасних аналізів або Claude обмежив темп.
     """
     lead = await _get_lead_or_404(lead_id, db)
+    if run_async:
+        job = await enqueue_analysis(db, lead.id)
+        payload = AnalysisJobResponse.model_validate(job).model_dump(mode="json")
+        return JSONResponse(
+            payload, status_code=202, headers={"Location": f"/jobs/{job.id}"}
+        )
     try:
         return await run_ai_analysis(db, lead)
+    except AIOverloadedError as e:
+        # Черга допуску повна або Claude відповідає 429/529 — повторити пізніше
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": e.retry_after_header}
+        )
     except ValueError as e:
         raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
@@ -0,0 +1,35 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+from app import metrics
+from app.ai import admission_stats
+from app.services import read_cache
+from app.services.score_cache import cache_stats
+
+router = APIRouter(prefix="/metrics", tags=["Metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+@router.get("", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Метрики процесу у форматі Prometheus: HTTP, пул і запити БД, виклики Claude."""
+    return PlainTextResponse(metrics.registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@router.get("/ai-cache")
+async def ai_cache_metrics():
+    """Hit rate кешу AI-оцінок (процесу, що відповідає)."""
+    return cache_stats()
+
+
+@router.get("/read-cache")
+async def read_cache_metrics():
+    """Hit/miss кешу GET /leads/{id} і /sales/{id} (процесу, що відповідає)."""
+    return read_cache.cache_stats()
+
+
+@router.get("/ai-admission")
+async def ai_admission_metrics():
+    """Адаптивний ліміт, виклики в роботі й у черзі, темп відра (процесу, що відповідає)."""
+    return admission_stats() or {}
@@ -1,15 +1,23 @@
 import uuid
+from typing import Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.db import get_db
-from app.schemas.lead import SaleStageUpdate, SaleResponse
+from app.api.conditional import conditional_get
+from app.api.streaming import export_response
+from app.db import get_db, get_read_db
+from app.models.lead import SaleStage
+from app.schemas.lead import (
+    SaleStageUpdate, SaleResponse, BulkSaleStageRequest, BulkStageResult,
+)
 from app.services import (
-    get_lead, transfer_to_sales,
-    get_sale, get_sale_by_lead, update_sale_stage,
-    StageValidationError, TransferValidationError,
+    transfer_to_sales,
+    get_sale, get_sale_by_lead, get_sale_stamp, get_sale_stamp_by_lead, update_sale_stage,
+    bulk_update_sale_stages,
+    StageValidationError, TransferValidationError, ConcurrencyConflictError,
 )
+from app.services.export_service import export_sales
 
 router = APIRouter(tags=["Sales"])
 
@@ -17,6 +25,7 @@ router = APIRouter(tags=["Sales"])
 @router.post("/leads/{lead_id}/transfer", response_model=SaleResponse, status_code=201)
 async def transfer_lead_endpoint(
     lead_id: uuid.UUID,
+    expected_version: Optional[int] = None,
     db: AsyncSession = Depends(get_db),
 ):
     """
@@ -26,35 +35,79 @@ async def transfer_lead_endpoint(
     - AI score >= 0.6
     - Вказаний бізнес-домен
     - Лід на стадії 'qualified'
+
+    409 — лід уже передали або змінили паралельно (чи версія не збігається з `expected_version`).
     """
-    lead = await get_lead(db, lead_id)
-    if not lead:
-        raise HTTPException(status_code=404, detail="Lead not found")
     try:
-        return await transfer_to_sales(db, lead)
+        sale = await transfer_to_sales(db, lead_id, expected_version)
+    except ConcurrencyConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except TransferValidationError as e:
         raise HTTPException(status_code=422, detail=str(e))
+    if not sale:
+        raise HTTPException(status_code=404, detail="Lead not found")
+    return sale
 
 
 @router.get("/leads/{lead_id}/sale", response_model=SaleResponse)
 async def get_sale_by_lead_endpoint(
     lead_id: uuid.UUID,
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
 ):
-    """Отримати продаж по ID ліда."""
-    sale = await get_sale_by_lead(db, lead_id)
-    if not sale:
+    """Отримати продаж по ID ліда. Підтримує If-None-Match / If-Modified-Since (304)."""
+    response = await conditional_get(
+        request,
+        ("sale_by_lead", lead_id),
+        lambda: get_sale_by_lead(db, lead_id, include_archived=True),
+        lambda: get_sale_stamp_by_lead(db, lead_id, include_archived=True),
+        SaleResponse,
+    )
+    if response is None:
         raise HTTPException(status_code=404, detail="Sale not found for this lead")
-    return sale
+    return response
+
+
+@router.get("/sales/export")
+async def export_sales_endpoint(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    gzip: bool = False,
+    stage: Optional[SaleStage] = None,
+):
+    """Потокове вивантаження продажів у NDJSON або CSV (опційно gzip)."""
+    return export_response(
+        lambda db: export_sales(db, format, gzip, stage=stage),
+        format, gzip, "sales",
+    )
+
+
+@router.post("/sales/stage/bulk", response_model=BulkStageResult)
+async def bulk_update_sale_stage_endpoint(
+    data: BulkSaleStageRequest,
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Масова зміна стадій продажів (до 1000 за запит), правила ті самі, що й у
+    `PATCH /sales/{id}/stage`. Результат по кожному елементу, як у `POST /leads/stage/bulk`.
+    """
+    return await bulk_update_sale_stages(db, data.items)
 
 
 @router.get("/sales/{sale_id}", response_model=SaleResponse)
-async def get_sale_endpoint(sale_id: uuid.UUID, db: AsyncSession = Depends(get_db)):
-    """Отримати продаж за ID."""
-    sale = await get_sale(db, sale_id)
-    if not sale:
+async def get_sale_endpoint(
+    sale_id: uuid.UUID, request: Request, db: AsyncSession = Depends(get_read_db)
+):
+    """Отримати продаж за ID. Підтримує If-None-Match / If-Modified-Since (304)."""
+    response = await conditional_get(
+        request,
+        ("sale", sale_id),
+        lambda: get_sale(db, sale_id, include_archived=True),
+        lambda: get_sale_stamp(db, sale_id, include_archived=True),
+        SaleResponse,
+    )
+    if response is None:
         raise HTTPException(status_code=404, detail="Sale not found")
-    return sale
+    return response
 
 
 @router.patch("/sales/{sale_id}/stage", response_model=SaleResponse)
@@ -64,10 +117,12 @@ async def update_sale_stage_endpoint(
     db: AsyncSession = Depends(get_db),
 ):
     """Змінити стадію продажу. Не можна пропускати стадії, не можна змінити 'paid'."""
-    sale = await get_sale(db, sale_id)
-    if not sale:
-        raise HTTPException(status_code=404, detail="Sale not found")
     try:
-        return await update_sale_stage(db, sale, data.stage)
+        sale = await update_sale_stage(db, sale_id, data.stage, data.expected_version)
+    except ConcurrencyConflictError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except StageValidationError as e:
         raise HTTPException(status_code=422, detail=str(e))
+    if not sale:
+        raise HTTPException(status_code=404, detail="Sale not found")
+    return sale
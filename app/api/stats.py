@@ -0,0 +1,18 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import get_read_db
+from app.schemas.lead import PipelineStats
+from app.services.pipeline_stats import get_pipeline_stats
+
+router = APIRouter(prefix="/stats", tags=["Stats"])
+
+
+@router.get("/pipeline", response_model=PipelineStats)
+async def pipeline_stats_endpoint(db: AsyncSession = Depends(get_read_db)):
+    """
+    Ліди і продажі по стадіях у розрізі джерела й бізнес-домену,
+    конверсія лід → продаж → оплата. Читає лічильники, а не таблиці лідів,
+    тому час відповіді не залежить від їх кількості.
+    """
+    return await get_pipeline_stats(db)
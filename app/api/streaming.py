@@ -0,0 +1,31 @@
+from typing import AsyncIterator, Callable
+
+from fastapi.responses import StreamingResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db import AsyncReadSessionLocal
+from app.services.export_service import EXPORT_FORMATS
+
+
+def export_response(
+    make_stream: Callable[[AsyncSession], AsyncIterator[bytes]],
+    fmt: str,
+    compress: bool,
+    filename: str,
+) -> StreamingResponse:
+    """
+    StreamingResponse для експорту.
+
+    Сесія відкривається всередині генератора, а не через Depends(get_read_db):
+    залежності з yield закриваються до того, як стрім почне віддавати тіло.
+    Експорт лише читає, тому йде в репліку, якщо вона налаштована.
+    """
+    async def body():
+        async with AsyncReadSessionLocal() as db:
+            async for chunk in make_stream(db):
+                yield chunk
+
+    headers = {"Content-Disposition": f'attachment; filename="{filename}.{fmt}"'}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(body(), media_type=EXPORT_FORMATS[fmt], headers=headers)
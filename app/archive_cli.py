@@ -0,0 +1,62 @@
+"""
+Архівування закритих лідів і продажів на вимогу.
+
+    python -m app.archive_cli [--table leads|sales] [--older-than-days N]
+                              [--batch-size N] [--pause S] [--max-batches N]
+                              [--vacuum] [--dry-run]
+
+Переносить ліди в стадії lost і продажі в paid / lost, що не змінювались
+довше за --older-than-days (ARCHIVE_AFTER_DAYS), у leads_archive /
+sales_archive пачками по --batch-size. Перервати можна будь-коли: кожна
+пачка закомічена, наступний запуск продовжить з того ж місця.
+
+Друкує звіт по таблиці: рядків, рядків за секунду, обсяг перенесених рядків
+і розмір таблиці з індексами до / після. Файл таблиці після DELETE не
+зменшується — --vacuum одразу запускає VACUUM (ANALYZE), щоб місце стало
+доступним для нових рядків і розмір «після» був чесним.
+--dry-run — тільки кількість кандидатів.
+"""
+
+import argparse
+import asyncio
+import json
+from datetime import timedelta
+
+from app.config import settings
+from app.db import AsyncSessionLocal
+from app.services.archive_service import LEADS, SALES, archive_table, count_candidates
+
+
+async def main(args) -> None:
+    older_than = timedelta(days=args.older_than_days)
+    # Продажі першими, як і у воркері
+    tables = [args.table] if args.table else [SALES, LEADS]
+    async with AsyncSessionLocal() as db:
+        if args.dry_run:
+            counts = {table: await count_candidates(db, table, older_than) for table in tables}
+            print(json.dumps(counts, indent=2))
+            return
+        for table in tables:
+            report = await archive_table(
+                db,
+                table,
+                older_than,
+                batch_size=args.batch_size,
+                pause_seconds=args.pause,
+                max_batches=args.max_batches,
+                run_vacuum=args.vacuum,
+            )
+            print(json.dumps(report.to_dict(), indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--table", choices=[LEADS, SALES], help="за замовчуванням — обидві")
+    parser.add_argument("--older-than-days", type=int, default=settings.ARCHIVE_AFTER_DAYS)
+    parser.add_argument("--batch-size", type=int, default=settings.ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--pause", type=float, default=settings.ARCHIVE_PAUSE_SECONDS,
+                        help="пауза між пачками, секунд")
+    parser.add_argument("--max-batches", type=int, help="зупинитись після N пачок")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM (ANALYZE) після переносу")
+    parser.add_argument("--dry-run", action="store_true", help="тільки порахувати кандидатів")
+    asyncio.run(main(parser.parse_args()))
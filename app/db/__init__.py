@@ -1,3 +1,9 @@
-from app.db.database import Base, get_db, engine, AsyncSessionLocal
+from app.db.database import (
+    Base, get_db, get_read_db, engine, read_engine, AsyncSessionLocal, AsyncReadSessionLocal,
+    warm_up,
+)
 
-__all__ = ["Base", "get_db", "engine", "AsyncSessionLocal"]
+__all__ = [
+    "Base", "get_db", "get_read_db", "engine", "read_engine",
+    "AsyncSessionLocal", "AsyncReadSessionLocal", "warm_up",
+]
@@ -1,9 +1,37 @@
+import asyncio
+
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.orm import DeclarativeBase
 
 from app.config import settings
+from app.db.instrumentation import instrument_engine, timed_pool_class
+
+
+def _create_engine(url: str, label: str):
+    engine = create_async_engine(
+        url,
+        echo=False,
+        poolclass=timed_pool_class(label),
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+        pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+        connect_args={"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE},
+    )
+    instrument_engine(engine, label)
+    return engine
+
 
-engine = create_async_engine(settings.DATABASE_URL, echo=False)
+engine = _create_engine(settings.DATABASE_URL, "primary")
+
+# Без DATABASE_READ_URL читання йдуть тим самим пулом, що й записи
+read_engine = (
+    _create_engine(settings.DATABASE_READ_URL, "replica")
+    if settings.DATABASE_READ_URL
+    else engine
+)
 
 AsyncSessionLocal = async_sessionmaker(
     bind=engine,
@@ -11,6 +39,12 @@ AsyncSessionLocal = async_sessionmaker(
     expire_on_commit=False,
 )
 
+AsyncReadSessionLocal = async_sessionmaker(
+    bind=read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+)
+
 
 class Base(DeclarativeBase):
     pass
@@ -19,3 +53,26 @@ class Base(DeclarativeBase):
 async def get_db() -> AsyncSession:
     async with AsyncSessionLocal() as session:
         yield session
+
+
+async def get_read_db() -> AsyncSession:
+    """Сесія для read-only ендпоінтів: репліка, якщо задано DATABASE_READ_URL."""
+    async with AsyncReadSessionLocal() as session:
+        yield session
+
+
+async def warm_up(connections: int) -> None:
+    """
+    Відкриває до connections з'єднань у кожному пулі (primary і репліка) і
+    повертає їх у пул: перші запити після старту не чекають на TCP,
+    автентифікацію і початкові запити asyncpg. Помилка з'єднання — виняток.
+    """
+    count = min(connections, settings.DB_POOL_SIZE)
+    for pool_engine in dict.fromkeys([engine, read_engine]):
+        conns = [pool_engine.connect() for _ in range(count)]
+        try:
+            await asyncio.gather(*(conn.start() for conn in conns))
+            await asyncio.gather(*(conn.execute(text("SELECT 1")) for conn in conns))
+        finally:
+            await asyncio.gather(*(conn.close() for conn in conns), return_exceptions=True)
+
@@ -0,0 +1,78 @@
+"""
+Метрики БД: очікування з'єднання з пулу і час виконання кожного запиту.
+
+Пул не має події «початок checkout», тому очікування міряється в підкласі
+пулу навколо _do_get. Час запиту — між before/after_cursor_execute; мітка
+зберігається на ExecutionContext, окремих структур на запит не створюється.
+"""
+
+import re
+import time
+
+from sqlalchemy import event, exc
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app import metrics
+
+_OPERATION = re.compile(r"\s*(\w+)")
+_KNOWN_OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH", "BEGIN", "COMMIT", "ROLLBACK"}
+
+
+class TimedQueuePool(AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool, що пише час очікування з'єднання в метрики."""
+
+    metrics_label = "primary"
+
+    def _do_get(self):
+        started = time.perf_counter()
+        try:
+            return super()._do_get()
+        except exc.TimeoutError:
+            metrics.db_pool_timeouts.labels(self.metrics_label).inc()
+            raise
+        finally:
+            metrics.db_pool_wait.labels(self.metrics_label).observe(time.perf_counter() - started)
+
+
+def timed_pool_class(label: str) -> type[TimedQueuePool]:
+    """
+    Клас пулу з власною міткою. Мітка — атрибут класу, а не екземпляра:
+    engine.dispose() створює новий пул через self.__class__.
+    """
+    return type(f"TimedQueuePool_{label}", (TimedQueuePool,), {"metrics_label": label})
+
+
+def _operation(statement: str) -> str:
+    match = _OPERATION.match(statement)
+    operation = match.group(1).upper() if match else ""
+    return operation if operation in _KNOWN_OPERATIONS else "OTHER"
+
+
+def instrument_engine(engine: AsyncEngine, label: str) -> None:
+    sync_engine = engine.sync_engine
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if context is not None:
+            context._metrics_started = time.perf_counter()
+
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        started = getattr(context, "_metrics_started", None)
+        if started is not None:
+            metrics.db_statement_duration.labels(label, _operation(statement)).observe(
+                time.perf_counter() - started
+            )
+
+    def handle_error(exception_context):
+        if exception_context.statement:
+            metrics.db_statement_errors.labels(label, _operation(exception_context.statement)).inc()
+
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    event.listen(sync_engine, "after_cursor_execute", after_cursor_execute)
+    event.listen(sync_engine, "handle_error", handle_error)
+
+    # Пул читається через engine: після dispose() це вже інший об'єкт
+    metrics.db_pool_size.add(lambda: sync_engine.pool.size(), label)
+    metrics.db_pool_checked_out.add(lambda: sync_engine.pool.checkedout(), label)
+    # QueuePool рахує overflow від -pool_size, поки пул не заповнений
+    metrics.db_pool_overflow.add(lambda: max(0, sync_engine.pool.overflow()), label)
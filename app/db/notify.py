@@ -0,0 +1,85 @@
+"""
+Postgres LISTEN/NOTIFY для подій між процесами.
+
+Один виділений asyncpg-з'єднання на процес, поза пулом SQLAlchemy.
+Якщо з'єднання обірвалось, сповіщення за цей час втрачені — тому після
+перепідключення викликаються on_reset-колбеки (наприклад, очистити кеш).
+"""
+
+import asyncio
+import contextlib
+import logging
+from typing import Callable
+
+import asyncpg
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+RECONNECT_DELAY_SECONDS = 2.0
+
+
+def _asyncpg_dsn(url: str) -> str:
+    return url.replace("postgresql+asyncpg://", "postgresql://", 1)
+
+
+class NotificationListener:
+    def __init__(self, dsn: str):
+        self.dsn = dsn
+        self._callbacks: dict[str, list[Callable[[str], None]]] = {}
+        self._on_reset: list[Callable[[], None]] = []
+        self._task: asyncio.Task | None = None
+
+    def subscribe(
+        self,
+        channel: str,
+        callback: Callable[[str], None],
+        on_reset: Callable[[], None] | None = None,
+    ) -> None:
+        """Реєструє колбек на канал. Викликати до start()."""
+        self._callbacks.setdefault(channel, []).append(callback)
+        if on_reset is not None:
+            self._on_reset.append(on_reset)
+
+    def _dispatch(self, connection, pid, channel: str, payload: str) -> None:
+        for callback in self._callbacks.get(channel, []):
+            try:
+                callback(payload)
+            except Exception:
+                logger.exception("Notification callback failed on %s", channel)
+
+    async def _run(self) -> None:
+        while True:
+            connection = None
+            try:
+                connection = await asyncpg.connect(self.dsn)
+                lost = asyncio.Event()
+                connection.add_termination_listener(lambda _: lost.set())
+                for channel in self._callbacks:
+                    await connection.add_listener(channel, self._dispatch)
+                # Поки не слухали — могли пропустити сповіщення
+                for reset in self._on_reset:
+                    reset()
+                await lost.wait()
+                logger.warning("LISTEN connection lost, reconnecting")
+            except (OSError, asyncpg.PostgresError) as e:
+                logger.warning("LISTEN connection failed: %s", e)
+            finally:
+                if connection is not None and not connection.is_closed():
+                    await connection.close()
+            await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+    def start(self) -> None:
+        if self._task is None and self._callbacks:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+
+listener = NotificationListener(_asyncpg_dsn(settings.DATABASE_URL))
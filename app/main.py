@@ -1,18 +1,90 @@
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.responses import JSONResponse
 
-from app.api import leads_router, sales_router
+from app.ai import close_client
+from app.api import (
+    leads_router, sales_router, jobs_router, metrics_router, events_router, analytics_router,
+    stats_router,
+)
+from app.config import settings
+from app.db import AsyncSessionLocal, warm_up
+from app.db.notify import listener
+from app.middleware import MetricsMiddleware
+from app.services import event_feed, read_cache
+
+
+logger = logging.getLogger("app.main")
+
+
+async def _warm_up(app: FastAPI) -> bool:
+    """Прогріває пули БД; успіх робить процес готовим (/ready)."""
+    try:
+        await asyncio.wait_for(
+            warm_up(settings.DB_WARMUP_CONNECTIONS), settings.DB_WARMUP_TIMEOUT_SECONDS
+        )
+    except Exception as e:
+        logger.warning("Database warm-up failed: %r", e)
+        return False
+    app.state.ready = True
+    return True
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Клієнт Claude створюється при першому аналізі (без ключа /analyze відповідає 503)
+    app.state.ready = False
+    await _warm_up(app)
+    if settings.READ_CACHE_ENABLED:
+        listener.subscribe(
+            read_cache.CHANNEL, read_cache.on_notification, on_reset=read_cache.reset
+        )
+    listener.subscribe(
+        event_feed.CHANNEL,
+        event_feed.broadcaster.on_notification,
+        on_reset=event_feed.broadcaster.on_reset,
+    )
+    listener.start()
+    event_feed.broadcaster.start(AsyncSessionLocal)
+    yield
+    app.state.ready = False
+    await event_feed.broadcaster.stop()
+    await listener.stop()
+    await close_client()
+
 
 app = FastAPI(
     title="CRM Leads Service",
     description="Lead management with AI-powered analysis via Claude API",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
+app.add_middleware(MetricsMiddleware)
+
 app.include_router(leads_router)
 app.include_router(sales_router)
+app.include_router(jobs_router)
+app.include_router(metrics_router)
+app.include_router(events_router)
+app.include_router(analytics_router)
+app.include_router(stats_router)
 
 
 @app.get("/health", tags=["Health"])
 async def health():
     return JSONResponse({"status": "ok"})
+
+
+@app.get("/ready", tags=["Health"])
+async def ready():
+    """
+    Готовність приймати трафік: пули БД прогріті. Якщо БД була недоступна
+    при старті, кожна перевірка пробує прогріти їх знову.
+    """
+    if app.state.ready or await _warm_up(app):
+        return JSONResponse({"status": "ready"})
+    return JSONResponse({"status": "starting"}, status_code=503)
@@ -0,0 +1,271 @@
+"""
+Метрики процесу у форматі Prometheus (text exposition 0.0.4).
+
+Без блокувань, як і TTLCache: весь код застосунку — і ASGI, і події
+SQLAlchemy (greenlet) — виконується в потоці event loop, тому звичайних
+int/float лічильників достатньо. Дочірні серії з мітками створюються один раз
+і кешуються, тож гаряча гілка — це пошук у dict і кілька додавань.
+
+Значення — на процес: при кількох воркерах uvicorn Prometheus збирає кожен.
+"""
+
+from bisect import bisect_left
+from typing import Callable, Iterable
+
+# Секундні бакети: від швидкого SELECT до повільного виклику Claude
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(names: tuple[str, ...], values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: dict[tuple, object] = {}
+        if not self.labelnames:
+            self._children[()] = self._new_child()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            child = self._children[values] = self._new_child()
+        return child
+
+    def _samples(self) -> Iterable[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class _Value:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _Value()
+
+    def inc(self, amount: float = 1) -> None:
+        self._children[()].inc(amount)
+
+    def _samples(self):
+        for values, child in self._children.items():
+            yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(child.value)}"
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, amount: float = 1) -> None:
+        self._children[()].dec(amount)
+
+    def set(self, value: float) -> None:
+        self._children[()].set(value)
+
+
+class CallbackGauge(_Metric):
+    """Gauge, значення якого читається функціями в момент експорту (стан пулу тощо)."""
+
+    kind = "gauge"
+
+    def _new_child(self):
+        return None
+
+    def add(self, callback: Callable[[], float], *values) -> None:
+        self._children[values] = callback
+
+    def _samples(self):
+        for values, callback in self._children.items():
+            if callback is not None:
+                yield f"{self.name}{_format_labels(self.labelnames, values)} {_format_value(callback())}"
+
+
+class _HistogramValue:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple[float, ...]):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: Iterable[str] = (),
+                 buckets: tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labelnames)
+
+    def _new_child(self):
+        return _HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self._children[()].observe(value)
+
+    def _samples(self):
+        for values, child in self._children.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, float("inf")), child.counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, values, le)} {cumulative}"
+            labels = _format_labels(self.labelnames, values)
+            yield f"{self.name}_sum{labels} {_format_value(child.sum)}"
+            yield f"{self.name}_count{labels} {child.count}"
+
+
+class Registry:
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+
+    def register(self, metric: _Metric) -> _Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(metric.render() for metric in self._metrics.values()) + "\n"
+
+
+registry = Registry()
+
+
+# ── HTTP ──────────────────────────────────────────────────────────────────────
+
+http_request_duration = registry.register(Histogram(
+    "http_request_duration_seconds",
+    "Request latency until the last body chunk is sent",
+    ("method", "route", "status"),
+))
+http_requests_in_flight = registry.register(Gauge(
+    "http_requests_in_flight", "Requests currently being processed",
+))
+
+# ── DB ────────────────────────────────────────────────────────────────────────
+
+# Мітка pool: primary або replica (DATABASE_READ_URL)
+db_pool_wait = registry.register(Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time spent waiting for a pooled connection (includes opening a new one)",
+    ("pool",),
+))
+db_pool_timeouts = registry.register(Counter(
+    "db_pool_checkout_timeouts_total", "Checkouts that failed with a pool timeout", ("pool",),
+))
+db_pool_size = registry.register(CallbackGauge(
+    "db_pool_size", "Configured pool size", ("pool",),
+))
+db_pool_checked_out = registry.register(CallbackGauge(
+    "db_pool_checked_out", "Connections currently checked out", ("pool",),
+))
+db_pool_overflow = registry.register(CallbackGauge(
+    "db_pool_overflow", "Connections opened above pool size", ("pool",),
+))
+db_statement_duration = registry.register(Histogram(
+    "db_statement_duration_seconds",
+    "Statement execution time by leading SQL keyword",
+    ("pool", "operation"),
+))
+db_statement_errors = registry.register(Counter(
+    "db_statement_errors_total", "Statements that raised a DBAPI error", ("pool", "operation"),
+))
+
+# ── Claude ────────────────────────────────────────────────────────────────────
+
+ai_request_duration = registry.register(Histogram(
+    "ai_request_duration_seconds",
+    "Claude messages.create latency including SDK retries",
+    ("outcome",),
+))
+ai_tokens = registry.register(Counter(
+    "ai_tokens_total", "Tokens reported in Claude usage", ("type",),
+))
+ai_retries = registry.register(Counter(
+    "ai_retries_total", "HTTP retries made by the Anthropic SDK",
+))
+ai_parse_failures = registry.register(Counter(
+    "ai_parse_failures_total", "Claude responses that were not valid analysis JSON",
+))
+ai_prescore_decisions = registry.register(Counter(
+    "ai_prescore_decisions_total",
+    "Analyses decided by the local pre-score model vs sent to Claude",
+    ("decision",),
+))
+# Мітка tier: memory (LRU процесу), db (ai_score_cache) або miss (пішло в Claude)
+ai_score_cache_lookups = registry.register(Counter(
+    "ai_score_cache_lookups_total", "AI score lookups by the cache tier that answered", ("tier",),
+))
+ai_admission_limit = registry.register(Gauge(
+    "ai_admission_concurrency_limit", "Adaptive limit of concurrent Claude calls",
+))
+ai_admission_wait = registry.register(Histogram(
+    "ai_admission_wait_seconds", "Time Claude calls spent queued for admission",
+))
+ai_admission_rejections = registry.register(Counter(
+    "ai_admission_rejections_total", "Claude calls rejected by admission control", ("reason",),
+))
+ai_rescored_leads = registry.register(Counter(
+    "ai_rescored_leads_total", "Stale leads re-analyzed by the rescore scheduler", ("outcome",),
+))
+# ── Кеші процесу ──────────────────────────────────────────────────────────────
+
+# Мітка kind — вид ключа read_cache: lead, sale, sale_by_lead
+read_cache_lookups = registry.register(Counter(
+    "read_cache_lookups_total", "Read-through cache lookups for GET lead/sale", ("kind", "result"),
+))
+cache_entries = registry.register(CallbackGauge(
+    "cache_entries", "Entries held by an in-process cache", ("cache",),
+))
+
+archived_rows = registry.register(Counter(
+    "archived_rows_total", "Rows moved to archive tables by the archiver", ("table",),
+))
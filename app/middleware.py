@@ -0,0 +1,45 @@
+"""
+ASGI-middleware метрик HTTP: латентність на маршрут і кількість запитів у роботі.
+
+Чистий ASGI, а не BaseHTTPMiddleware: не обгортає тіло відповіді в окрему
+задачу і не ламає потокові експорти. Маршрут береться з шаблону FastAPI
+("/leads/{lead_id}"), а не з URL, щоб кількість серій не росла з кількістю id.
+"""
+
+import time
+
+from app import metrics
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+class MetricsMiddleware:
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        metrics.http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            metrics.http_requests_in_flight.dec()
+            # Router доповнює той самий scope знайденим маршрутом
+            route = scope.get("route")
+            metrics.http_request_duration.labels(
+                scope["method"],
+                getattr(route, "path", UNMATCHED_ROUTE),
+                status,
+            ).observe(time.perf_counter() - started)
@@ -1,3 +1,13 @@
 from app.models.lead import Lead, Sale, LeadSource, BusinessDomain, ColdStage, SaleStage
+from app.models.ai_cache import AIScoreCache
+from app.models.job import AnalysisJob, JobStatus
+from app.models.outbox import OutboxEvent
+from app.models.stage_history import StageHistory
+from app.models.pipeline_stats import PipelineStat
+from app.models.archive import LeadArchive, SaleArchive
 
-__all__ = ["Lead", "Sale", "LeadSource", "BusinessDomain", "ColdStage", "SaleStage"]
+__all__ = [
+    "Lead", "Sale", "LeadSource", "BusinessDomain", "ColdStage", "SaleStage",
+    "AIScoreCache", "AnalysisJob", "JobStatus", "OutboxEvent",
+    "StageHistory", "PipelineStat", "LeadArchive", "SaleArchive",
+]
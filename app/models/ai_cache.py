@@ -0,0 +1,21 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, String, Float, DateTime, Text
+
+from app.db.database import Base
+
+
+class AIScoreCache(Base):
+    """Спільний для всіх воркерів кеш AI-оцінок, ключ — analysis_fingerprint."""
+
+    __tablename__ = "ai_score_cache"
+
+    fingerprint = Column(String(64), primary_key=True)
+    score = Column(Float, nullable=False)
+    recommendation = Column(String(64), nullable=False)
+    reason = Column(Text, nullable=False)
+    model = Column(String(64), nullable=False)
+    prompt_version = Column(String(16), nullable=False)
+
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    expires_at = Column(DateTime(timezone=True), nullable=False)
@@ -0,0 +1,56 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, DateTime, Enum, Float, Integer, String, Text
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.db.database import Base
+from app.models.lead import BusinessDomain, ColdStage, LeadSource, SaleStage
+
+
+class LeadArchive(Base):
+    """
+    Архів лідів у стадії lost (services.archive_service).
+
+    Ті самі колонки, що й у leads, без згенерованих (input_fingerprint,
+    ai_reason_tsv) і без індексів, потрібних тільки робочому набору: з архіву
+    читають лише за ID. Рядки не змінюються після переносу.
+    """
+
+    __tablename__ = "leads_archive"
+
+    id = Column(UUID(as_uuid=True), primary_key=True)
+    source = Column(Enum(LeadSource), nullable=False)
+    stage = Column(Enum(ColdStage), nullable=False)
+    business_domain = Column(Enum(BusinessDomain), nullable=True)
+    messages_count = Column(Integer, nullable=False)
+    stage_changed_at = Column(DateTime(timezone=True))
+
+    ai_score = Column(Float, nullable=True)
+    ai_recommendation = Column(String(64), nullable=True)
+    ai_reason = Column(Text, nullable=True)
+    ai_analyzed_at = Column(DateTime(timezone=True), nullable=True)
+    ai_input_fingerprint = Column(String(32), nullable=True)
+
+    version = Column(Integer, nullable=False)
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+    archived_at = Column(DateTime(timezone=True), nullable=False,
+                         default=lambda: datetime.now(timezone.utc))
+
+
+class SaleArchive(Base):
+    """Архів продажів у стадіях paid і lost. lead_id без FK: лід лишається в leads."""
+
+    __tablename__ = "sales_archive"
+
+    id = Column(UUID(as_uuid=True), primary_key=True)
+    lead_id = Column(UUID(as_uuid=True), nullable=False, unique=True)
+    stage = Column(Enum(SaleStage), nullable=False)
+    stage_changed_at = Column(DateTime(timezone=True))
+    version = Column(Integer, nullable=False)
+
+    created_at = Column(DateTime(timezone=True))
+    updated_at = Column(DateTime(timezone=True))
+    archived_at = Column(DateTime(timezone=True), nullable=False,
+                         default=lambda: datetime.now(timezone.utc))
+
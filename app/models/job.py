@@ -0,0 +1,60 @@
+import uuid
+from datetime import datetime, timezone
+from enum import Enum as PyEnum
+
+from sqlalchemy import Column, String, Float, Integer, DateTime, ForeignKey, Enum, Text, Index
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.db.database import Base
+
+
+class JobStatus(str, PyEnum):
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+
+# Статуси, поки задача ще не завершена
+ACTIVE_JOB_STATUSES = (JobStatus.queued, JobStatus.running)
+
+
+class AnalysisJob(Base):
+    """Задача асинхронного AI-аналізу ліда. Воркер бере їх через FOR UPDATE SKIP LOCKED."""
+
+    __tablename__ = "analysis_jobs"
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    lead_id = Column(
+        UUID(as_uuid=True), ForeignKey("leads.id", ondelete="CASCADE"), nullable=False, index=True
+    )
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.queued)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=5)
+    run_after = Column(DateTime(timezone=True), nullable=False,
+                       default=lambda: datetime.now(timezone.utc))
+    locked_at = Column(DateTime(timezone=True), nullable=True)
+    last_error = Column(Text, nullable=True)
+
+    # Результат аналізу (той самий, що записаний у лід)
+    result_score = Column(Float, nullable=True)
+    result_recommendation = Column(String(64), nullable=True)
+    result_reason = Column(Text, nullable=True)
+
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc),
+                        onupdate=lambda: datetime.now(timezone.utc))
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Черга: тільки queued-задачі, впорядковані за часом запуску
+        Index(
+            "ix_analysis_jobs_queued_run_after", "run_after",
+            postgresql_where=(status == JobStatus.queued),
+        ),
+        # Не більше однієї активної задачі на лід
+        Index(
+            "uq_analysis_jobs_active_lead", "lead_id", unique=True,
+            postgresql_where=status.in_(ACTIVE_JOB_STATUSES),
+        ),
+    )
@@ -1,12 +1,13 @@
+import hashlib
 import uuid
 from datetime import datetime, timezone
 from enum import Enum as PyEnum
 
 from sqlalchemy import (
-    Column, String, Float, Integer, DateTime, ForeignKey, Enum, Text
+    Column, Computed, String, Float, Integer, DateTime, ForeignKey, Enum, Text, Index, text
 )
-from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import relationship
+from sqlalchemy.dialects.postgresql import TSVECTOR, UUID
+from sqlalchemy.orm import deferred, relationship
 
 from app.db.database import Base
 
@@ -58,6 +59,42 @@ SALE_STAGE_ORDER = [
 ]
 
 
+def _enum_text_sql(column: str, enum) -> str:
+    # enum::text не IMMUTABLE, а generated column вимагає IMMUTABLE-вираз
+    branches = " ".join(f"WHEN '{member.name}' THEN '{member.value}'" for member in enum)
+    return f"(CASE {column} {branches} END)"
+
+
+# Відбиток входів AI-аналізу — ті самі чотири поля, що йдуть у Claude.
+# SQL-версія рахується в колонці leads.input_fingerprint, Python-версія —
+# при збереженні оцінки; обидві дають md5 від "source|stage|messages_count|0/1"
+INPUT_FINGERPRINT_SQL = (
+    "md5("
+    f"{_enum_text_sql('source', LeadSource)} || '|' || "
+    f"{_enum_text_sql('stage', ColdStage)} || '|' || "
+    "messages_count::text || '|' || "
+    "(CASE WHEN business_domain IS NULL THEN '0' ELSE '1' END)"
+    ")"
+)
+
+
+def input_fingerprint(
+    source: str, stage: str, messages_count: int, has_business_domain: bool
+) -> str:
+    raw = f"{source}|{stage}|{messages_count}|{'1' if has_business_domain else '0'}"
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+# Повнотекстовий пошук по ai_reason. Claude пише пояснення англійською (див.
+# claude_service), тому словник english — зі стемінгом ("objections" → "object")
+REASON_SEARCH_CONFIG = "english"
+REASON_SEARCH_SQL = f"to_tsvector('{REASON_SEARCH_CONFIG}'::regconfig, coalesce(ai_reason, ''))"
+
+# Черга переоцінки (ix_leads_stale_analysis): найдавніше оцінені першими, а ліди
+# з невдалою спробою — не раніше ai_retry_after, тобто позаду вже застарілих
+STALE_ANALYSIS_ORDER_SQL = "coalesce(ai_retry_after, ai_analyzed_at)"
+
+
 class Lead(Base):
     __tablename__ = "leads"
 
@@ -66,12 +103,25 @@ class Lead(Base):
     stage = Column(Enum(ColdStage), nullable=False, default=ColdStage.new)
     business_domain = Column(Enum(BusinessDomain), nullable=True)
     messages_count = Column(Integer, nullable=False, default=0)
+    # Коли лід увійшов у поточну стадію (stage_history.from_entered_at при наступному переході)
+    stage_changed_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
     # AI fields
     ai_score = Column(Float, nullable=True)
     ai_recommendation = Column(String(64), nullable=True)
     ai_reason = Column(Text, nullable=True)
     ai_analyzed_at = Column(DateTime(timezone=True), nullable=True)
+    # Потрібен тільки в WHERE/ORDER BY пошуку — не вантажимо разом з лідом
+    ai_reason_tsv = deferred(Column(TSVECTOR, Computed(REASON_SEARCH_SQL, persisted=True)))
+    # Відбиток входів, з якими рахувалась поточна оцінка
+    ai_input_fingerprint = Column(String(32), nullable=True)
+    # Відбиток поточних входів; відрізняється від ai_input_fingerprint — оцінка застаріла
+    input_fingerprint = Column(String(32), Computed(INPUT_FINGERPRINT_SQL, persisted=True))
+    # Переоцінка не вдалась (Claude / prescore) — не пробувати раніше цього часу
+    ai_retry_after = Column(DateTime(timezone=True), nullable=True)
+
+    # Лічильник змін для compare-and-swap: кожен запис робить version = version + 1
+    version = Column(Integer, nullable=False, default=1)
 
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc),
@@ -79,6 +129,24 @@ class Lead(Base):
 
     sale = relationship("Sale", back_populates="lead", uselist=False)
 
+    __table_args__ = (
+        # Keyset-пагінація списку: ORDER BY created_at DESC, id DESC
+        Index("ix_leads_created_at_id", "created_at", "id"),
+        Index("ix_leads_stage_created_at_id", "stage", "created_at", "id"),
+        Index("ix_leads_source_created_at_id", "source", "created_at", "id"),
+        Index("ix_leads_ai_analyzed_at", "ai_analyzed_at"),
+        # Тільки ліди із застарілою оцінкою, які ще можна переоцінити (не transferred):
+        # розмір = кількість змін, а не таблиці. Порядок — коли лід наступний у черзі
+        Index(
+            "ix_leads_stale_analysis",
+            text(STALE_ANALYSIS_ORDER_SQL),
+            postgresql_where="ai_input_fingerprint <> input_fingerprint AND stage <> 'transferred'",
+        ),
+        Index("ix_leads_ai_reason_tsv", "ai_reason_tsv", postgresql_using="gin"),
+        # Кандидати в архів (archive_service) у порядку давності
+        Index("ix_leads_archive_candidates", "updated_at", postgresql_where="stage = 'lost'"),
+    )
+
 
 class Sale(Base):
     __tablename__ = "sales"
@@ -86,9 +154,19 @@ class Sale(Base):
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     lead_id = Column(UUID(as_uuid=True), ForeignKey("leads.id"), nullable=False, unique=True)
     stage = Column(Enum(SaleStage), nullable=False, default=SaleStage.new)
+    stage_changed_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    version = Column(Integer, nullable=False, default=1)
 
     created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
     updated_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc),
                         onupdate=lambda: datetime.now(timezone.utc))
 
     lead = relationship("Lead", back_populates="sale")
+
+    __table_args__ = (
+        Index(
+            "ix_sales_archive_candidates",
+            "updated_at",
+            postgresql_where="stage IN ('paid', 'lost')",
+        ),
+    )
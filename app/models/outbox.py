@@ -0,0 +1,36 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import BigInteger, Column, DateTime, Identity, Index, String, text
+from sqlalchemy.dialects.postgresql import JSONB, UUID
+
+from app.db.database import Base
+
+
+class OutboxEvent(Base):
+    """
+    Доменна подія, записана в тій самій транзакції, що й зміна.
+
+    id (послідовність) не збігається з порядком COMMIT-ів, тому стрічка
+    упорядкована за (txid, id): подія видається тільки коли txid старший за
+    всі транзакції, що ще виконуються (pg_snapshot_xmin), — пізніше
+    закомічена подія не може опинитися перед уже виданим курсором.
+    """
+
+    __tablename__ = "outbox_events"
+
+    id = Column(BigInteger, Identity(), primary_key=True)
+    # pg_current_xact_id() як bigint — порядок транзакцій для курсора
+    txid = Column(
+        BigInteger, nullable=False, server_default=text("pg_current_xact_id()::text::bigint")
+    )
+    event_type = Column(String(32), nullable=False)
+    entity_id = Column(UUID(as_uuid=True), nullable=False)
+    # Для подій продажу — лід, з якого він створений
+    lead_id = Column(UUID(as_uuid=True), nullable=True)
+    payload = Column(JSONB, nullable=False)
+    created_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+
+    __table_args__ = (
+        Index("ix_outbox_events_txid_id", "txid", "id"),
+        Index("ix_outbox_events_created_at", "created_at"),
+    )
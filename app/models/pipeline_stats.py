@@ -0,0 +1,25 @@
+from sqlalchemy import BigInteger, Column, SmallInteger, String
+
+from app.db.database import Base
+
+
+class PipelineStat(Base):
+    """
+    Лічильник лідів / продажів у розрізі (стадія, джерело, бізнес-домен).
+
+    Сервіси змінюють його дельтами в тій самій транзакції, що й сам запис
+    (services.pipeline_stats). Кожен ключ розбитий на шарди: транзакція
+    оновлює випадковий шард, тож паралельні записи рідко чекають один на
+    одного на тому самому рядку. Значення ключа — SUM(count) по шардах.
+    Розмір таблиці обмежений кількістю комбінацій, а не кількістю лідів.
+    """
+
+    __tablename__ = "pipeline_stats"
+
+    entity_type = Column(String(8), primary_key=True)  # lead | sale
+    stage = Column(String(16), primary_key=True)
+    source = Column(String(16), primary_key=True)
+    # Ліди без домену — NO_DOMAIN, бо колонка первинного ключа не може бути NULL
+    business_domain = Column(String(16), primary_key=True)
+    shard = Column(SmallInteger, primary_key=True)
+    count = Column(BigInteger, nullable=False, default=0)
@@ -0,0 +1,42 @@
+from sqlalchemy import BigInteger, Column, DateTime, Identity, Index, String
+from sqlalchemy.dialects.postgresql import UUID
+
+from app.db.database import Base
+
+
+class StageHistory(Base):
+    """
+    Журнал переходів між стадіями ліда / продажу, тільки INSERT.
+
+    Розбитий на місячні партиції за changed_at (services.stage_history
+    створює їх наперед), тому запити за часовим вікном читають лише
+    партиції цього вікна. from_entered_at — коли сутність увійшла у
+    from_stage, тож час у стадії рахується з одного рядка, без self-join.
+    Без FK на leads/sales: історія переживає архівування.
+    """
+
+    __tablename__ = "stage_history"
+
+    id = Column(BigInteger, Identity(), primary_key=True)
+    # Ключ партиціювання має входити в первинний ключ
+    changed_at = Column(DateTime(timezone=True), primary_key=True)
+    entity_type = Column(String(8), nullable=False)  # lead | sale
+    entity_id = Column(UUID(as_uuid=True), nullable=False)
+    lead_id = Column(UUID(as_uuid=True), nullable=False)
+    # NULL — сутність щойно створена (продаж при передачі)
+    from_stage = Column(String(16), nullable=True)
+    to_stage = Column(String(16), nullable=False)
+    # NULL — момент входу в стадію невідомий (рядки до міграції 0009)
+    from_entered_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Аналітика за вікном: index-only scan без звернення до рядків
+        Index(
+            "ix_stage_history_entity_type_changed_at",
+            "entity_type",
+            "changed_at",
+            postgresql_include=["from_stage", "to_stage", "from_entered_at"],
+        ),
+        Index("ix_stage_history_entity_id_changed_at", "entity_id", "changed_at"),
+        {"postgresql_partition_by": "RANGE (changed_at)"},
+    )
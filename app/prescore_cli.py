@@ -0,0 +1,40 @@
+"""
+Локальна попередня оцінка: навчання і перевірка на всій таблиці.
+
+    python -m app.prescore_cli fit [--path model.json]
+    python -m app.prescore_cli score
+
+fit — навчає модель на ai_score і результатах продажів, пише JSON у
+PRESCORE_MODEL_PATH (або --path). score — скільки лідів модель вирішила б сама
+і скільки пішло б у Claude при поточних PRESCORE_BAND_LOW / PRESCORE_BAND_HIGH.
+Процеси API/воркера підхоплюють нову модель після рестарту.
+"""
+
+import argparse
+import asyncio
+import json
+
+from app.ai import prescore
+from app.db import AsyncReadSessionLocal
+from app.services.prescore_service import fit_from_history, score_all_leads
+
+
+async def main(args) -> None:
+    if args.command == "fit":
+        async with AsyncReadSessionLocal() as db:
+            model = await fit_from_history(db, args.path)
+        print(json.dumps(model.to_dict(), indent=2))
+        return
+
+    model = prescore.get_model()
+    if model is None:
+        raise SystemExit("No pre-score model: set PRESCORE_MODEL_PATH and run `fit` first")
+    async with AsyncReadSessionLocal() as db:
+        print(json.dumps(await score_all_leads(db, model), indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("command", choices=["fit", "score"])
+    parser.add_argument("--path", help="куди зберегти модель (за замовчуванням PRESCORE_MODEL_PATH)")
+    asyncio.run(main(parser.parse_args()))
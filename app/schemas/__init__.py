@@ -1,9 +1,23 @@
 from app.schemas.lead import (
-    LeadCreate, LeadStageUpdate, LeadMessagesUpdate,
-    AIResult, LeadResponse, SaleStageUpdate, SaleResponse
+    LeadCreate, LeadStageUpdate, LeadMessagesUpdate, BulkLeadStageItem, BulkLeadStageRequest,
+    AIResult, AnalysisJobResponse, BatchAnalysisRequest, BatchAnalysisResult,
+    LeadResponse, LeadPage, LeadSearchHit, LeadSearchPage, BulkLeadItemResult, BulkLeadResult,
+    SaleStageUpdate, BulkSaleStageItem, BulkSaleStageRequest,
+    BulkStageItemResult, BulkStageResult, SaleResponse,
+    EventResponse, EventPage,
+    StageDwellStats, StageDwellReport, StageTransitionCount, StageTransitionReport,
+    PipelineStageCount, PipelineConversion, PipelineStats,
 )
 
 __all__ = [
     "LeadCreate", "LeadStageUpdate", "LeadMessagesUpdate",
-    "AIResult", "LeadResponse", "SaleStageUpdate", "SaleResponse"
+    "BulkLeadStageItem", "BulkLeadStageRequest",
+    "AIResult", "AnalysisJobResponse", "BatchAnalysisRequest", "BatchAnalysisResult",
+    "LeadResponse", "LeadPage", "LeadSearchHit", "LeadSearchPage",
+    "BulkLeadItemResult", "BulkLeadResult",
+    "SaleStageUpdate", "BulkSaleStageItem", "BulkSaleStageRequest",
+    "BulkStageItemResult", "BulkStageResult", "SaleResponse",
+    "EventResponse", "EventPage",
+    "StageDwellStats", "StageDwellReport", "StageTransitionCount", "StageTransitionReport",
+    "PipelineStageCount", "PipelineConversion", "PipelineStats",
 ]
@@ -0,0 +1,46 @@
+"""
+Швидка серіалізація відповідей з рядків БД, минаючи Pydantic-валідацію.
+
+Дані, прочитані з нашої ж БД, вже відповідають схемі, тому для великих
+списків і експорту рядки (кортежі колонок у порядку полів схеми) кодуються
+одразу через orjson. Формат побайтно збігається з LeadResponse / SaleResponse
+(UTC-час з "Z", enum → значення, UUID → рядок).
+"""
+
+from typing import Iterable, Sequence
+
+import orjson
+
+from app.schemas.lead import LeadResponse, LeadSearchHit, SaleResponse
+
+# Порядок колонок у SELECT має збігатися з порядком полів схеми
+LEAD_FIELDS: tuple[str, ...] = tuple(LeadResponse.model_fields)
+SALE_FIELDS: tuple[str, ...] = tuple(SaleResponse.model_fields)
+LEAD_SEARCH_FIELDS: tuple[str, ...] = tuple(LeadSearchHit.model_fields)
+
+_OPTIONS = orjson.OPT_UTC_Z
+
+
+def encode_items(fields: Sequence[str], rows: Iterable[Sequence]) -> list[dict]:
+    return [dict(zip(fields, row)) for row in rows]
+
+
+def encode_lead_page(rows: Iterable[Sequence], next_cursor: str | None) -> bytes:
+    """Тіло LeadPage."""
+    return orjson.dumps(
+        {"items": encode_items(LEAD_FIELDS, rows), "next_cursor": next_cursor},
+        option=_OPTIONS,
+    )
+
+
+def encode_lead_search_page(rows: Iterable[Sequence], next_cursor: str | None) -> bytes:
+    """Тіло LeadSearchPage."""
+    return orjson.dumps(
+        {"items": encode_items(LEAD_SEARCH_FIELDS, rows), "next_cursor": next_cursor},
+        option=_OPTIONS,
+    )
+
+
+def encode_ndjson(fields: Sequence[str], rows: Iterable[Sequence]) -> bytes:
+    option = _OPTIONS | orjson.OPT_APPEND_NEWLINE
+    return b"".join(orjson.dumps(dict(zip(fields, row)), option=option) for row in rows)
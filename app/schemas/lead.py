@@ -2,11 +2,12 @@ from __future__ import annotations
 
 import uuid
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional
 
 from pydantic import BaseModel, Field
 
 from app.models.lead import LeadSource, BusinessDomain, ColdStage, SaleStage
+from app.models.job import JobStatus
 
 
 # ── Lead schemas ──────────────────────────────────────────────────────────────
@@ -18,6 +19,18 @@ class LeadCreate(BaseModel):
 
 class LeadStageUpdate(BaseModel):
     stage: ColdStage
+    # Якщо вказано — зміна застосовується тільки до цієї версії ліда, інакше 409
+    expected_version: Optional[int] = None
+
+
+class BulkLeadStageItem(BaseModel):
+    id: uuid.UUID
+    stage: ColdStage
+    expected_version: Optional[int] = None
+
+
+class BulkLeadStageRequest(BaseModel):
+    items: list[BulkLeadStageItem] = Field(..., min_length=1, max_length=1000)
 
 
 class LeadMessagesUpdate(BaseModel):
@@ -30,6 +43,47 @@ class AIResult(BaseModel):
     reason: str
 
 
+class AnalysisJobResponse(BaseModel):
+    id: uuid.UUID
+    lead_id: uuid.UUID
+    status: JobStatus
+    attempts: int
+    max_attempts: int
+    run_after: datetime
+    last_error: Optional[str]
+    result_score: Optional[float]
+    result_recommendation: Optional[str]
+    result_reason: Optional[str]
+    created_at: datetime
+    updated_at: datetime
+    finished_at: Optional[datetime]
+
+    model_config = {"from_attributes": True}
+
+
+class BatchAnalysisRequest(BaseModel):
+    """Або lead_ids, або фільтри (як у списку лідів)."""
+    lead_ids: Optional[list[uuid.UUID]] = Field(None, max_length=1000)
+    stage: Optional[ColdStage] = None
+    source: Optional[LeadSource] = None
+    business_domain: Optional[BusinessDomain] = None
+    min_score: Optional[float] = Field(None, ge=0.0, le=1.0)
+    max_score: Optional[float] = Field(None, ge=0.0, le=1.0)
+    limit: int = Field(1000, ge=1, le=1000)
+
+
+class BatchAnalysisResult(BaseModel):
+    requested: int
+    found: int
+    unique_inputs: int
+    analyzed: int
+    failed: int
+    missing_ids: list[uuid.UUID]
+    errors: list[str]
+    duration_seconds: float
+    leads_per_second: float
+
+
 class LeadResponse(BaseModel):
     id: uuid.UUID
     source: LeadSource
@@ -40,23 +94,160 @@ class LeadResponse(BaseModel):
     ai_recommendation: Optional[str]
     ai_reason: Optional[str]
     ai_analyzed_at: Optional[datetime]
+    version: int
     created_at: datetime
     updated_at: datetime
 
     model_config = {"from_attributes": True}
 
 
+class LeadPage(BaseModel):
+    items: list[LeadResponse]
+    next_cursor: Optional[str] = None
+
+
+class LeadSearchHit(LeadResponse):
+    # ts_rank_cd за ai_reason: більше — релевантніше
+    rank: float
+
+
+class LeadSearchPage(BaseModel):
+    items: list[LeadSearchHit]
+    next_cursor: Optional[str] = None
+
+
+class BulkLeadItemResult(BaseModel):
+    index: int
+    status: Literal["created", "invalid", "failed"]
+    id: Optional[uuid.UUID] = None
+    errors: Optional[list[str]] = None
+
+
+class BulkLeadResult(BaseModel):
+    created: int
+    invalid: int
+    failed: int
+    items: list[BulkLeadItemResult]
+
+
 # ── Sale schemas ──────────────────────────────────────────────────────────────
 
 class SaleStageUpdate(BaseModel):
     stage: SaleStage
+    expected_version: Optional[int] = None
+
+
+class BulkSaleStageItem(BaseModel):
+    id: uuid.UUID
+    stage: SaleStage
+    expected_version: Optional[int] = None
+
+
+class BulkSaleStageRequest(BaseModel):
+    items: list[BulkSaleStageItem] = Field(..., min_length=1, max_length=1000)
+
+
+class BulkStageItemResult(BaseModel):
+    index: int
+    id: uuid.UUID
+    status: Literal["applied", "invalid_transition", "locked", "not_found", "conflict", "duplicate"]
+    # Стадія і версія після операції (для відхилених — поточні)
+    stage: Optional[str] = None
+    version: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BulkStageResult(BaseModel):
+    applied: int
+    rejected: int
+    items: list[BulkStageItemResult]
 
 
 class SaleResponse(BaseModel):
     id: uuid.UUID
     lead_id: uuid.UUID
     stage: SaleStage
+    version: int
     created_at: datetime
     updated_at: datetime
 
     model_config = {"from_attributes": True}
+
+
+# ── Event schemas ─────────────────────────────────────────────────────────────
+
+class EventResponse(BaseModel):
+    # Непрозора позиція події; передається в cursor / Last-Event-ID для продовження
+    cursor: str
+    type: str
+    entity_id: uuid.UUID
+    lead_id: Optional[uuid.UUID] = None
+    payload: dict
+    created_at: datetime
+
+
+class EventPage(BaseModel):
+    items: list[EventResponse]
+    # Позиція після останньої події сторінки; якщо подій немає — вхідний курсор
+    next_cursor: Optional[str] = None
+
+
+# ── Analytics schemas ─────────────────────────────────────────────────────────
+
+class StageDwellStats(BaseModel):
+    stage: str
+    transitions: int
+    avg_seconds: float
+    p50_seconds: float
+    p90_seconds: float
+
+
+class StageDwellReport(BaseModel):
+    entity: Literal["lead", "sale"]
+    start: datetime
+    end: datetime
+    stages: list[StageDwellStats]
+
+
+class StageTransitionCount(BaseModel):
+    # None — вхід у першу стадію (створення продажу)
+    from_stage: Optional[str] = None
+    to_stage: str
+    count: int
+
+
+class StageTransitionReport(BaseModel):
+    entity: Literal["lead", "sale"]
+    start: datetime
+    end: datetime
+    transitions: list[StageTransitionCount]
+
+
+class PipelineStageCount(BaseModel):
+    entity: Literal["lead", "sale"]
+    stage: str
+    source: LeadSource
+    business_domain: Optional[BusinessDomain] = None
+    count: int
+
+
+class PipelineConversion(BaseModel):
+    # Сегмент: source у conversion_by_source, business_domain у conversion_by_domain
+    # (там None — ліди без домену); у conversion обидва None
+    source: Optional[LeadSource] = None
+    business_domain: Optional[BusinessDomain] = None
+    leads: int
+    sales: int
+    paid: int
+    lead_to_sale: float
+    sale_to_paid: float
+    lead_to_paid: float
+
+
+class PipelineStats(BaseModel):
+    lead_stages: dict[str, int]
+    sale_stages: dict[str, int]
+    breakdown: list[PipelineStageCount]
+    conversion: PipelineConversion
+    conversion_by_source: list[PipelineConversion]
+    conversion_by_domain: list[PipelineConversion]
@@ -1,15 +1,21 @@
 from app.services.lead_service import (
-    create_lead, get_lead, list_leads,
-    update_lead_stage, update_messages_count,
-    run_ai_analysis, transfer_to_sales,
-    get_sale, get_sale_by_lead, update_sale_stage,
-    StageValidationError, TransferValidationError,
+    create_lead, bulk_create_leads, get_lead, get_lead_stamp, list_lead_rows,
+    search_lead_rows,
+    update_lead_stage, bulk_update_lead_stages, update_messages_count,
+    run_ai_analysis, run_batch_ai_analysis, transfer_to_sales,
+    get_sale, get_sale_by_lead, get_sale_stamp, get_sale_stamp_by_lead, update_sale_stage,
+    bulk_update_sale_stages,
+    StageValidationError, TransferValidationError, ConcurrencyConflictError,
+    InvalidCursorError,
 )
 
 __all__ = [
-    "create_lead", "get_lead", "list_leads",
-    "update_lead_stage", "update_messages_count",
-    "run_ai_analysis", "transfer_to_sales",
-    "get_sale", "get_sale_by_lead", "update_sale_stage",
-    "StageValidationError", "TransferValidationError",
+    "create_lead", "bulk_create_leads", "get_lead", "get_lead_stamp",
+    "list_lead_rows", "search_lead_rows",
+    "update_lead_stage", "bulk_update_lead_stages", "update_messages_count",
+    "run_ai_analysis", "run_batch_ai_analysis", "transfer_to_sales",
+    "get_sale", "get_sale_by_lead", "get_sale_stamp", "get_sale_stamp_by_lead",
+    "update_sale_stage", "bulk_update_sale_stages",
+    "StageValidationError", "TransferValidationError", "ConcurrencyConflictError",
+    "InvalidCursorError",
 ]
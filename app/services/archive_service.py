@@ -0,0 +1,225 @@
+"""
+Архівування: перенос закритих лідів і продажів з гарячих таблиць в архівні.
+
+Кандидати — ліди в стадії lost і продажі в paid / lost, які не змінювались
+довше за ARCHIVE_AFTER_DAYS. Обидві стадії кінцеві, тож рядок у архіві вже
+ніколи не зміниться; читання за ID (lead_service.get_lead(...,
+include_archived=True) тощо) дочитують його з архіву, а лічильники воронки
+(pipeline_stats) враховують архів при звірці — перенос їх не змінює.
+
+Одна пачка — один statement: DELETE ... RETURNING з гарячої таблиці і
+INSERT у архівну в одному CTE, тож рядок не може загубитись чи задвоїтись.
+Кандидати беруться FOR UPDATE SKIP LOCKED (рядки, які хтось зараз змінює,
+чекають наступного проходу), з коротким lock_timeout і COMMIT після кожної
+пачки — блокування тримаються мілісекунди. Стан між пачками не потрібен:
+перерваний прохід просто продовжується наступним запуском.
+
+DELETE не зменшує файл таблиці: місце стає придатним для повторного
+використання після VACUUM (autovacuum або archive_cli --vacuum). Тому звіт
+містить і обсяг перенесених рядків, і фактичний розмір таблиці до / після.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import cast, delete, exists, func, insert, literal, select, text
+from sqlalchemy.dialects.postgresql import REGCLASS
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.archive import LeadArchive, SaleArchive
+from app.models.lead import Lead, Sale, ColdStage, SaleStage
+
+LEADS = "leads"
+SALES = "sales"
+
+
+@dataclass(frozen=True)
+class _Target:
+    model: type
+    archive: type
+    stages: tuple
+
+    @property
+    def table(self) -> str:
+        return self.model.__tablename__
+
+    @property
+    def columns(self) -> list[str]:
+        # Спільні колонки; згенеровані колонки leads в архів не переносяться
+        return [c.name for c in self.archive.__table__.columns if c.name != "archived_at"]
+
+
+TARGETS = {
+    LEADS: _Target(Lead, LeadArchive, (ColdStage.lost,)),
+    SALES: _Target(Sale, SaleArchive, (SaleStage.paid, SaleStage.lost)),
+}
+
+
+@dataclass
+class ArchiveReport:
+    table: str
+    rows: int = 0
+    batches: int = 0
+    seconds: float = 0.0
+    # Обсяг перенесених рядків (pg_column_size) — стільки місця звільнить VACUUM
+    moved_bytes: int = 0
+    # pg_total_relation_size (з індексами і TOAST) до і після проходу
+    size_before: int = 0
+    size_after: int = 0
+    vacuumed: bool = False
+    errors: list[str] = field(default_factory=list)
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows / self.seconds if self.seconds else 0.0
+
+    @property
+    def reclaimed_bytes(self) -> int:
+        return self.size_before - self.size_after
+
+    def to_dict(self) -> dict:
+        return {
+            "table": self.table,
+            "rows": self.rows,
+            "batches": self.batches,
+            "seconds": round(self.seconds, 3),
+            "rows_per_second": round(self.rows_per_second, 1),
+            "moved_bytes": self.moved_bytes,
+            "size_before": self.size_before,
+            "size_after": self.size_after,
+            "reclaimed_bytes": self.reclaimed_bytes,
+            "vacuumed": self.vacuumed,
+            "errors": self.errors,
+        }
+
+
+def _candidates(target: _Target, cutoff: datetime):
+    model = target.model
+    conditions = [model.stage.in_(target.stages), model.updated_at < cutoff]
+    if model is Lead:
+        # lost-лід не міг бути переданим у продажі, але FK sales.lead_id не
+        # дасть видалити ліда з продажем — такий рядок просто пропускаємо
+        conditions.append(~exists().where(Sale.lead_id == Lead.id))
+    return select(model.id).where(*conditions)
+
+
+def batch_statement(target: _Target, cutoff: datetime, batch_size: int):
+    """
+    WITH moved AS (DELETE ... RETURNING), archived AS (INSERT INTO архів SELECT ... FROM moved)
+    SELECT count(*), sum(pg_column_size(moved)) FROM moved
+    """
+    model = target.model
+    columns = target.columns
+    ids = (
+        _candidates(target, cutoff)
+        # Найдавніші першими — частковий індекс *_archive_candidates
+        .order_by(model.updated_at)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    )
+    moved = (
+        delete(model)
+        .where(model.id.in_(ids.scalar_subquery()))
+        .returning(*(model.__table__.c[name] for name in columns))
+        .cte("moved")
+    )
+    archived = (
+        insert(target.archive.__table__)
+        .from_select(
+            [*columns, "archived_at"],
+            select(*(moved.c[name] for name in columns), func.now()),
+        )
+        .cte("archived")
+    )
+    return (
+        select(
+            func.count().label("rows"),
+            func.coalesce(func.sum(func.pg_column_size(moved.table_valued())), 0).label("bytes"),
+        )
+        .select_from(moved)
+        .add_cte(archived)
+    )
+
+
+async def table_size(db: AsyncSession, table: str) -> int:
+    return await db.scalar(select(func.pg_total_relation_size(cast(literal(table), REGCLASS))))
+
+
+async def count_candidates(db: AsyncSession, table: str, older_than: timedelta) -> int:
+    target = TARGETS[table]
+    cutoff = datetime.now(timezone.utc) - older_than
+    return await db.scalar(select(func.count()).select_from(_candidates(target, cutoff).subquery()))
+
+
+async def archive_batch(db: AsyncSession, table: str, cutoff: datetime, batch_size: int) -> tuple[int, int]:
+    """Переносить одну пачку і комітить. Повертає (рядків, байтів)."""
+    await db.execute(text(f"SET LOCAL lock_timeout = {int(settings.ARCHIVE_LOCK_TIMEOUT_MS)}"))
+    row = (await db.execute(batch_statement(TARGETS[table], cutoff, batch_size))).one()
+    await db.commit()
+    return row.rows, int(row.bytes)
+
+
+async def vacuum(db: AsyncSession, table: str) -> None:
+    """VACUUM (ANALYZE) таблиці; поза транзакцією, тому на окремому AUTOCOMMIT-з'єднанні сесії."""
+    await db.commit()
+    conn = await db.connection(execution_options={"isolation_level": "AUTOCOMMIT"})
+    await conn.execute(text(f"VACUUM (ANALYZE) {TARGETS[table].table}"))
+
+
+async def archive_table(
+    db: AsyncSession,
+    table: str,
+    older_than: timedelta,
+    *,
+    batch_size: int,
+    pause_seconds: float = 0.0,
+    max_batches: int | None = None,
+    run_vacuum: bool = False,
+    stop: asyncio.Event | None = None,
+) -> ArchiveReport:
+    """
+    Переносить кандидатів пачками по batch_size, з паузою між пачками, поки
+    вони не закінчаться, не вичерпано max_batches або не виставлено stop.
+    Помилка пачки (наприклад, lock_timeout) завершує прохід; вже перенесені
+    пачки закомічені.
+    """
+    report = ArchiveReport(table=table)
+    report.size_before = await table_size(db, table)
+    await db.commit()
+
+    # Межа фіксується на старті: рядки, що «дозріли» під час проходу, — наступного разу
+    cutoff = datetime.now(timezone.utc) - older_than
+    started = time.perf_counter()
+    while max_batches is None or report.batches < max_batches:
+        if stop is not None and stop.is_set():
+            break
+        try:
+            rows, moved_bytes = await archive_batch(db, table, cutoff, batch_size)
+        except SQLAlchemyError as e:
+            await db.rollback()
+            report.errors.append(f"{type(e).__name__}: {e}")
+            break
+        report.batches += 1
+        report.rows += rows
+        report.moved_bytes += moved_bytes
+        if rows < batch_size:
+            break
+        if pause_seconds:
+            await asyncio.sleep(pause_seconds)
+    report.seconds = time.perf_counter() - started
+
+    if run_vacuum and report.rows:
+        await vacuum(db, table)
+        report.vacuumed = True
+    report.size_after = await table_size(db, table)
+    await db.commit()
+    return report
+
+
+async def archive_all(db: AsyncSession, older_than: timedelta, **options) -> list[ArchiveReport]:
+    """Архівує продажі, потім ліди. Параметри — як у archive_table."""
+    return [await archive_table(db, table, older_than, **options) for table in (SALES, LEADS)]
@@ -0,0 +1,257 @@
+"""
+Стрічка змін: transactional outbox + SSE.
+
+Сервіси пишуть події (record) у outbox_events у тій самій транзакції, що й
+зміну, і ставлять NOTIFY у канал CHANNEL — він доставляється тільки після
+COMMIT. Споживачі читають:
+  - fetch_changes — сторінку подій після курсора (відновлюваний polling);
+  - broadcaster — один фоновий читач на процес, що після NOTIFY забирає нові
+    події одним запитом і розсилає готові SSE-кадри всім підключеним клієнтам.
+
+Курсор — (txid, id), див. OutboxEvent: події видаються тільки з транзакцій,
+старших за всі активні, тому курсор ніколи не «перескакує» пізніше
+закомічену подію.
+"""
+
+import asyncio
+import base64
+import binascii
+import contextlib
+import logging
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Sequence
+
+from sqlalchemy import delete, func, insert, select, text, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.outbox import OutboxEvent
+from app.schemas.lead import EventResponse
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "crm_outbox"
+
+LEAD_CREATED = "lead.created"
+LEAD_STAGE_CHANGED = "lead.stage_changed"
+LEAD_ANALYZED = "lead.analyzed"
+LEAD_TRANSFERRED = "lead.transferred"
+SALE_STAGE_CHANGED = "sale.stage_changed"
+EVENT_TYPES = (LEAD_CREATED, LEAD_STAGE_CHANGED, LEAD_ANALYZED, LEAD_TRANSFERRED, SALE_STAGE_CHANGED)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# Подія видима, коли txid старший за всі активні транзакції
+_VISIBLE = OutboxEvent.txid < text("pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+
+
+class InvalidEventCursorError(ValueError):
+    """Курсор стрічки змін пошкоджений."""
+    pass
+
+
+# ── Запис ─────────────────────────────────────────────────────────────────────
+
+def event(event_type: str, entity_id: uuid.UUID, lead_id: uuid.UUID | None = None, **payload) -> dict:
+    """Рядок outbox_events. lead_id за замовчуванням — сам entity_id (події ліда)."""
+    return {
+        "event_type": event_type,
+        "entity_id": entity_id,
+        "lead_id": lead_id or entity_id,
+        "payload": payload,
+        "created_at": datetime.now(timezone.utc),
+    }
+
+
+async def record(db: AsyncSession, events: list[dict]) -> None:
+    """Пише події в поточну транзакцію. Комітить викликач — разом зі зміною."""
+    if not events:
+        return
+    await db.execute(insert(OutboxEvent.__table__), events)
+    # Однакові NOTIFY в одній транзакції Postgres зливає в один
+    await db.execute(select(func.pg_notify(CHANNEL, "")))
+
+
+# ── Читання ───────────────────────────────────────────────────────────────────
+
+Position = tuple[int, int]
+
+
+def encode_cursor(position: Position) -> str:
+    raw = f"{position[0]}:{position[1]}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Position:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        txid, _, event_id = raw.partition(":")
+        return int(txid), int(event_id)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidEventCursorError("Invalid event cursor")
+
+
+def to_response(row) -> EventResponse:
+    return EventResponse(
+        cursor=encode_cursor((row.txid, row.id)),
+        type=row.event_type,
+        entity_id=row.entity_id,
+        lead_id=row.lead_id,
+        payload=row.payload,
+        created_at=row.created_at,
+    )
+
+
+async def fetch_changes(
+    db: AsyncSession,
+    after: Position | None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    event_types: Sequence[str] | None = None,
+) -> list:
+    """Видимі події після позиції after (None — з початку), у порядку (txid, id)."""
+    query = select(OutboxEvent).where(_VISIBLE)
+    if after is not None:
+        query = query.where(tuple_(OutboxEvent.txid, OutboxEvent.id) > after)
+    if event_types:
+        query = query.where(OutboxEvent.event_type.in_(event_types))
+    query = query.order_by(OutboxEvent.txid, OutboxEvent.id).limit(limit)
+    return list((await db.execute(query)).scalars().all())
+
+
+async def tail_position(db: AsyncSession) -> Position:
+    """Позиція останньої видимої події — «з цього моменту» для нового споживача."""
+    row = (
+        await db.execute(
+            select(OutboxEvent.txid, OutboxEvent.id)
+            .where(_VISIBLE)
+            .order_by(OutboxEvent.txid.desc(), OutboxEvent.id.desc())
+            .limit(1)
+        )
+    ).first()
+    return (row.txid, row.id) if row else (0, 0)
+
+
+async def purge_events(db: AsyncSession, older_than: timedelta, batch_size: int = 10_000) -> int:
+    """Видаляє події, старші за older_than, пачками. Повертає кількість."""
+    cutoff = datetime.now(timezone.utc) - older_than
+    total = 0
+    while True:
+        ids = select(OutboxEvent.id).where(OutboxEvent.created_at < cutoff).limit(batch_size)
+        result = await db.execute(delete(OutboxEvent).where(OutboxEvent.id.in_(ids.scalar_subquery())))
+        await db.commit()
+        total += result.rowcount
+        if result.rowcount < batch_size:
+            return total
+
+
+# ── Розсилка SSE ──────────────────────────────────────────────────────────────
+
+@dataclass(eq=False)
+class Subscriber:
+    # Позиція, з якої клієнт дочитує з БД: broadcaster без позиції стартує з найменшої
+    start: Position
+    event_types: frozenset[str] | None
+    queue: asyncio.Queue = field(
+        default_factory=lambda: asyncio.Queue(settings.EVENTS_SUBSCRIBER_QUEUE_SIZE)
+    )
+    # Черга переповнилась — клієнт відстав, стрім закривається, клієнт
+    # перепідключається з Last-Event-ID і дочитує з БД
+    overflowed: bool = False
+
+
+def sse_frame(response: EventResponse) -> bytes:
+    return (
+        f"id: {response.cursor}\nevent: {response.type}\ndata: {response.model_dump_json()}\n\n"
+    ).encode()
+
+
+class EventBroadcaster:
+    """
+    Один читач outbox на процес. Після NOTIFY (або раз на
+    EVENTS_POLL_INTERVAL_SECONDS, якщо подію затримала довга транзакція)
+    забирає нові події і кладе в черги підписників готові SSE-кадри —
+    серіалізація одна на подію, а не на клієнта.
+    """
+
+    def __init__(self):
+        self._subscribers: set[Subscriber] = set()
+        self._wakeup = asyncio.Event()
+        self._position: Position | None = None
+        self._task: asyncio.Task | None = None
+        self._session_factory: Callable[[], AsyncSession] | None = None
+
+    def subscribe(self, start: Position, event_types: Sequence[str] | None = None) -> Subscriber:
+        """
+        Підписка для клієнта, який дочитує з БД після start. Після підписки в
+        його чергу потрапляють усі події, новіші за позицію broadcaster-а, а
+        вона не новіша за start — тож між дочитуванням і чергою немає пропуску.
+        """
+        subscriber = Subscriber(start, frozenset(event_types) if event_types else None)
+        self._subscribers.add(subscriber)
+        self._wakeup.set()
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        self._subscribers.discard(subscriber)
+
+    def on_notification(self, payload: str) -> None:
+        self._wakeup.set()
+
+    def on_reset(self) -> None:
+        self._wakeup.set()
+
+    async def _poll(self) -> None:
+        async with self._session_factory() as db:
+            if self._position is None:
+                # Не хвіст на момент опитування: події між дочитуванням клієнта і
+                # ним не потрапили б ні в дочитування, ні в чергу
+                self._position = min(subscriber.start for subscriber in self._subscribers)
+            while self._subscribers:
+                rows = await fetch_changes(db, self._position, MAX_PAGE_SIZE)
+                for row in rows:
+                    frame = sse_frame(to_response(row))
+                    position = (row.txid, row.id)
+                    for subscriber in list(self._subscribers):
+                        if subscriber.event_types and row.event_type not in subscriber.event_types:
+                            continue
+                        try:
+                            subscriber.queue.put_nowait((position, frame))
+                        except asyncio.QueueFull:
+                            subscriber.overflowed = True
+                            self._subscribers.discard(subscriber)
+                if rows:
+                    self._position = (rows[-1].txid, rows[-1].id)
+                if len(rows) < MAX_PAGE_SIZE:
+                    return
+
+    async def _run(self) -> None:
+        while True:
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(self._wakeup.wait(), settings.EVENTS_POLL_INTERVAL_SECONDS)
+            self._wakeup.clear()
+            if not self._subscribers:
+                # Без клієнтів позицію не ведемо — наступний почне зі своєї стартової
+                self._position = None
+                continue
+            try:
+                await self._poll()
+            except Exception:
+                logger.exception("Outbox poll failed")
+
+    def start(self, session_factory: Callable[[], AsyncSession]) -> None:
+        self._session_factory = session_factory
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._task
+            self._task = None
+
+
+broadcaster = EventBroadcaster()
@@ -0,0 +1,121 @@
+"""
+Export Service — потокове вивантаження лідів і продажів (NDJSON / CSV).
+
+Рядки читаються серверним курсором (AsyncSession.stream) пачками по
+EXPORT_YIELD_PER і одразу кодуються в байти. У пам'яті живе тільки поточна
+пачка і буфер до EXPORT_CHUNK_BYTES, тому споживання не залежить від
+кількості рядків, а перший chunk відправляється після першої пачки.
+"""
+
+import csv
+import io
+import uuid
+import zlib
+from datetime import datetime
+from enum import Enum
+from typing import AsyncIterator, Sequence
+
+from sqlalchemy import Select, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.lead import Lead, Sale, SaleStage
+from app.schemas.fast import LEAD_FIELDS, SALE_FIELDS, encode_ndjson
+from app.services.lead_service import build_lead_filters
+
+# Скільки рядків тягнемо з курсора за раз
+EXPORT_YIELD_PER = 1000
+
+# Розмір chunk-а, який віддаємо клієнту
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+# Ті самі поля й порядок, що в LeadResponse / SaleResponse
+LEAD_EXPORT_COLUMNS = tuple(getattr(Lead, name) for name in LEAD_FIELDS)
+SALE_EXPORT_COLUMNS = tuple(getattr(Sale, name) for name in SALE_FIELDS)
+
+
+def _plain(value):
+    """Значення колонки → CSV-сумісний скаляр."""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _encode_csv(rows) -> bytes:
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    for row in rows:
+        writer.writerow(["" if v is None else _plain(v) for v in row])
+    return buf.getvalue().encode()
+
+
+async def _export(
+    db: AsyncSession,
+    query: Select,
+    names: Sequence[str],
+    fmt: str,
+    compress: bool,
+) -> AsyncIterator[bytes]:
+    compressor = zlib.compressobj(wbits=31) if compress else None  # 31 = gzip
+    buffer = bytearray()
+
+    def flush(sync: bool = False) -> bytes:
+        data = bytes(buffer)
+        buffer.clear()
+        if not compressor:
+            return data
+        out = compressor.compress(data)
+        return out + compressor.flush(zlib.Z_SYNC_FLUSH) if sync else out
+
+    if fmt == "csv":
+        buffer += _encode_csv([names])
+
+    first = True
+    result = await db.stream(query.execution_options(yield_per=EXPORT_YIELD_PER))
+    async for rows in result.partitions():
+        buffer += _encode_csv(rows) if fmt == "csv" else encode_ndjson(names, rows)
+        # Першу пачку віддаємо одразу, щоб клієнт не чекав на повний chunk
+        if first or len(buffer) >= EXPORT_CHUNK_BYTES:
+            chunk = flush(sync=first)
+            first = False
+            if chunk:
+                yield chunk
+
+    tail = flush()
+    if compressor:
+        tail += compressor.flush()
+    if tail:
+        yield tail
+
+
+def export_leads(
+    db: AsyncSession, fmt: str = "ndjson", compress: bool = False, **filters
+) -> AsyncIterator[bytes]:
+    query = (
+        select(*LEAD_EXPORT_COLUMNS)
+        .where(*build_lead_filters(**filters))
+        .order_by(Lead.created_at, Lead.id)
+    )
+    names = [c.key for c in LEAD_EXPORT_COLUMNS]
+    return _export(db, query, names, fmt, compress)
+
+
+def export_sales(
+    db: AsyncSession,
+    fmt: str = "ndjson",
+    compress: bool = False,
+    stage: SaleStage | None = None,
+) -> AsyncIterator[bytes]:
+    query = select(*SALE_EXPORT_COLUMNS).order_by(Sale.created_at, Sale.id)
+    if stage is not None:
+        query = query.where(Sale.stage == stage)
+    names = [c.key for c in SALE_EXPORT_COLUMNS]
+    return _export(db, query, names, fmt, compress)
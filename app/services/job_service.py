@@ -0,0 +1,145 @@
+"""
+Job Service — черга асинхронного AI-аналізу в таблиці analysis_jobs.
+
+  - API ставить задачу (enqueue_analysis) і одразу відповідає 202
+  - воркер (app.worker) забирає задачі через SELECT ... FOR UPDATE SKIP LOCKED,
+    тому кілька воркерів не беруть одну задачу двічі
+  - помилка → повтор з експоненційним backoff, після max_attempts — failed
+  - задача, що зависла в running довше JOB_VISIBILITY_TIMEOUT_SECONDS
+    (воркер впав), забирається повторно
+"""
+
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from sqlalchemy import or_, select, text, update
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.job import AnalysisJob, JobStatus, ACTIVE_JOB_STATUSES
+from app.schemas.lead import AIResult
+
+# Скільки разів повторити INSERT, якщо активна задача зникла між INSERT і SELECT
+ENQUEUE_ATTEMPTS = 3
+
+
+async def enqueue_analysis(db: AsyncSession, lead_id: uuid.UUID) -> AnalysisJob:
+    """
+    Ставить AI-аналіз ліда в чергу.
+    Якщо для ліда вже є незавершена задача — повертає її замість нової.
+    """
+    for _ in range(ENQUEUE_ATTEMPTS):
+        stmt = (
+            insert(AnalysisJob)
+            .values(
+                id=uuid.uuid4(),
+                lead_id=lead_id,
+                status=JobStatus.queued,
+                attempts=0,
+                max_attempts=settings.JOB_MAX_ATTEMPTS,
+                run_after=datetime.now(timezone.utc),
+            )
+            .on_conflict_do_nothing(
+                # Літерал, а не параметри: інакше Postgres не зіставить з частковим індексом
+                index_elements=[AnalysisJob.lead_id],
+                index_where=text("status IN ('queued', 'running')"),
+            )
+            .returning(AnalysisJob)
+        )
+        job = (await db.execute(select(AnalysisJob).from_statement(stmt))).scalar_one_or_none()
+        if job is None:
+            result = await db.execute(
+                select(AnalysisJob).where(
+                    AnalysisJob.lead_id == lead_id,
+                    AnalysisJob.status.in_(ACTIVE_JOB_STATUSES),
+                )
+            )
+            # None — активна задача завершилась між INSERT і SELECT: вставляємо знову
+            job = result.scalar_one_or_none()
+        if job is not None:
+            await db.commit()
+            return job
+    raise RuntimeError(f"Could not enqueue analysis for lead {lead_id}")
+
+
+async def get_job(db: AsyncSession, job_id: uuid.UUID) -> AnalysisJob | None:
+    result = await db.execute(select(AnalysisJob).where(AnalysisJob.id == job_id))
+    return result.scalar_one_or_none()
+
+
+async def claim_jobs(db: AsyncSession, limit: int) -> List[AnalysisJob]:
+    """
+    Забирає до limit готових задач і переводить їх у running.
+    Рядки, заблоковані іншим воркером, пропускаються (SKIP LOCKED).
+    """
+    now = datetime.now(timezone.utc)
+    stale_before = now - timedelta(seconds=settings.JOB_VISIBILITY_TIMEOUT_SECONDS)
+    candidates = (
+        select(AnalysisJob.id)
+        .where(
+            or_(
+                (AnalysisJob.status == JobStatus.queued) & (AnalysisJob.run_after <= now),
+                (AnalysisJob.status == JobStatus.running) & (AnalysisJob.locked_at < stale_before),
+            )
+        )
+        .order_by(AnalysisJob.run_after)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(AnalysisJob)
+        .where(AnalysisJob.id.in_(candidates.scalar_subquery()))
+        .values(
+            status=JobStatus.running,
+            locked_at=now,
+            attempts=AnalysisJob.attempts + 1,
+            updated_at=now,
+        )
+        .returning(AnalysisJob)
+    )
+    result = await db.execute(select(AnalysisJob).from_statement(stmt))
+    jobs = list(result.scalars().all())
+    await db.commit()
+    return jobs
+
+
+def _backoff(attempt: int) -> float:
+    """Експоненційна затримка з jitter: base * 2^(attempt-1), не більше max."""
+    delay = settings.JOB_BACKOFF_BASE_SECONDS * 2 ** (attempt - 1)
+    return min(delay, settings.JOB_BACKOFF_MAX_SECONDS) * random.uniform(0.8, 1.2)
+
+
+async def complete_job(db: AsyncSession, job: AnalysisJob, result: AIResult) -> None:
+    now = datetime.now(timezone.utc)
+    job.status = JobStatus.done
+    job.result_score = result.score
+    job.result_recommendation = result.recommendation
+    job.result_reason = result.reason
+    job.last_error = None
+    job.locked_at = None
+    job.finished_at = now
+    job.updated_at = now
+    await db.commit()
+
+
+async def fail_job(
+    db: AsyncSession, job: AnalysisJob, error: str, retry: bool = True, retry_after: float = 0.0,
+) -> None:
+    """
+    Повертає задачу в чергу з backoff (не раніше retry_after секунд) або, якщо
+    спроби вичерпано, позначає failed.
+    """
+    now = datetime.now(timezone.utc)
+    job.last_error = error
+    job.locked_at = None
+    job.updated_at = now
+    if retry and job.attempts < job.max_attempts:
+        job.status = JobStatus.queued
+        job.run_after = now + timedelta(seconds=max(_backoff(job.attempts), retry_after))
+    else:
+        job.status = JobStatus.failed
+        job.finished_at = now
+    await db.commit()
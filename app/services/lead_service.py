@@ -8,19 +8,34 @@ Lead Service — вся бізнес-логіка по роботі з ліда
   - AI тільки рекомендує — рішення приймає менеджер
 """
 
+import base64
+import json
+import time
 import uuid
-from datetime import datetime, timezone
+from collections import Counter
+from datetime import datetime, timedelta, timezone
 from typing import List
 
-from sqlalchemy import select
+from sqlalchemy import (
+    Integer, REAL, String, bindparam, cast, column, func, insert, literal, select, text, tuple_,
+    update, values,
+)
+from sqlalchemy.dialects.postgresql import REGCONFIG, UUID
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.ai.claude_service import analyze_lead
+from app.models.archive import LeadArchive, SaleArchive
 from app.models.lead import (
-    Lead, Sale, ColdStage, SaleStage,
-    COLD_STAGE_ORDER, SALE_STAGE_ORDER
+    Lead, Sale, ColdStage, SaleStage, LeadSource, BusinessDomain,
+    COLD_STAGE_ORDER, SALE_STAGE_ORDER, REASON_SEARCH_CONFIG, input_fingerprint,
+)
+from app.schemas.fast import LEAD_FIELDS
+from app.schemas.lead import (
+    LeadCreate, AIResult, BatchAnalysisResult, BulkStageItemResult, BulkStageResult,
 )
-from app.schemas.lead import LeadCreate, AIResult
+from app.services import event_feed, pipeline_stats, read_cache, stage_history
+from app.services.score_cache import cached_analyze_lead, cached_analyze_many
 
 # Мінімальний AI score для передачі в продажі
 MIN_TRANSFER_SCORE = 0.6
@@ -29,6 +44,18 @@ MIN_TRANSFER_SCORE = 0.6
 LOCKED_COLD_STAGES = {ColdStage.transferred}
 LOCKED_SALE_STAGES = {SaleStage.paid}
 
+# Розмір сторінки для списку лідів
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Масовий імпорт: рядків в одному INSERT ... RETURNING і на один запит
+BULK_INSERT_BATCH_SIZE = 1000
+MAX_BULK_ITEMS = 50_000
+
+# Пакетний AI-аналіз: лідів за один запит і паралельних викликів Claude
+MAX_BATCH_ANALYSIS = 1000
+BATCH_ANALYSIS_CONCURRENCY = 8
+
 
 class StageValidationError(ValueError):
     """Порушення правил переходу між стадіями."""
@@ -40,6 +67,16 @@ class TransferValidationError(ValueError):
     pass
 
 
+class ConcurrencyConflictError(ValueError):
+    """Рядок змінили паралельно: версія не збігається або дію вже виконано."""
+    pass
+
+
+class InvalidCursorError(ValueError):
+    """Курсор пагінації пошкоджений або не належить цьому списку."""
+    pass
+
+
 def _validate_cold_stage_transition(current: ColdStage, new: ColdStage) -> None:
     """Перевіряє, чи можливий перехід між холодними стадіями."""
     if current in LOCKED_COLD_STAGES:
@@ -55,9 +92,14 @@ def _validate_cold_stage_transition(current: ColdStage, new: ColdStage) -> None:
     new_idx = COLD_STAGE_ORDER.index(new)
 
     if new_idx != current_idx + 1:
+        # З "lost" далі можна тільки в "lost"
+        next_allowed = (
+            f"'{COLD_STAGE_ORDER[current_idx + 1].value}' or 'lost'"
+            if current_idx + 1 < len(COLD_STAGE_ORDER) else "'lost'"
+        )
         raise StageValidationError(
             f"Invalid stage transition: '{current.value}' → '{new.value}'. "
-            f"Next allowed: '{COLD_STAGE_ORDER[current_idx + 1].value}' or 'lost'"
+            f"Next allowed: {next_allowed}"
         )
 
 
@@ -80,83 +122,741 @@ def _validate_sale_stage_transition(current: SaleStage, new: SaleStage) -> None:
         )
 
 
+def _allowed_previous_stages(stages, validate) -> dict:
+    """
+    Для кожної цільової стадії — стадії, з яких у неї можна перейти.
+    Будується з тих самих правил валідації, тому умова UPDATE ... WHERE stage IN (...)
+    завжди збігається з _validate_*_stage_transition.
+    """
+    allowed = {}
+    for new in stages:
+        allowed[new] = []
+        for current in stages:
+            try:
+                validate(current, new)
+            except StageValidationError:
+                continue
+            allowed[new].append(current)
+    return allowed
+
+
+_COLD_ALLOWED_FROM = _allowed_previous_stages(list(ColdStage), _validate_cold_stage_transition)
+_SALE_ALLOWED_FROM = _allowed_previous_stages(list(SaleStage), _validate_sale_stage_transition)
+
+# Скільки разів повторити умовний UPDATE, якщо стадію змінили паралельно
+STAGE_UPDATE_ATTEMPTS = 3
+
+
+def _cache_keys(row) -> list:
+    if isinstance(row, Sale):
+        return read_cache.sale_keys(row.id, row.lead_id)
+    return read_cache.lead_keys(row.id)
+
+
+def _stage_event(model, row) -> dict:
+    if model is Sale:
+        return event_feed.event(
+            event_feed.SALE_STAGE_CHANGED, row.id, row.lead_id,
+            stage=row.stage.value, version=row.version,
+        )
+    return event_feed.event(
+        event_feed.LEAD_STAGE_CHANGED, row.id, stage=row.stage.value, version=row.version,
+    )
+
+
+async def _conditional_stage_update(
+    db: AsyncSession, model, row_id, new_stage, allowed_from, validate,
+    expected_version: int | None = None,
+):
+    """
+    Зміна стадії одним UPDATE ... WHERE id = :id AND stage IN (:allowed) RETURNING *.
+    З expected_version — ще й AND version = :expected (compare-and-swap).
+
+    Той самий statement пише перехід у stage_history і дельти pipeline_stats.
+    Без блокувань рядків: CTE old читає стару стадію, час входу в неї, версію,
+    джерело й домен ліда, а UPDATE умовний ще й за version = old.version. Якщо
+    рядок паралельно змінили, перевірка умов після очікування (READ COMMITTED)
+    не проходить і UPDATE нічого не змінює. History і stats пишуться з його
+    RETURNING (CTE moved), тож запис є рівно тоді, коли стадія змінилась, і
+    завжди з тієї версії рядка, яку змінив UPDATE.
+
+    Якщо рядок не оновився — читаємо поточну стадію (тільки на цьому шляху),
+    щоб повернути None для 404 або ту саму StageValidationError, що й раніше.
+    Якщо перехід за поточною стадією валідний, значить її щойно змінили — повторюємо.
+    """
+    is_sale = model is Sale
+    table = model.__table__
+    for _ in range(STAGE_UPDATE_ATTEMPTS):
+        now = datetime.now(timezone.utc)
+        old = select(
+            model.id, model.stage, model.version, model.stage_changed_at,
+            Lead.source.label("lead_source"), Lead.business_domain.label("lead_domain"),
+        )
+        if is_sale:
+            old = old.join(Lead, Lead.id == Sale.lead_id)
+        old = old.where(model.id == row_id).cte("old")
+        conditions = [
+            table.c.id == old.c.id,
+            table.c.version == old.c.version,
+            old.c.stage.in_(allowed_from[new_stage]),
+        ]
+        if expected_version is not None:
+            conditions.append(old.c.version == expected_version)
+        moved = (
+            update(table)
+            .where(*conditions)
+            .values(
+                stage=new_stage,
+                stage_changed_at=now,
+                updated_at=now,
+                version=table.c.version + 1,
+            )
+            .returning(
+                *table.c,
+                old.c.stage.label("from_stage"),
+                old.c.stage_changed_at.label("from_entered_at"),
+                old.c.lead_source,
+                old.c.lead_domain,
+            )
+            .cte("moved")
+        )
+        history = stage_history.record_cte(
+            moved,
+            stage_history.SALE if is_sale else stage_history.LEAD,
+            moved.c.id,
+            moved.c.lead_id if is_sale else moved.c.id,
+            moved.c.from_stage,
+            new_stage,
+            moved.c.from_entered_at,
+            now,
+        )
+        entity = pipeline_stats.SALE if is_sale else pipeline_stats.LEAD
+        stats = pipeline_stats.delta_cte(
+            moved, moved.c.lead_source, moved.c.lead_domain,
+            [(entity, moved.c.from_stage, -1), (entity, new_stage, 1)],
+        )
+        stmt = (
+            select(*(moved.c[column.name] for column in table.c))
+            .add_cte(history)
+            .add_cte(stats)
+        )
+        result = await db.execute(
+            select(model).from_statement(stmt).execution_options(populate_existing=True)
+        )
+        row = result.scalar_one_or_none()
+        if row is not None:
+            await read_cache.invalidate(db, _cache_keys(row))
+            await event_feed.record(db, [_stage_event(model, row)])
+            await db.commit()
+            return row
+
+        current = (
+            await db.execute(select(model.stage, model.version).where(model.id == row_id))
+        ).first()
+        if current is None:
+            return None
+        validate(current.stage, new_stage)
+        if expected_version is not None and current.version != expected_version:
+            raise ConcurrencyConflictError(
+                f"Version conflict: expected {expected_version}, current {current.version}"
+            )
+
+    raise ConcurrencyConflictError("Stage was changed concurrently, please retry")
+
+
+async def _bulk_stage_update(db: AsyncSession, model, items, validate, locked_stages):
+    """
+    Масова зміна стадій двома запитами на пакет:
+      1. SELECT id, stage, version усіх рядків пакета
+      2. UPDATE ... FROM (VALUES (id, stage, version), ...) RETURNING
+
+    Переходи перевіряються тими самими _validate_*_stage_transition по прочитаних
+    стадіях. UPDATE умовний за версією з кроку 1: рядок, який змінили між
+    запитами, не оновлюється і отримує conflict, тож провалідована стадія —
+    завжди та, що була в БД у момент запису. З тієї ж причини стара стадія
+    для stage_history береться з кроку 1.
+    """
+    columns = [model.id, model.stage, model.version]
+    if model is Sale:
+        columns.append(Sale.lead_id)
+    current_query = select(*columns, model.stage_changed_at, Lead.source, Lead.business_domain)
+    if model is Sale:
+        current_query = current_query.join(Lead, Lead.id == Sale.lead_id)
+    current = {
+        row.id: row
+        for row in (
+            await db.execute(current_query.where(model.id.in_({item.id for item in items})))
+        ).all()
+    }
+
+    results: list[BulkStageItemResult] = []
+    pending: dict[uuid.UUID, BulkStageItemResult] = {}
+    updates: list[tuple] = []
+    seen: set[uuid.UUID] = set()
+    for index, item in enumerate(items):
+        result = BulkStageItemResult(index=index, id=item.id, status="applied")
+        results.append(result)
+        if item.id in seen:
+            result.status = "duplicate"
+            result.error = "Row appears earlier in this request"
+            continue
+        seen.add(item.id)
+
+        row = current.get(item.id)
+        if row is None:
+            result.status = "not_found"
+            continue
+        result.stage, result.version = row.stage.value, row.version
+        try:
+            validate(row.stage, item.stage)
+        except StageValidationError as e:
+            result.status = "locked" if row.stage in locked_stages else "invalid_transition"
+            result.error = str(e)
+            continue
+        if item.expected_version is not None and item.expected_version != row.version:
+            result.status = "conflict"
+            result.error = f"Version conflict: expected {item.expected_version}, current {row.version}"
+            continue
+        pending[item.id] = result
+        updates.append((item.id, item.stage.name, row.version))
+
+    if updates:
+        now = datetime.now(timezone.utc)
+        rows = values(
+            column("id", UUID(as_uuid=True)),
+            column("stage", String),
+            column("version", Integer),
+            name="v",
+        ).data(updates)
+        stmt = (
+            update(model)
+            .where(model.id == rows.c.id, model.version == rows.c.version)
+            .values(
+                stage=cast(rows.c.stage, model.stage.type),
+                stage_changed_at=now,
+                updated_at=now,
+                version=model.version + 1,
+            )
+            .returning(*columns)
+        )
+        keys, events, transitions = [], [], []
+        deltas = Counter()
+        entity = pipeline_stats.SALE if model is Sale else pipeline_stats.LEAD
+        for row in (await db.execute(stmt)).all():
+            result = pending.pop(row.id)
+            result.stage, result.version = row.stage.value, row.version
+            keys.extend(
+                read_cache.sale_keys(row.id, row.lead_id) if model is Sale
+                else read_cache.lead_keys(row.id)
+            )
+            events.append(_stage_event(model, row))
+            before = current[row.id]
+            transitions.append(stage_history.transition(
+                stage_history.SALE if model is Sale else stage_history.LEAD,
+                row.id,
+                row.lead_id if model is Sale else row.id,
+                before.stage,
+                row.stage,
+                before.stage_changed_at,
+                now,
+            ))
+            deltas[pipeline_stats.key(entity, before.stage, before.source, before.business_domain)] -= 1
+            deltas[pipeline_stats.key(entity, row.stage, before.source, before.business_domain)] += 1
+        for result in pending.values():
+            result.status = "conflict"
+            result.error = "Row was changed concurrently, please retry"
+        await read_cache.invalidate(db, keys)
+        await event_feed.record(db, events)
+        await stage_history.record(db, transitions)
+        await pipeline_stats.apply(db, deltas)
+        await db.commit()
+
+    applied = sum(1 for result in results if result.status == "applied")
+    return BulkStageResult(applied=applied, rejected=len(results) - applied, items=results)
+
+
 # ── CRUD ──────────────────────────────────────────────────────────────────────
 
+def _created_event(lead_id: uuid.UUID, data: LeadCreate) -> dict:
+    return event_feed.event(
+        event_feed.LEAD_CREATED, lead_id,
+        source=data.source.value, business_domain=data.business_domain,
+    )
+
+
+def _created_key(data: LeadCreate) -> pipeline_stats.Key:
+    return pipeline_stats.key(pipeline_stats.LEAD, ColdStage.new, data.source, data.business_domain)
+
+
 async def create_lead(db: AsyncSession, data: LeadCreate) -> Lead:
     lead = Lead(
+        id=uuid.uuid4(),
         source=data.source,
         business_domain=data.business_domain,
     )
     db.add(lead)
+    await event_feed.record(db, [_created_event(lead.id, data)])
+    await pipeline_stats.apply(db, Counter([_created_key(data)]))
     await db.commit()
     await db.refresh(lead)
     return lead
 
 
-async def get_lead(db: AsyncSession, lead_id: uuid.UUID) -> Lead | None:
-    result = await db.execute(select(Lead).where(Lead.id == lead_id))
-    return result.scalar_one_or_none()
+async def bulk_create_leads(
+    db: AsyncSession, items: List[LeadCreate]
+) -> List[uuid.UUID | None]:
+    """
+    Масове створення лідів багаторядковими INSERT ... RETURNING.
 
+    Кожна пачка з BULK_INSERT_BATCH_SIZE рядків — один statement і один COMMIT,
+    без refresh. Якщо пачка падає, її ліди отримують None, решта пачок
+    продовжує записуватись. Повертає id (або None) у порядку вхідних даних.
+    """
+    table = Lead.__table__
+    stmt = insert(table).returning(table.c.id, sort_by_parameter_order=True)
+    ids: List[uuid.UUID | None] = []
+
+    for start in range(0, len(items), BULK_INSERT_BATCH_SIZE):
+        batch = items[start:start + BULK_INSERT_BATCH_SIZE]
+        now = datetime.now(timezone.utc)
+        rows = [
+            {
+                "id": uuid.uuid4(),
+                "source": item.source,
+                "business_domain": item.business_domain,
+                "stage": ColdStage.new,
+                "stage_changed_at": now,
+                "messages_count": 0,
+                "version": 1,
+                "created_at": now,
+                "updated_at": now,
+            }
+            for item in batch
+        ]
+        try:
+            result = await db.execute(stmt, rows)
+            inserted = list(result.scalars().all())
+            await event_feed.record(
+                db, [_created_event(lead_id, item) for lead_id, item in zip(inserted, batch)]
+            )
+            await pipeline_stats.apply(db, Counter(_created_key(item) for item in batch))
+            await db.commit()
+        except SQLAlchemyError:
+            await db.rollback()
+            inserted = [None] * len(batch)
+        ids.extend(inserted)
+
+    return ids
+
+
+async def _get_one(db: AsyncSession, model, archive, column: str, value, include_archived: bool):
+    # Архів читається тільки при промаху по гарячій таблиці: для живих
+    # об'єктів це нуль зайвих запитів, для архівних — один
+    result = await db.execute(select(model).where(getattr(model, column) == value))
+    obj = result.scalar_one_or_none()
+    if obj is None and include_archived:
+        result = await db.execute(select(archive).where(getattr(archive, column) == value))
+        obj = result.scalar_one_or_none()
+    return obj
+
+
+async def _get_stamp(db: AsyncSession, model, archive, column: str, value, include_archived: bool):
+    query = select(model.id, model.updated_at).where(getattr(model, column) == value)
+    if include_archived:
+        # Рядок є рівно в одній з таблиць — один round-trip на обидві
+        query = query.union_all(
+            select(archive.id, archive.updated_at).where(getattr(archive, column) == value)
+        )
+    result = await db.execute(query)
+    return result.first()
+
+
+async def get_lead(
+    db: AsyncSession, lead_id: uuid.UUID, *, include_archived: bool = False
+) -> Lead | LeadArchive | None:
+    """
+    Лід за ID. include_archived — також з leads_archive (тільки для читання:
+    архівний лід не змінюється, тому пишучі шляхи його не бачать).
+    """
+    return await _get_one(db, Lead, LeadArchive, "id", lead_id, include_archived)
+
+
+async def get_lead_stamp(db: AsyncSession, lead_id: uuid.UUID, *, include_archived: bool = False):
+    """(id, updated_at) ліда — для ETag без завантаження всього рядка."""
+    return await _get_stamp(db, Lead, LeadArchive, "id", lead_id, include_archived)
+
+
+# ── Pagination ────────────────────────────────────────────────────────────────
+
+def encode_cursor(created_at: datetime, lead_id: uuid.UUID) -> str:
+    """Непрозорий курсор: позиція останнього ліда на сторінці (created_at, id)."""
+    raw = json.dumps({"c": created_at.isoformat(), "i": str(lead_id)})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(data["c"]), uuid.UUID(data["i"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursorError("Invalid pagination cursor") from e
+
+
+def build_lead_filters(
+    stage: ColdStage | None = None,
+    source: LeadSource | None = None,
+    business_domain: BusinessDomain | None = None,
+    min_score: float | None = None,
+    max_score: float | None = None,
+    analyzed_from: datetime | None = None,
+    analyzed_to: datetime | None = None,
+) -> list:
+    """WHERE-умови для списку лідів. Пропущені фільтри не обмежують вибірку."""
+    conditions = []
+    if stage is not None:
+        conditions.append(Lead.stage == stage)
+    if source is not None:
+        conditions.append(Lead.source == source)
+    if business_domain is not None:
+        conditions.append(Lead.business_domain == business_domain)
+    if min_score is not None:
+        conditions.append(Lead.ai_score >= min_score)
+    if max_score is not None:
+        conditions.append(Lead.ai_score <= max_score)
+    if analyzed_from is not None:
+        conditions.append(Lead.ai_analyzed_at >= analyzed_from)
+    if analyzed_to is not None:
+        conditions.append(Lead.ai_analyzed_at < analyzed_to)
+    return conditions
+
+
+def _lead_page_query(entities, limit: int, cursor: str | None, filters: dict):
+    query = select(*entities).where(*build_lead_filters(**filters))
+    if cursor is not None:
+        created_at, lead_id = decode_cursor(cursor)
+        query = query.where(tuple_(Lead.created_at, Lead.id) < (created_at, lead_id))
+    # Беремо на один рядок більше, щоб знати, чи є наступна сторінка
+    return query.order_by(Lead.created_at.desc(), Lead.id.desc()).limit(limit + 1)
+
+
+def _split_page(items: list, limit: int) -> tuple[list, str | None]:
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    last = items[-1]
+    return items, encode_cursor(last.created_at, last.id)
+
+
+async def list_lead_rows(
+    db: AsyncSession,
+    *,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    **filters,
+) -> tuple[list, str | None]:
+    """
+    Одна сторінка лідів, від нових до старих, рядками з колонок LeadResponse
+    замість ORM-об'єктів — для швидкої серіалізації (app.schemas.fast).
+
+    Keyset-пагінація по (created_at, id): замість OFFSET продовжуємо
+    з позиції курсора, тому будь-яка сторінка коштує один index range scan.
+    Повертає (рядки, курсор наступної сторінки або None).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    columns = [getattr(Lead, name) for name in LEAD_FIELDS]
+    result = await db.execute(_lead_page_query(columns, limit, cursor, filters))
+    return _split_page(list(result.all()), limit)
 
-async def list_leads(db: AsyncSession) -> List[Lead]:
-    result = await db.execute(select(Lead).order_by(Lead.created_at.desc()))
-    return list(result.scalars().all())
+
+# ── Search ────────────────────────────────────────────────────────────────────
+
+def encode_search_cursor(rank: float, lead_id: uuid.UUID) -> str:
+    """Курсор пошуку: позиція останнього результату (rank, id)."""
+    raw = json.dumps({"r": rank, "i": str(lead_id)})
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_search_cursor(cursor: str) -> tuple[float, uuid.UUID]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return float(data["r"]), uuid.UUID(data["i"])
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursorError("Invalid search cursor") from e
+
+
+async def search_lead_rows(
+    db: AsyncSession,
+    query: str,
+    *,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str | None = None,
+    recommendation: str | None = None,
+    stage: ColdStage | None = None,
+    min_score: float | None = None,
+    max_score: float | None = None,
+) -> tuple[list, str | None]:
+    """
+    Повнотекстовий пошук по ai_reason, від найрелевантніших.
+
+    Запит у синтаксисі websearch_to_tsquery ("price objection" -competitor, or).
+    Збіг шукається по GIN-індексу ix_leads_ai_reason_tsv, ранг (ts_rank_cd)
+    рахує БД. Keyset-пагінація по (rank DESC, id DESC): ранг для рядка
+    детермінований, тому умова курсора відтинає рівно вже віддані результати.
+    Рядки — колонки LeadSearchHit (app.schemas.fast).
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    tsquery = func.websearch_to_tsquery(cast(REASON_SEARCH_CONFIG, REGCONFIG), query)
+    rank = func.ts_rank_cd(Lead.ai_reason_tsv, tsquery, type_=REAL).label("rank")
+
+    conditions = [
+        Lead.ai_reason_tsv.bool_op("@@")(tsquery),
+        *build_lead_filters(stage=stage, min_score=min_score, max_score=max_score),
+    ]
+    if recommendation is not None:
+        conditions.append(Lead.ai_recommendation == recommendation)
+    if cursor is not None:
+        last_rank, last_id = decode_search_cursor(cursor)
+        conditions.append(tuple_(rank, Lead.id) < (last_rank, last_id))
+
+    columns = [getattr(Lead, name) for name in LEAD_FIELDS]
+    result = await db.execute(
+        select(*columns, rank)
+        .where(*conditions)
+        .order_by(rank.desc(), Lead.id.desc())
+        .limit(limit + 1)
+    )
+    rows = list(result.all())
+    if len(rows) <= limit:
+        return rows, None
+    rows = rows[:limit]
+    return rows, encode_search_cursor(rows[-1].rank, rows[-1].id)
 
 
 async def update_lead_stage(
-    db: AsyncSession, lead: Lead, new_stage: ColdStage
-) -> Lead:
-    _validate_cold_stage_transition(lead.stage, new_stage)
-    lead.stage = new_stage
-    lead.updated_at = datetime.now(timezone.utc)
-    await db.commit()
-    await db.refresh(lead)
-    return lead
+    db: AsyncSession,
+    lead_id: uuid.UUID,
+    new_stage: ColdStage,
+    expected_version: int | None = None,
+) -> Lead | None:
+    """Змінює стадію ліда. None — лід не знайдено."""
+    return await _conditional_stage_update(
+        db, Lead, lead_id, new_stage, _COLD_ALLOWED_FROM, _validate_cold_stage_transition,
+        expected_version,
+    )
+
+
+async def bulk_update_lead_stages(db: AsyncSession, items) -> BulkStageResult:
+    """Масова зміна стадій лідів (елементи з id, stage, expected_version)."""
+    return await _bulk_stage_update(
+        db, Lead, items, _validate_cold_stage_transition, LOCKED_COLD_STAGES
+    )
 
 
 async def update_messages_count(
-    db: AsyncSession, lead: Lead, count: int
-) -> Lead:
-    lead.messages_count = count
-    lead.updated_at = datetime.now(timezone.utc)
-    await db.commit()
-    await db.refresh(lead)
+    db: AsyncSession, lead_id: uuid.UUID, count: int
+) -> Lead | None:
+    """Оновлює кількість повідомлень одним UPDATE ... RETURNING. None — лід не знайдено."""
+    stmt = (
+        update(Lead)
+        .where(Lead.id == lead_id)
+        .values(
+            messages_count=count,
+            updated_at=datetime.now(timezone.utc),
+            version=Lead.version + 1,
+        )
+        .returning(Lead)
+    )
+    result = await db.execute(
+        select(Lead).from_statement(stmt).execution_options(populate_existing=True)
+    )
+    lead = result.scalar_one_or_none()
+    if lead is not None:
+        await read_cache.invalidate(db, read_cache.lead_keys(lead.id))
+        await db.commit()
     return lead
 
 
 # ── AI ────────────────────────────────────────────────────────────────────────
 
+def _analyzed_event(lead_id: uuid.UUID, result: AIResult) -> dict:
+    return event_feed.event(
+        event_feed.LEAD_ANALYZED, lead_id,
+        score=result.score, recommendation=result.recommendation,
+    )
+
+
 async def run_ai_analysis(db: AsyncSession, lead: Lead) -> AIResult:
     """
     Викликає AI і зберігає результат у лід.
     AI отримує тільки ті дані, які потрібні для оцінки:
       source, stage, messages_count, has_business_domain
+    Однакові входи беруться з кешу оцінок (див. score_cache).
     """
-    result = await analyze_lead(
+    inputs = dict(
         source=lead.source.value,
         stage=lead.stage.value,
         messages_count=lead.messages_count,
         has_business_domain=lead.business_domain is not None,
     )
+    result = await cached_analyze_lead(db, **inputs)
 
-    lead.ai_score = result.score
-    lead.ai_recommendation = result.recommendation
-    lead.ai_reason = result.reason
-    lead.ai_analyzed_at = datetime.now(timezone.utc)
-    lead.updated_at = datetime.now(timezone.utc)
-
+    now = datetime.now(timezone.utc)
+    await db.execute(
+        update(Lead)
+        .where(Lead.id == lead.id)
+        .values(
+            ai_score=result.score,
+            ai_recommendation=result.recommendation,
+            ai_reason=result.reason,
+            ai_analyzed_at=now,
+            # Відбиток саме тих входів, що оцінювались: якщо лід змінили під час
+            # виклику Claude, він лишиться застарілим і потрапить у переоцінку
+            ai_input_fingerprint=input_fingerprint(**inputs),
+            ai_retry_after=None,
+            updated_at=now,
+            version=Lead.version + 1,
+        )
+    )
+    await read_cache.invalidate(db, read_cache.lead_keys(lead.id))
+    await event_feed.record(db, [_analyzed_event(lead.id, result)])
     await db.commit()
-    await db.refresh(lead)
     return result
 
 
-# ── Transfer to Sales ─────────────────────────────────────────────────────────
+async def run_batch_ai_analysis(
+    db: AsyncSession,
+    lead_ids: List[uuid.UUID] | None = None,
+    *,
+    limit: int = MAX_BATCH_ANALYSIS,
+    retry_failed_after: timedelta | None = None,
+    **filters,
+) -> BatchAnalysisResult:
+    """
+    Пакетний AI-аналіз: за списком ID або за фільтрами списку лідів.
 
-async def transfer_to_sales(db: AsyncSession, lead: Lead) -> Sale:
+    Ліди читаються одним запитом, однакові набори входів аналізуються один раз,
+    усі результати записуються одним bulk UPDATE і одним COMMIT.
+    Ліди, для яких Claude повернув помилку, не змінюються; з retry_failed_after
+    їм лише ставиться ai_retry_after (переоцінка find_stale_leads — не раніше).
     """
-    Передача ліда в продажі — вирішує МЕНЕДЖЕР, не AI.
-    AI тільки надав оцінку. Система перевіряє бізнес-умови.
+    started = time.perf_counter()
+    limit = max(1, min(limit, MAX_BATCH_ANALYSIS))
+
+    query = select(Lead.id, Lead.source, Lead.stage, Lead.messages_count, Lead.business_domain)
+    if lead_ids:
+        query = query.where(Lead.id.in_(lead_ids[:limit]))
+    else:
+        query = query.where(*build_lead_filters(**filters)).order_by(Lead.created_at, Lead.id)
+    rows = (await db.execute(query.limit(limit))).all()
+
+    groups: dict[tuple[str, str, int, bool], list[uuid.UUID]] = {}
+    for row in rows:
+        key = (row.source.value, row.stage.value, row.messages_count,
+               row.business_domain is not None)
+        groups.setdefault(key, []).append(row.id)
+
+    results = await cached_analyze_many(db, list(groups), BATCH_ANALYSIS_CONCURRENCY)
+
+    now = datetime.now(timezone.utc)
+    updates, events = [], []
+    failed_ids: list[uuid.UUID] = []
+    errors: set[str] = set()
+    for key, ids in groups.items():
+        result = results[key]
+        if isinstance(result, Exception):
+            failed_ids.extend(ids)
+            errors.add(f"{type(result).__name__}: {result}")
+            continue
+        fingerprint = input_fingerprint(*key)
+        updates.extend(
+            {
+                "b_id": lead_id,
+                "b_score": result.score,
+                "b_recommendation": result.recommendation,
+                "b_reason": result.reason,
+                "b_fingerprint": fingerprint,
+            }
+            for lead_id in ids
+        )
+        events.extend(_analyzed_event(lead_id, result) for lead_id in ids)
+
+    if updates:
+        # Один UPDATE, виконаний як executemany по всіх лідах пакета
+        table = Lead.__table__
+        stmt = (
+            update(table)
+            .where(table.c.id == bindparam("b_id"))
+            .values(
+                ai_score=bindparam("b_score"),
+                ai_recommendation=bindparam("b_recommendation"),
+                ai_reason=bindparam("b_reason"),
+                ai_input_fingerprint=bindparam("b_fingerprint"),
+                ai_retry_after=None,
+                ai_analyzed_at=now,
+                updated_at=now,
+                version=table.c.version + 1,
+            )
+        )
+        await db.execute(stmt, updates)
+        await read_cache.invalidate(
+            db, [key for u in updates for key in read_cache.lead_keys(u["b_id"])]
+        )
+        await event_feed.record(db, events)
+    if failed_ids and retry_failed_after is not None:
+        # Тільки планування переоцінки: оцінка і version не змінюються
+        await db.execute(
+            update(Lead)
+            .where(Lead.id.in_(failed_ids))
+            .values(ai_retry_after=now + retry_failed_after)
+        )
+    await db.commit()
+
+    found = {row.id for row in rows}
+    duration = time.perf_counter() - started
+    return BatchAnalysisResult(
+        requested=len(lead_ids[:limit]) if lead_ids else len(rows),
+        found=len(rows),
+        unique_inputs=len(groups),
+        analyzed=len(updates),
+        failed=len(failed_ids),
+        missing_ids=[i for i in (lead_ids or [])[:limit] if i not in found],
+        errors=sorted(errors)[:10],
+        duration_seconds=round(duration, 3),
+        leads_per_second=round(len(updates) / duration, 1) if duration else 0.0,
+    )
+
+
+async def find_stale_leads(db: AsyncSession, limit: int) -> List[uuid.UUID]:
     """
+    Ліди, чиї входи змінились після останньої оцінки, найдавніше оцінені першими.
+    Ліди, переоцінка яких не вдалась, чекають до ai_retry_after і стають у
+    кінець черги — вони не затуляють решту, навіть якщо падають щоразу.
+    Читає тільки частковий індекс ix_leads_stale_analysis (його умова збігається
+    з WHERE, transferred туди не потрапляють), тому вартість залежить від
+    кількості змінених лідів, а не від розміру таблиці.
+    """
+    # Той самий вираз, що й у індексі (STALE_ANALYSIS_ORDER_SQL)
+    next_attempt = func.coalesce(Lead.ai_retry_after, Lead.ai_analyzed_at)
+    result = await db.execute(
+        select(Lead.id)
+        .where(
+            Lead.ai_input_fingerprint != Lead.input_fingerprint,
+            # Літерал, а не параметр: інакше Postgres не зіставить з частковим індексом
+            text("leads.stage <> 'transferred'"),
+            next_attempt <= datetime.now(timezone.utc),
+        )
+        .order_by(next_attempt)
+        .limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+# ── Transfer to Sales ─────────────────────────────────────────────────────────
+
+def _check_transfer_rules(lead: Lead) -> None:
+    """Бізнес-умови передачі в продажі. TransferValidationError з причиною."""
     # Бізнес-правило 1: потрібна AI-оцінка
     if lead.ai_score is None:
         raise TransferValidationError(
@@ -182,38 +882,161 @@ async def transfer_to_sales(db: AsyncSession, lead: Lead) -> Sale:
             f"Lead must be in 'qualified' stage to transfer. Current: '{lead.stage.value}'"
         )
 
-    # Перевести лід
-    lead.stage = ColdStage.transferred
-    lead.updated_at = datetime.now(timezone.utc)
 
-    # Створити запис продажу
-    sale = Sale(lead_id=lead.id)
-    db.add(sale)
+async def transfer_to_sales(
+    db: AsyncSession, lead_id: uuid.UUID, expected_version: int | None = None
+) -> Sale | None:
+    """
+    Передача ліда в продажі — вирішує МЕНЕДЖЕР, не AI.
+    AI тільки надав оцінку. Система перевіряє бізнес-умови.
 
-    await db.commit()
-    await db.refresh(lead)
-    await db.refresh(sale)
-    return sale
+    Один statement без блокувань рядків:
+      WITH old AS (SELECT id, version, stage_changed_at ...),
+           moved AS (UPDATE leads ... WHERE <бізнес-умови> AND version = old.version RETURNING id)
+      INSERT INTO sales ... SELECT ... FROM moved RETURNING *
+    Умова на версію — compare-and-swap: якщо лід паралельно змінили, UPDATE
+    після перевірки умов (READ COMMITTED) не знаходить рядка і це 409, тож
+    stage_changed_at в stage_history завжди з тієї версії, яку змінив UPDATE.
+    Тим самим statement-ом пишуться два переходи в stage_history
+    (лід qualified → transferred, новий продаж → new) і дельти pipeline_stats.
+    Якщо лід не пройшов умови — читаємо його, щоб пояснити причину (422),
+    або повертаємо 409, якщо його вже передали чи змінили паралельно.
+    None — лід не знайдено.
+    """
+    now = datetime.now(timezone.utc)
+    sale_id = uuid.uuid4()
+    leads = Lead.__table__
+    sales = Sale.__table__
+
+    # Час входу в qualified — до того, як UPDATE його перезапише
+    old = (
+        select(leads.c.id, leads.c.version, leads.c.stage_changed_at)
+        .where(leads.c.id == lead_id)
+        .cte("old")
+    )
+    conditions = [
+        leads.c.id == old.c.id,
+        leads.c.version == old.c.version,
+        leads.c.stage == ColdStage.qualified,
+        leads.c.ai_score >= MIN_TRANSFER_SCORE,
+        leads.c.business_domain.isnot(None),
+    ]
+    if expected_version is not None:
+        conditions.append(leads.c.version == expected_version)
+
+    moved = (
+        update(leads)
+        .where(*conditions)
+        .values(
+            stage=ColdStage.transferred,
+            stage_changed_at=now,
+            updated_at=now,
+            version=leads.c.version + 1,
+        )
+        .returning(leads.c.id, leads.c.source, leads.c.business_domain, old.c.stage_changed_at)
+        .cte("moved")
+    )
+    lead_history = stage_history.record_cte(
+        moved, stage_history.LEAD, moved.c.id, moved.c.id,
+        ColdStage.qualified, ColdStage.transferred, moved.c.stage_changed_at, now,
+        name="lead_history",
+    )
+    sale_history = stage_history.record_cte(
+        moved, stage_history.SALE, literal(sale_id, sales.c.id.type), moved.c.id,
+        None, SaleStage.new, None, now,
+        name="sale_history",
+    )
+    stats = pipeline_stats.delta_cte(
+        moved, moved.c.source, moved.c.business_domain,
+        [
+            (pipeline_stats.LEAD, ColdStage.qualified, -1),
+            (pipeline_stats.LEAD, ColdStage.transferred, 1),
+            (pipeline_stats.SALE, SaleStage.new, 1),
+        ],
+    )
+    stmt = (
+        pg_insert(sales)
+        .from_select(
+            ["id", "lead_id", "stage", "stage_changed_at", "version", "created_at", "updated_at"],
+            select(
+                literal(sale_id, sales.c.id.type),
+                moved.c.id,
+                literal(SaleStage.new, sales.c.stage.type),
+                literal(now, sales.c.stage_changed_at.type),
+                literal(1),
+                literal(now, sales.c.created_at.type),
+                literal(now, sales.c.updated_at.type),
+            ),
+        )
+        .on_conflict_do_nothing(index_elements=[sales.c.lead_id])
+        .returning(*sales.c)
+        .add_cte(lead_history)
+        .add_cte(sale_history)
+        .add_cte(stats)
+    )
+    sale = (await db.execute(select(Sale).from_statement(stmt))).scalar_one_or_none()
+    if sale is not None:
+        await read_cache.invalidate(
+            db, read_cache.lead_keys(lead_id) + read_cache.sale_keys(sale.id, lead_id)
+        )
+        await event_feed.record(
+            db, [event_feed.event(event_feed.LEAD_TRANSFERRED, lead_id, sale_id=str(sale.id))]
+        )
+        await db.commit()
+        return sale
+
+    lead = await get_lead(db, lead_id)
+    if lead is None:
+        return None
+    if lead.stage == ColdStage.transferred:
+        raise ConcurrencyConflictError("Lead has already been transferred to sales")
+    _check_transfer_rules(lead)
+    if expected_version is not None and lead.version != expected_version:
+        raise ConcurrencyConflictError(
+            f"Version conflict: expected {expected_version}, current {lead.version}"
+        )
+    raise ConcurrencyConflictError("Lead was changed concurrently, please retry")
 
 
 # ── Sales stage ───────────────────────────────────────────────────────────────
 
-async def get_sale(db: AsyncSession, sale_id: uuid.UUID) -> Sale | None:
-    result = await db.execute(select(Sale).where(Sale.id == sale_id))
-    return result.scalar_one_or_none()
+async def get_sale(
+    db: AsyncSession, sale_id: uuid.UUID, *, include_archived: bool = False
+) -> Sale | SaleArchive | None:
+    return await _get_one(db, Sale, SaleArchive, "id", sale_id, include_archived)
+
+
+async def get_sale_by_lead(
+    db: AsyncSession, lead_id: uuid.UUID, *, include_archived: bool = False
+) -> Sale | SaleArchive | None:
+    return await _get_one(db, Sale, SaleArchive, "lead_id", lead_id, include_archived)
+
+
+async def get_sale_stamp(db: AsyncSession, sale_id: uuid.UUID, *, include_archived: bool = False):
+    return await _get_stamp(db, Sale, SaleArchive, "id", sale_id, include_archived)
 
 
-async def get_sale_by_lead(db: AsyncSession, lead_id: uuid.UUID) -> Sale | None:
-    result = await db.execute(select(Sale).where(Sale.lead_id == lead_id))
-    return result.scalar_one_or_none()
+async def get_sale_stamp_by_lead(
+    db: AsyncSession, lead_id: uuid.UUID, *, include_archived: bool = False
+):
+    return await _get_stamp(db, Sale, SaleArchive, "lead_id", lead_id, include_archived)
 
 
 async def update_sale_stage(
-    db: AsyncSession, sale: Sale, new_stage: SaleStage
-) -> Sale:
-    _validate_sale_stage_transition(sale.stage, new_stage)
-    sale.stage = new_stage
-    sale.updated_at = datetime.now(timezone.utc)
-    await db.commit()
-    await db.refresh(sale)
-    return sale
+    db: AsyncSession,
+    sale_id: uuid.UUID,
+    new_stage: SaleStage,
+    expected_version: int | None = None,
+) -> Sale | None:
+    """Змінює стадію продажу. None — продаж не знайдено."""
+    return await _conditional_stage_update(
+        db, Sale, sale_id, new_stage, _SALE_ALLOWED_FROM, _validate_sale_stage_transition,
+        expected_version,
+    )
+
+
+async def bulk_update_sale_stages(db: AsyncSession, items) -> BulkStageResult:
+    """Масова зміна стадій продажів (елементи з id, stage, expected_version)."""
+    return await _bulk_stage_update(
+        db, Sale, items, _validate_sale_stage_transition, LOCKED_SALE_STAGES
+    )
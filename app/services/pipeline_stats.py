@@ -0,0 +1,250 @@
+"""
+Статистика воронки: лічильники pipeline_stats, що ведуться дельтами.
+
+Кожен запис у lead_service, який створює лід / продаж або змінює стадію,
+додає в тій самій транзакції -1 старому ключу і +1 новому (apply — з
+Python, delta_cte — тим самим statement-ом, що й UPDATE). Читання —
+SUM по шардах невеликої таблиці, тож час відповіді не залежить від
+кількості лідів.
+
+reconcile перераховує лічильники з leads / sales разом з архівними таблицями
+(архівування переносить рядки, а не закриває їх) і виправляє розбіжність
+(запис в обхід сервісу, ручна правка в БД). Перерахунок і збережені суми
+читаються в одному знімку REPEATABLE READ — дельти пишуться в тій самій
+транзакції, що й зміна, тож знімок узгоджений без блокувань. Різниця
+записується як звичайна дельта: вона додається до дельт, що лягли після
+знімка, і записи в leads / sales ні на мить не чекають на звірку.
+"""
+
+import random
+from collections import Counter
+from enum import Enum
+
+from sqlalchemy import (
+    BigInteger, SmallInteger, String, cast, delete, func, literal, select, text, union_all,
+)
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.models.archive import LeadArchive, SaleArchive
+from app.models.lead import Lead, Sale, LeadSource, BusinessDomain, ColdStage, SaleStage
+from app.models.pipeline_stats import PipelineStat
+from app.schemas.lead import PipelineConversion, PipelineStageCount, PipelineStats
+
+LEAD = "lead"
+SALE = "sale"
+NO_DOMAIN = "none"
+
+Key = tuple[str, str, str, str]
+
+_KEY_COLUMNS = ["entity_type", "stage", "source", "business_domain"]
+
+
+def key(entity_type: str, stage: Enum, source: Enum, business_domain: Enum | None) -> Key:
+    return (
+        entity_type,
+        stage.value,
+        source.value,
+        business_domain.value if business_domain is not None else NO_DOMAIN,
+    )
+
+
+def _shard() -> int:
+    return random.randrange(settings.PIPELINE_STATS_SHARDS)
+
+
+def _upsert(rows):
+    table = PipelineStat.__table__
+    stmt = pg_insert(table)
+    if isinstance(rows, list):
+        stmt = stmt.values(rows)
+    else:
+        stmt = stmt.from_select([*_KEY_COLUMNS, "shard", "count"], rows)
+    return stmt.on_conflict_do_update(
+        index_elements=[*_KEY_COLUMNS, "shard"],
+        set_={"count": table.c["count"] + stmt.excluded["count"]},
+    )
+
+
+# ── Запис ─────────────────────────────────────────────────────────────────────
+
+async def apply(db: AsyncSession, deltas: Counter) -> None:
+    """Додає дельти {key: n} у поточну транзакцію. Комітить викликач."""
+    shard = _shard()
+    rows = [
+        dict(zip(_KEY_COLUMNS, k), shard=shard, count=n) for k, n in deltas.items() if n
+    ]
+    if rows:
+        await db.execute(_upsert(rows))
+
+
+def delta_cte(source, source_column, domain_column, changes, *conditions, name: str = "stats"):
+    """
+    Дельти лічильників як CTE INSERT ... ON CONFLICT DO UPDATE — для add_cte()
+    до UPDATE. Джерело і домен беруться з колонок source; changes —
+    [(entity_type, стадія — enum або колонка, дельта)], conditions — ті самі, що в UPDATE.
+    """
+    shard = _shard()
+    domain = func.coalesce(cast(domain_column, String), NO_DOMAIN)
+    selects = [
+        select(
+            literal(entity_type, String),
+            literal(stage.value, String) if isinstance(stage, Enum) else cast(stage, String),
+            cast(source_column, String),
+            domain,
+            # Без явних типів параметри в UNION стали б text
+            cast(literal(shard), SmallInteger),
+            cast(literal(delta), BigInteger),
+        )
+        .select_from(source)
+        .where(*conditions)
+        for entity_type, stage, delta in changes
+    ]
+    return _upsert(union_all(*selects)).cte(name)
+
+
+# ── Читання ───────────────────────────────────────────────────────────────────
+
+def _conversion(counts: Counter, **segment) -> PipelineConversion:
+    leads, sales, paid = counts["leads"], counts["sales"], counts["paid"]
+    return PipelineConversion(
+        **segment,
+        leads=leads,
+        sales=sales,
+        paid=paid,
+        lead_to_sale=round(sales / leads, 4) if leads else 0.0,
+        sale_to_paid=round(paid / sales, 4) if sales else 0.0,
+        lead_to_paid=round(paid / leads, 4) if leads else 0.0,
+    )
+
+
+async def get_pipeline_stats(db: AsyncSession) -> PipelineStats:
+    """Лічильники по стадіях і конверсія лід → продаж → оплата, загалом і по сегментах."""
+    total = func.sum(PipelineStat.count)
+    result = await db.execute(
+        select(*(getattr(PipelineStat, c) for c in _KEY_COLUMNS), total.label("total"))
+        .group_by(*(getattr(PipelineStat, c) for c in _KEY_COLUMNS))
+        .having(total != 0)
+        .order_by(*(getattr(PipelineStat, c) for c in _KEY_COLUMNS))
+    )
+
+    lead_stages = Counter({stage.value: 0 for stage in ColdStage})
+    sale_stages = Counter({stage.value: 0 for stage in SaleStage})
+    breakdown = []
+    overall = Counter()
+    by_source: dict[str, Counter] = {s.value: Counter() for s in LeadSource}
+    by_domain: dict[str, Counter] = {d.value: Counter() for d in BusinessDomain}
+    by_domain[NO_DOMAIN] = Counter()
+
+    for row in result.all():
+        count = int(row.total)
+        domain = None if row.business_domain == NO_DOMAIN else row.business_domain
+        breakdown.append(PipelineStageCount(
+            entity=row.entity_type,
+            stage=row.stage,
+            source=row.source,
+            business_domain=domain,
+            count=count,
+        ))
+        if row.entity_type == LEAD:
+            lead_stages[row.stage] += count
+            measures = {"leads": count}
+        else:
+            sale_stages[row.stage] += count
+            measures = {"sales": count, "paid": count if row.stage == SaleStage.paid.value else 0}
+        for segment in (overall, by_source[row.source], by_domain[row.business_domain]):
+            segment.update(measures)
+
+    return PipelineStats(
+        lead_stages=dict(lead_stages),
+        sale_stages=dict(sale_stages),
+        breakdown=breakdown,
+        conversion=_conversion(overall),
+        conversion_by_source=[_conversion(c, source=s) for s, c in by_source.items()],
+        conversion_by_domain=[
+            _conversion(c, business_domain=None if d == NO_DOMAIN else d)
+            for d, c in by_domain.items()
+        ],
+    )
+
+
+# ── Звірка ────────────────────────────────────────────────────────────────────
+
+async def _actual_counts(db: AsyncSession) -> Counter:
+    counts = Counter()
+    leads = union_all(
+        select(Lead.stage, Lead.source, Lead.business_domain),
+        select(LeadArchive.stage, LeadArchive.source, LeadArchive.business_domain),
+    ).subquery()
+    lead_rows = await db.execute(
+        select(leads.c.stage, leads.c.source, leads.c.business_domain, func.count())
+        .group_by(leads.c.stage, leads.c.source, leads.c.business_domain)
+    )
+    for stage, source, domain, n in lead_rows.all():
+        counts[key(LEAD, stage, source, domain)] = n
+    # Лід переданого продажу має стадію transferred і в архів не потрапляє
+    sales = union_all(
+        select(Sale.stage, Sale.lead_id),
+        select(SaleArchive.stage, SaleArchive.lead_id),
+    ).subquery()
+    sale_rows = await db.execute(
+        select(sales.c.stage, Lead.source, Lead.business_domain, func.count())
+        .join(Lead, Lead.id == sales.c.lead_id)
+        .group_by(sales.c.stage, Lead.source, Lead.business_domain)
+    )
+    for stage, source, domain, n in sale_rows.all():
+        counts[key(SALE, stage, source, domain)] = n
+    return counts
+
+
+async def _stored_counts(db: AsyncSession) -> Counter:
+    stored = Counter()
+    rows = await db.execute(
+        select(*(getattr(PipelineStat, c) for c in _KEY_COLUMNS), func.sum(PipelineStat.count))
+        .group_by(*(getattr(PipelineStat, c) for c in _KEY_COLUMNS))
+    )
+    for *k, n in rows.all():
+        stored[tuple(k)] = int(n)
+    return stored
+
+
+async def compact(db: AsyncSession) -> None:
+    """
+    Зводить шарди кожного ключа в шард 0 одним statement-ом:
+    DELETE ... WHERE shard <> 0 RETURNING і upsert суми в шард 0. Сума по ключу
+    не змінюється; блокуються тільки рядки шардів і ненадовго.
+    """
+    await db.execute(text(f"SET LOCAL lock_timeout = {int(settings.PIPELINE_STATS_LOCK_TIMEOUT_MS)}"))
+    table = PipelineStat.__table__
+    moved = delete(table).where(table.c.shard != 0).returning(*table.c).cte("moved")
+    keys = [moved.c[c] for c in _KEY_COLUMNS]
+    await db.execute(
+        _upsert(
+            select(*keys, cast(literal(0), SmallInteger), cast(func.sum(moved.c["count"]), BigInteger))
+            .group_by(*keys)
+        ).add_cte(moved)
+    )
+    await db.commit()
+
+
+async def reconcile(db: AsyncSession) -> int:
+    """
+    Перераховує лічильники, дописує різницю дельтою і ущільнює шарди.
+    Повертає кількість ключів, що розходились.
+    """
+    await db.commit()
+    # Перерахунок і збережені суми — з одного знімка
+    await db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+    actual = await _actual_counts(db)
+    stored = await _stored_counts(db)
+    await db.commit()
+
+    drift = Counter({
+        k: actual[k] - stored[k] for k in actual.keys() | stored.keys() if actual[k] != stored[k]
+    })
+    # Окремою READ COMMITTED транзакцією: upsert поверх дельт, закомічених після знімка
+    await apply(db, drift)
+    await db.commit()
+    await compact(db)
+    return len(drift)
@@ -0,0 +1,112 @@
+"""
+Навчання і масове застосування локальної попередньої оцінки (app.ai.prescore).
+
+Навчальні дані — з власної БД:
+  - продаж у paid / lost — фактичний результат (1.0 / 0.0), вага OUTCOME_WEIGHT;
+  - інакше — історичний ai_score від Claude, вага 1.
+
+Продаж існує тільки для переданого ліда, тож у leads.stage у нього завжди
+transferred, а модель оцінює ліди до передачі. Тому рядки з результатом
+кодуються стадією qualified — з неї лід і передають у продажі. Оцінки, які
+записала сама локальна модель (score_cache.LOCAL_REASON / FALLBACK_REASON),
+в навчання не йдуть: інакше кожне перенавчання вчилося б на власних відповідях.
+"""
+
+from collections import Counter
+
+import numpy as np
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.ai import prescore
+from app.config import settings
+from app.models.lead import ColdStage, Lead, Sale, SaleStage
+from app.services.score_cache import FALLBACK_REASON, LOCAL_REASON
+
+# Причини оцінок, які поставила локальна модель, а не Claude
+LOCAL_REASONS = (LOCAL_REASON, FALLBACK_REASON)
+
+# Результат продажу важить більше за оцінку Claude: це те, що ми прогнозуємо
+OUTCOME_WEIGHT = 3.0
+
+STREAM_BATCH_SIZE = 10_000
+
+
+def _feature_columns():
+    return (
+        Lead.source, Lead.stage, Lead.messages_count, Lead.business_domain.is_not(None),
+    )
+
+
+async def load_training_data(db: AsyncSession) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(X, targets, sample_weight) по всіх лідах з оцінкою Claude або завершеним продажем."""
+    scored_by_claude = and_(
+        Lead.ai_score.is_not(None),
+        or_(Lead.ai_reason.is_(None), Lead.ai_reason.not_in(LOCAL_REASONS)),
+    )
+    query = (
+        select(*_feature_columns(), Lead.ai_score, Sale.stage)
+        .outerjoin(Sale, Sale.lead_id == Lead.id)
+        .where(or_(scored_by_claude, Sale.stage.in_([SaleStage.paid, SaleStage.lost])))
+        .execution_options(yield_per=STREAM_BATCH_SIZE)
+    )
+    sources, stages, messages, domains, targets, weights = [], [], [], [], [], []
+    result = await db.stream(query)
+    async for source, stage, messages_count, has_domain, ai_score, sale_stage in result:
+        sources.append(source.value)
+        messages.append(messages_count)
+        domains.append(has_domain)
+        if sale_stage in (SaleStage.paid, SaleStage.lost):
+            # Ознаки на момент передачі, а не поточна стадія transferred
+            stages.append(ColdStage.qualified.value)
+            targets.append(1.0 if sale_stage == SaleStage.paid else 0.0)
+            weights.append(OUTCOME_WEIGHT)
+        else:
+            stages.append(stage.value)
+            targets.append(ai_score)
+            weights.append(1.0)
+    x = prescore.encode(sources, stages, messages, domains)
+    return x, np.asarray(targets, dtype=float), np.asarray(weights, dtype=float)
+
+
+async def fit_from_history(db: AsyncSession, path: str | None = None) -> prescore.PrescoreModel:
+    """Навчає модель на історії, зберігає у path (за замовчуванням PRESCORE_MODEL_PATH)."""
+    path = path or settings.PRESCORE_MODEL_PATH
+    if not path:
+        raise ValueError("PRESCORE_MODEL_PATH is not configured")
+    x, targets, weights = await load_training_data(db)
+    model = prescore.fit(x, targets, weights)
+    prescore.save_model(model, path)
+    prescore.reset_model()
+    return model
+
+
+async def score_all_leads(db: AsyncSession, model: prescore.PrescoreModel) -> dict:
+    """
+    Оцінює всю таблицю лідів одним векторним проходом і рахує, скільки з них
+    вирішилося б локально, а скільки пішло б у Claude при поточній смузі.
+    """
+    query = select(*_feature_columns()).execution_options(yield_per=STREAM_BATCH_SIZE)
+    sources, stages, messages, domains = [], [], [], []
+    result = await db.stream(query)
+    async for source, stage, messages_count, has_domain in result:
+        sources.append(source.value)
+        stages.append(stage.value)
+        messages.append(messages_count)
+        domains.append(has_domain)
+
+    scores = model.score(sources, stages, messages, domains)
+    low, high = settings.PRESCORE_BAND_LOW, settings.PRESCORE_BAND_HIGH
+    decisions = Counter({
+        "local_low": int(np.count_nonzero(scores < low)),
+        "claude": int(np.count_nonzero((scores >= low) & (scores <= high))),
+        "local_high": int(np.count_nonzero(scores > high)),
+    })
+    total = len(scores)
+    return {
+        "leads": total,
+        "band": [low, high],
+        **decisions,
+        "claude_share": round(decisions["claude"] / total, 4) if total else 0.0,
+        "score_histogram": np.histogram(scores, bins=10, range=(0.0, 1.0))[0].tolist(),
+    }
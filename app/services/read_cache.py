@@ -0,0 +1,159 @@
+"""
+Read-through кеш серіалізованих відповідей GET /leads/{id}, /sales/{id}, /leads/{id}/sale.
+
+Ключі — (kind, id): ("lead", lead_id), ("sale", sale_id), ("sale_by_lead", lead_id).
+Сервісні функції, що змінюють ліди й продажі, викликають invalidate() у своїй
+транзакції: ключі видаляються локально, а pg_notify розсилає їх іншим процесам
+після COMMIT (NOTIFY транзакційний).
+
+Щоб читач не поклав у кеш рядок, прочитаний до паралельного запису,
+payload зберігається тільки якщо за час читання не було жодної інвалідації.
+"""
+
+import uuid
+from datetime import datetime
+from typing import Awaitable, Callable, NamedTuple
+
+from pydantic import BaseModel
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import metrics
+from app.cache import TTLCache
+from app.config import settings
+
+CHANNEL = "crm_cache_invalidate"
+
+# Максимальний payload NOTIFY — 8000 байт
+_NOTIFY_MAX_BYTES = 7800
+
+class CachedEntry(NamedTuple):
+    payload: bytes
+    # Для ETag / Last-Modified без повторного читання з БД
+    entity_id: uuid.UUID
+    updated_at: datetime
+
+
+cache = TTLCache(settings.READ_CACHE_MAX_ENTRIES, settings.READ_CACHE_TTL_SECONDS)
+metrics.cache_entries.add(lambda: len(cache), "read")
+
+KINDS = ("lead", "sale", "sale_by_lead")
+# Дочірні серії наперед: гаряча гілка — тільки пошук у dict
+_lookups = {
+    (kind, result): metrics.read_cache_lookups.labels(kind, result)
+    for kind in KINDS
+    for result in ("hit", "miss")
+}
+
+_epoch = 0
+
+
+def _drop(keys) -> None:
+    global _epoch
+    _epoch += 1
+    for key in keys:
+        cache.pop(key)
+
+
+def lead_keys(lead_id: uuid.UUID) -> list[tuple[str, uuid.UUID]]:
+    return [("lead", lead_id)]
+
+
+def sale_keys(sale_id: uuid.UUID, lead_id: uuid.UUID) -> list[tuple[str, uuid.UUID]]:
+    return [("sale", sale_id), ("sale_by_lead", lead_id)]
+
+
+async def invalidate(db: AsyncSession, keys: list[tuple[str, uuid.UUID]]) -> None:
+    """Видаляє ключі локально і ставить NOTIFY для інших процесів у поточну транзакцію."""
+    if not settings.READ_CACHE_ENABLED or not keys:
+        return
+    _drop(keys)
+
+    payloads, current = [], []
+    size = 0
+    for kind, key_id in keys:
+        item = f"{kind}:{key_id}"
+        if current and size + len(item) + 1 > _NOTIFY_MAX_BYTES:
+            payloads.append(",".join(current))
+            current, size = [], 0
+        current.append(item)
+        size += len(item) + 1
+    payloads.append(",".join(current))
+
+    for payload in payloads:
+        await db.execute(select(func.pg_notify(CHANNEL, payload)))
+
+
+def on_notification(payload: str) -> None:
+    keys = []
+    for item in payload.split(","):
+        kind, _, key_id = item.partition(":")
+        try:
+            keys.append((kind, uuid.UUID(key_id)))
+        except ValueError:
+            continue
+    _drop(keys)
+
+
+def reset() -> None:
+    global _epoch
+    _epoch += 1
+    cache.clear()
+
+
+def _get(key: tuple[str, uuid.UUID]) -> CachedEntry | None:
+    entry = cache.get(key)
+    _lookups[key[0], "hit" if entry is not None else "miss"].inc()
+    return entry
+
+
+def peek(key: tuple[str, uuid.UUID]) -> CachedEntry | None:
+    if not settings.READ_CACHE_ENABLED:
+        return None
+    return _get(key)
+
+
+def _entry(obj, schema: type[BaseModel]) -> CachedEntry:
+    model = schema.model_validate(obj)
+    return CachedEntry(model.model_dump_json().encode(), model.id, model.updated_at)
+
+
+async def read_through(
+    key: tuple[str, uuid.UUID],
+    load: Callable[[], Awaitable[object | None]],
+    schema: type[BaseModel],
+) -> CachedEntry | None:
+    """Відповідь з кешу або з load(). None — об'єкт не знайдено (не кешується)."""
+    if not settings.READ_CACHE_ENABLED:
+        obj = await load()
+        return None if obj is None else _entry(obj, schema)
+
+    entry = _get(key)
+    if entry is not None:
+        return entry
+
+    epoch = _epoch
+    obj = await load()
+    if obj is None:
+        return None
+    entry = _entry(obj, schema)
+    if epoch == _epoch:
+        cache.set(key, entry)
+    return entry
+
+
+def cache_stats() -> dict:
+    by_kind = {
+        kind: {result: _lookups[kind, result].value for result in ("hit", "miss")}
+        for kind in KINDS
+    }
+    hits = sum(counts["hit"] for counts in by_kind.values())
+    misses = sum(counts["miss"] for counts in by_kind.values())
+    return {
+        "entries": len(cache),
+        "hits": hits,
+        "misses": misses,
+        "evictions": cache.evictions,
+        "hit_rate": hits / (hits + misses) if hits + misses else 0.0,
+        "by_kind": by_kind,
+    }
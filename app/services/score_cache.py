@@ -0,0 +1,262 @@
+"""
+Кеш AI-оцінок лідів.
+
+Оцінка залежить тільки від (source, stage, messages_count, has_business_domain),
+версії промпту і моделі, тому однакові входи можна не відправляти в Claude повторно.
+
+Два рівні:
+  - in-process LRU з TTL — відповідь без звернення до БД;
+  - таблиця ai_score_cache — переживає рестарт і спільна для всіх воркерів.
+
+Перед кешем — локальна попередня оцінка (app.ai.prescore), якщо модель
+завантажена: впевнені оцінки повертаються одразу і не кешуються (вони дешеві),
+а при помилці Claude локальна оцінка стає запасною відповіддю. Модуль
+prescore (і numpy) імпортується тільки якщо задано PRESCORE_MODEL_PATH.
+"""
+
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app import metrics
+from app.ai.claude_service import analyze_lead, analysis_fingerprint, PROMPT_VERSION
+from app.cache import TTLCache
+from app.config import settings
+from app.models.ai_cache import AIScoreCache
+from app.schemas.lead import AIResult
+
+logger = logging.getLogger(__name__)
+
+LOCAL_REASON = "Local pre-score outside the uncertainty band; Claude was not called."
+FALLBACK_REASON = "Local pre-score used because the Claude API call failed."
+
+memory_cache = TTLCache(settings.AI_CACHE_MAX_ENTRIES, settings.AI_CACHE_TTL_SECONDS)
+
+# Скільки аналізів закрито кожним рівнем (/metrics і /metrics/ai-cache)
+_memory_hits = metrics.ai_score_cache_lookups.labels("memory")
+_db_hits = metrics.ai_score_cache_lookups.labels("db")
+_misses = metrics.ai_score_cache_lookups.labels("miss")
+metrics.cache_entries.add(lambda: len(memory_cache), "ai_score")
+
+
+async def _get_durable(db: AsyncSession, fingerprint: str) -> AIResult | None:
+    result = await db.execute(
+        select(
+            AIScoreCache.score, AIScoreCache.recommendation, AIScoreCache.reason
+        ).where(
+            AIScoreCache.fingerprint == fingerprint,
+            AIScoreCache.expires_at > datetime.now(timezone.utc),
+        )
+    )
+    row = result.first()
+    if row is None:
+        return None
+    return AIResult(score=row.score, recommendation=row.recommendation, reason=row.reason)
+
+
+async def _get_durable_many(db: AsyncSession, fingerprints: list[str]) -> dict[str, AIResult]:
+    if not fingerprints:
+        return {}
+    result = await db.execute(
+        select(
+            AIScoreCache.fingerprint,
+            AIScoreCache.score, AIScoreCache.recommendation, AIScoreCache.reason,
+        ).where(
+            AIScoreCache.fingerprint.in_(fingerprints),
+            AIScoreCache.expires_at > datetime.now(timezone.utc),
+        )
+    )
+    return {
+        row.fingerprint: AIResult(
+            score=row.score, recommendation=row.recommendation, reason=row.reason
+        )
+        for row in result
+    }
+
+
+async def _put_durable(db: AsyncSession, results: dict[str, AIResult]) -> None:
+    """Upsert у ai_score_cache одним statement. Комітить викликач — разом з оцінками лідів."""
+    if not results:
+        return
+    now = datetime.now(timezone.utc)
+    rows = [
+        dict(
+            fingerprint=fingerprint,
+            score=result.score,
+            recommendation=result.recommendation,
+            reason=result.reason,
+            model=settings.AI_MODEL,
+            prompt_version=PROMPT_VERSION,
+            created_at=now,
+            expires_at=now + timedelta(seconds=settings.AI_CACHE_DB_TTL_SECONDS),
+        )
+        for fingerprint, result in results.items()
+    ]
+    stmt = insert(AIScoreCache).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[AIScoreCache.fingerprint],
+        set_={
+            name: stmt.excluded[name]
+            for name in ("score", "recommendation", "reason", "model",
+                         "prompt_version", "created_at", "expires_at")
+        },
+    )
+    await db.execute(stmt)
+
+
+def _prescore():
+    """Модуль попередньої оцінки або None, якщо вона вимкнена."""
+    if not settings.PRESCORE_MODEL_PATH:
+        return None
+    from app.ai import prescore
+    return prescore
+
+
+async def cached_analyze_lead(
+    db: AsyncSession,
+    source: str,
+    stage: str,
+    messages_count: int,
+    has_business_domain: bool,
+) -> AIResult:
+    """analyze_lead з кешем: попередня оцінка → LRU → ai_score_cache → Claude."""
+    local = None
+    prescore = _prescore()
+    model = prescore.get_model() if prescore is not None else None
+    if model is not None:
+        local = model.score_one(source, stage, messages_count, has_business_domain)
+        if prescore.is_confident(local):
+            metrics.ai_prescore_decisions.labels("local").inc()
+            return prescore.to_result(local, LOCAL_REASON)
+        metrics.ai_prescore_decisions.labels("claude").inc()
+
+    fingerprint = analysis_fingerprint(source, stage, messages_count, has_business_domain)
+
+    result = memory_cache.get(fingerprint)
+    if result is not None:
+        _memory_hits.inc()
+        return result
+
+    result = await _get_durable(db, fingerprint)
+    if result is not None:
+        _db_hits.inc()
+        memory_cache.set(fingerprint, result)
+        return result
+
+    _misses.inc()
+    try:
+        result = await analyze_lead(
+            source=source,
+            stage=stage,
+            messages_count=messages_count,
+            has_business_domain=has_business_domain,
+        )
+    except Exception as e:
+        if local is None or not settings.PRESCORE_FALLBACK_ON_ERROR:
+            raise
+        logger.warning("Claude call failed, using local pre-score: %s", e)
+        metrics.ai_prescore_decisions.labels("fallback").inc()
+        return prescore.to_result(local, FALLBACK_REASON)
+    await _put_durable(db, {fingerprint: result})
+    memory_cache.set(fingerprint, result)
+    return result
+
+
+async def cached_analyze_many(
+    db: AsyncSession,
+    inputs: list[tuple[str, str, int, bool]],
+    concurrency: int,
+) -> dict[tuple[str, str, int, bool], AIResult | Exception]:
+    """
+    Пакетний варіант cached_analyze_lead для унікальних наборів входів.
+
+    Кеш перевіряється одним запитом на всі fingerprint-и, промахи йдуть у Claude
+    паралельно (не більше concurrency одночасно), нові оцінки пишуться одним upsert.
+    Сесія використовується тільки до і після паралельної частини.
+    Помилка виклику повертається як значення для свого набору входів.
+    Попередня оцінка рахується для всіх входів одним векторним викликом.
+    """
+    results: dict[tuple[str, str, int, bool], AIResult | Exception] = {}
+
+    local: dict[tuple[str, str, int, bool], float] = {}
+    prescore = _prescore()
+    model = prescore.get_model() if prescore is not None else None
+    if model is not None and inputs:
+        keys = list(inputs)
+        for key, score in zip(keys, model.score(*zip(*keys))):
+            score = float(score)
+            if prescore.is_confident(score):
+                results[key] = prescore.to_result(score, LOCAL_REASON)
+            else:
+                local[key] = score
+        metrics.ai_prescore_decisions.labels("local").inc(len(results))
+        metrics.ai_prescore_decisions.labels("claude").inc(len(local))
+        inputs = list(local)
+
+    fingerprints = {key: analysis_fingerprint(*key) for key in inputs}
+
+    pending = []
+    for key, fingerprint in fingerprints.items():
+        cached = memory_cache.get(fingerprint)
+        if cached is not None:
+            _memory_hits.inc()
+            results[key] = cached
+        else:
+            pending.append(key)
+
+    durable = await _get_durable_many(db, [fingerprints[key] for key in pending])
+    misses = []
+    for key in pending:
+        cached = durable.get(fingerprints[key])
+        if cached is not None:
+            _db_hits.inc()
+            memory_cache.set(fingerprints[key], cached)
+            results[key] = cached
+        else:
+            _misses.inc()
+            misses.append(key)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def call(key):
+        source, stage, messages_count, has_business_domain = key
+        async with semaphore:
+            return await analyze_lead(
+                source=source,
+                stage=stage,
+                messages_count=messages_count,
+                has_business_domain=has_business_domain,
+            )
+
+    fresh = await asyncio.gather(*(call(key) for key in misses), return_exceptions=True)
+    new_results = {}
+    for key, result in zip(misses, fresh):
+        if isinstance(result, AIResult):
+            new_results[fingerprints[key]] = result
+            memory_cache.set(fingerprints[key], result)
+        elif key in local and settings.PRESCORE_FALLBACK_ON_ERROR:
+            metrics.ai_prescore_decisions.labels("fallback").inc()
+            result = prescore.to_result(local[key], FALLBACK_REASON)
+        results[key] = result
+
+    await _put_durable(db, new_results)
+    return results
+
+
+def cache_stats() -> dict:
+    counts = {
+        "memory_hits": _memory_hits.value,
+        "db_hits": _db_hits.value,
+        "misses": _misses.value,
+    }
+    total = sum(counts.values())
+    hits = counts["memory_hits"] + counts["db_hits"]
+    return {
+        **counts,
+        "hit_rate": hits / total if total else 0.0,
+        "memory": memory_cache.stats(),
+    }
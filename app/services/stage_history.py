@@ -0,0 +1,202 @@
+"""
+Історія стадій: запис переходів і аналітика за часовим вікном.
+
+Переходи пишуться в stage_history тим самим statement-ом / транзакцією, що й
+зміна стадії (див. lead_service). Таблиця розбита на місячні партиції;
+ensure_partitions створює їх на STAGE_HISTORY_PARTITIONS_AHEAD місяців
+наперед (воркер щогодини, міграція 0009 — при розгортанні), а DEFAULT-
+партиція страхує запис, якщо воркер не запускався. Рядки, що встигли
+потрапити в DEFAULT, ensure_partitions переносить у нову партицію місяця.
+
+Аналітичні запити фільтрують changed_at діапазоном з параметрів, тож
+Postgres відкидає зайві партиції (при generic-плані asyncpg — на старті
+виконання) і читає тільки індекси потрібних місяців.
+"""
+
+from datetime import datetime, timezone
+from enum import Enum
+
+from sqlalchemy import DateTime, String, cast, extract, func, insert, literal, null, select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.models.stage_history import StageHistory
+
+DEFAULT_PARTITION = "stage_history_default"
+
+LEAD = "lead"
+SALE = "sale"
+
+_COLUMNS = [
+    "entity_type", "entity_id", "lead_id", "from_stage", "to_stage", "from_entered_at", "changed_at",
+]
+
+
+# ── Запис ─────────────────────────────────────────────────────────────────────
+
+def transition(
+    entity_type: str, entity_id, lead_id, from_stage, to_stage, from_entered_at, changed_at,
+) -> dict:
+    """Рядок stage_history; стадії — enum або None."""
+    return {
+        "entity_type": entity_type,
+        "entity_id": entity_id,
+        "lead_id": lead_id,
+        "from_stage": from_stage.value if from_stage is not None else None,
+        "to_stage": to_stage.value,
+        "from_entered_at": from_entered_at,
+        "changed_at": changed_at,
+    }
+
+
+async def record(db: AsyncSession, transitions: list[dict]) -> None:
+    """Пише переходи в поточну транзакцію. Комітить викликач."""
+    if transitions:
+        await db.execute(insert(StageHistory.__table__), transitions)
+
+
+def record_cte(source, entity_type: str, entity_id, lead_id, from_stage, to_stage,
+               from_entered_at, changed_at: datetime, *conditions, name: str = "history"):
+    """
+    INSERT INTO stage_history ... SELECT ... FROM source WHERE conditions — як CTE,
+    щоб додати його до UPDATE через add_cte() і записати перехід тим самим statement-ом.
+    from_stage / to_stage / from_entered_at — колонки source або Python-значення.
+    """
+    def _stage(value):
+        if value is None:
+            return null()
+        if isinstance(value, Enum):
+            return literal(value.value, String)
+        return cast(value, String)
+
+    return (
+        insert(StageHistory.__table__)
+        .from_select(
+            _COLUMNS,
+            select(
+                literal(entity_type, String),
+                entity_id,
+                lead_id,
+                _stage(from_stage),
+                _stage(to_stage),
+                from_entered_at if from_entered_at is not None else null(),
+                literal(changed_at, DateTime(timezone=True)),
+            )
+            .select_from(source)
+            .where(*conditions),
+        )
+        .cte(name)
+    )
+
+
+# ── Партиції ──────────────────────────────────────────────────────────────────
+
+def _month_start(year: int, month: int) -> datetime:
+    year, month = year + (month - 1) // 12, (month - 1) % 12 + 1
+    return datetime(year, month, 1, tzinfo=timezone.utc)
+
+
+def partition_bounds(months_ahead: int, now: datetime | None = None):
+    """(ім'я, від, до) для поточного місяця і months_ahead наступних."""
+    now = now or datetime.now(timezone.utc)
+    for offset in range(months_ahead + 1):
+        start = _month_start(now.year, now.month + offset)
+        end = _month_start(start.year, start.month + 1)
+        yield f"stage_history_y{start.year}m{start.month:02d}", start, end
+
+
+async def ensure_partitions(db: AsyncSession, months_ahead: int) -> list[str]:
+    """Створює відсутні місячні партиції. Повертає імена створених."""
+    created = []
+    for name, start, end in partition_bounds(months_ahead):
+        exists = await db.scalar(select(func.to_regclass(name)))
+        if exists is not None:
+            continue
+        bounds = f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        if await _default_has_rows(db, start, end):
+            await _split_default(db, name, bounds, start, end)
+        else:
+            # CREATE ... PARTITION OF блокує батьківську таблицю — тільки якщо партиції ще немає
+            await db.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF stage_history {bounds}"))
+        await db.commit()
+        created.append(name)
+    return created
+
+
+async def _default_has_rows(db: AsyncSession, start: datetime, end: datetime) -> bool:
+    return await db.scalar(
+        text(
+            f"SELECT EXISTS (SELECT 1 FROM {DEFAULT_PARTITION} "
+            "WHERE changed_at >= :start AND changed_at < :end)"
+        ),
+        {"start": start, "end": end},
+    )
+
+
+async def _split_default(db: AsyncSession, name: str, bounds: str, start: datetime, end: datetime) -> None:
+    """
+    Місяць уже має рядки в DEFAULT (воркер не запускався вчасно) — тоді
+    CREATE ... PARTITION OF падає на перевірці DEFAULT-партиції. В одній
+    транзакції: від'єднати DEFAULT, створити партицію, перенести в неї рядки
+    місяця і приєднати DEFAULT назад. Запис у stage_history на цей час чекає.
+    """
+    await db.execute(text(f"ALTER TABLE stage_history DETACH PARTITION {DEFAULT_PARTITION}"))
+    await db.execute(text(f"CREATE TABLE {name} PARTITION OF stage_history {bounds}"))
+    await db.execute(
+        text(
+            f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} "
+            "WHERE changed_at >= :start AND changed_at < :end RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ),
+        {"start": start, "end": end},
+    )
+    await db.execute(text(f"ALTER TABLE stage_history ATTACH PARTITION {DEFAULT_PARTITION} DEFAULT"))
+
+
+# ── Аналітика ─────────────────────────────────────────────────────────────────
+
+def _window(entity_type: str, start: datetime, end: datetime) -> list:
+    return [
+        StageHistory.entity_type == entity_type,
+        StageHistory.changed_at >= start,
+        StageHistory.changed_at < end,
+    ]
+
+
+async def dwell_times(db: AsyncSession, entity_type: str, start: datetime, end: datetime) -> list:
+    """
+    Час у стадії для переходів з вікна [start, end): кількість, середнє, p50, p90
+    (секунди) по стадії, з якої вийшли. Переходи з невідомим входом не враховуються.
+    """
+    seconds = extract("epoch", StageHistory.changed_at - StageHistory.from_entered_at)
+    result = await db.execute(
+        select(
+            StageHistory.from_stage.label("stage"),
+            func.count().label("transitions"),
+            func.avg(seconds).label("avg_seconds"),
+            func.percentile_cont(0.5).within_group(seconds).label("p50_seconds"),
+            func.percentile_cont(0.9).within_group(seconds).label("p90_seconds"),
+        )
+        .where(
+            *_window(entity_type, start, end),
+            StageHistory.from_stage.isnot(None),
+            StageHistory.from_entered_at.isnot(None),
+        )
+        .group_by(StageHistory.from_stage)
+        .order_by(StageHistory.from_stage)
+    )
+    return list(result.all())
+
+
+async def transition_counts(db: AsyncSession, entity_type: str, start: datetime, end: datetime) -> list:
+    """Кількість переходів (from_stage → to_stage) у вікні [start, end)."""
+    result = await db.execute(
+        select(
+            StageHistory.from_stage,
+            StageHistory.to_stage,
+            func.count().label("count"),
+        )
+        .where(*_window(entity_type, start, end))
+        .group_by(StageHistory.from_stage, StageHistory.to_stage)
+        .order_by(StageHistory.from_stage.nulls_first(), StageHistory.to_stage)
+    )
+    return list(result.all())
@@ -0,0 +1,212 @@
+"""
+Воркер черги AI-аналізу.
+
+    python -m app.worker
+
+Забирає задачі з analysis_jobs (SKIP LOCKED), виконує run_ai_analysis
+і записує результат. Можна запускати скільки завгодно екземплярів.
+
+Паралельно працює планувальник переоцінки: раз на RESCORE_INTERVAL_SECONDS
+бере до RESCORE_BATCH_SIZE лідів із застарілою оцінкою і аналізує їх пакетом.
+Між екземплярами воркера планувальник один — під advisory lock.
+
+Раз на годину — обслуговування: видаляються події outbox, старші за
+OUTBOX_RETENTION_DAYS, і створюються наступні місячні партиції stage_history.
+Раз на PIPELINE_STATS_RECONCILE_INTERVAL_SECONDS лічильники воронки
+звіряються з leads / sales. З ARCHIVE_ENABLED раз на ARCHIVE_INTERVAL_SECONDS
+закриті ліди і продажі, старші за ARCHIVE_AFTER_DAYS, переносяться в архів.
+"""
+
+import asyncio
+import contextlib
+import logging
+import signal
+import uuid
+from datetime import timedelta
+
+from sqlalchemy import text
+
+from app import metrics
+from app.ai import AIOverloadedError, start_client, close_client
+from app.config import settings
+from app.db import AsyncSessionLocal, engine
+from app.services.archive_service import archive_all
+from app.services.event_feed import purge_events
+from app.services.pipeline_stats import reconcile
+from app.services.stage_history import ensure_partitions
+from app.services.job_service import claim_jobs, complete_job, fail_job, get_job
+from app.services.lead_service import (
+    find_stale_leads, get_lead, run_ai_analysis, run_batch_ai_analysis,
+)
+
+logger = logging.getLogger("app.worker")
+
+# Ключ pg_try_advisory_lock планувальника переоцінки
+RESCORE_LOCK_KEY = 0x52455343  # "RESC"
+
+MAINTENANCE_INTERVAL_SECONDS = 3600
+
+
+async def process_job(job_id: uuid.UUID) -> None:
+    async with AsyncSessionLocal() as db:
+        job = await get_job(db, job_id)
+        if job is None:
+            return
+        lead = await get_lead(db, job.lead_id)
+        if lead is None:
+            await fail_job(db, job, "Lead not found", retry=False)
+            return
+        attempt = job.attempts
+        try:
+            result = await run_ai_analysis(db, lead)
+        except Exception as e:
+            logger.warning("Job %s attempt %s failed: %s", job_id, attempt, e)
+            await db.rollback()
+            # rollback робить об'єкти expired — перечитуємо задачу
+            job = await get_job(db, job_id)
+            await fail_job(
+                db, job, f"{type(e).__name__}: {e}",
+                retry_after=e.retry_after if isinstance(e, AIOverloadedError) else 0.0,
+            )
+        else:
+            await complete_job(db, job, result)
+
+
+async def _sleep(stop: asyncio.Event, seconds: float) -> None:
+    with contextlib.suppress(asyncio.TimeoutError):
+        await asyncio.wait_for(stop.wait(), seconds)
+
+
+async def run_worker(stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        async with AsyncSessionLocal() as db:
+            jobs = await claim_jobs(db, settings.JOB_WORKER_CONCURRENCY)
+        if not jobs:
+            await _sleep(stop, settings.JOB_POLL_INTERVAL_SECONDS)
+            continue
+        await asyncio.gather(*(process_job(job.id) for job in jobs))
+
+
+async def rescore_stale_leads() -> None:
+    """Один прохід переоцінки, якщо advisory lock не тримає інший воркер."""
+    # Lock на окремому з'єднанні: сесія аналізу віддає своє в пул після кожного COMMIT
+    async with engine.connect() as lock_conn:
+        locked = await lock_conn.scalar(
+            text("SELECT pg_try_advisory_lock(:key)"), {"key": RESCORE_LOCK_KEY}
+        )
+        await lock_conn.commit()
+        if not locked:
+            return
+        try:
+            async with AsyncSessionLocal() as db:
+                lead_ids = await find_stale_leads(db, settings.RESCORE_BATCH_SIZE)
+                if not lead_ids:
+                    return
+                result = await run_batch_ai_analysis(
+                    db, lead_ids, limit=len(lead_ids),
+                    retry_failed_after=timedelta(seconds=settings.RESCORE_RETRY_DELAY_SECONDS),
+                )
+            metrics.ai_rescored_leads.labels("analyzed").inc(result.analyzed)
+            metrics.ai_rescored_leads.labels("failed").inc(result.failed)
+            logger.info(
+                "Re-analyzed %s stale leads (%s failed) in %.1fs",
+                result.analyzed, result.failed, result.duration_seconds,
+            )
+        finally:
+            await lock_conn.execute(
+                text("SELECT pg_advisory_unlock(:key)"), {"key": RESCORE_LOCK_KEY}
+            )
+            await lock_conn.commit()
+
+
+async def run_rescore_scheduler(stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        try:
+            await rescore_stale_leads()
+        except Exception:
+            logger.exception("Rescore pass failed")
+        await _sleep(stop, settings.RESCORE_INTERVAL_SECONDS)
+
+
+async def run_maintenance(stop: asyncio.Event) -> None:
+    # Кілька воркерів можуть робити це одночасно — обидві дії ідемпотентні
+    while not stop.is_set():
+        try:
+            async with AsyncSessionLocal() as db:
+                deleted = await purge_events(db, timedelta(days=settings.OUTBOX_RETENTION_DAYS))
+            if deleted:
+                logger.info("Purged %s outbox events", deleted)
+        except Exception:
+            logger.exception("Outbox purge failed")
+        try:
+            async with AsyncSessionLocal() as db:
+                created = await ensure_partitions(db, settings.STAGE_HISTORY_PARTITIONS_AHEAD)
+            if created:
+                logger.info("Created stage history partitions: %s", ", ".join(created))
+        except Exception:
+            logger.exception("Stage history partition maintenance failed")
+        await _sleep(stop, MAINTENANCE_INTERVAL_SECONDS)
+
+
+async def run_stats_reconciler(stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        try:
+            async with AsyncSessionLocal() as db:
+                drifted = await reconcile(db)
+            if drifted:
+                logger.warning("Pipeline stats drifted on %s keys, corrected", drifted)
+        except Exception:
+            logger.exception("Pipeline stats reconciliation failed")
+        await _sleep(stop, settings.PIPELINE_STATS_RECONCILE_INTERVAL_SECONDS)
+
+
+async def run_archiver(stop: asyncio.Event) -> None:
+    # Кілька воркерів не заважають один одному: кандидати беруться SKIP LOCKED
+    while not stop.is_set():
+        try:
+            async with AsyncSessionLocal() as db:
+                reports = await archive_all(
+                    db,
+                    timedelta(days=settings.ARCHIVE_AFTER_DAYS),
+                    batch_size=settings.ARCHIVE_BATCH_SIZE,
+                    pause_seconds=settings.ARCHIVE_PAUSE_SECONDS,
+                    stop=stop,
+                )
+            for report in reports:
+                metrics.archived_rows.labels(report.table).inc(report.rows)
+                if report.rows:
+                    logger.info(
+                        "Archived %s %s in %.1fs (%.0f rows/s, %s bytes of rows moved)",
+                        report.rows, report.table, report.seconds,
+                        report.rows_per_second, report.moved_bytes,
+                    )
+                for error in report.errors:
+                    logger.warning("Archiving %s stopped early: %s", report.table, error)
+        except Exception:
+            logger.exception("Archiving failed")
+        await _sleep(stop, settings.ARCHIVE_INTERVAL_SECONDS)
+
+
+async def main() -> None:
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    if settings.ANTHROPIC_API_KEY:
+        start_client()
+    logger.info("Analysis worker started")
+    tasks = [run_worker(stop), run_maintenance(stop), run_stats_reconciler(stop)]
+    if settings.RESCORE_ENABLED:
+        tasks.append(run_rescore_scheduler(stop))
+    if settings.ARCHIVE_ENABLED:
+        tasks.append(run_archiver(stop))
+    try:
+        await asyncio.gather(*tasks)
+    finally:
+        await close_client()
+    logger.info("Analysis worker stopped")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(levelname)-5.5s [%(name)s] %(message)s")
+    asyncio.run(main())
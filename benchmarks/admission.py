@@ -0,0 +1,340 @@
+"""
+Контроль допуску викликів Claude проти fake сервера зі сценарієм 429 і затримок.
+
+    python -m benchmarks.admission --requests 600 --concurrency 64 \\
+        --rpm 300 --script "200:400x100,429x20,200:1500x30"
+
+Fake Anthropic (benchmarks.fake_anthropic) піднімається в тому ж процесі на
+вільному порту.
+
+Спершу — перевірки зі сценарними відповідями; будь-яка невдала дає код
+виходу 1:
+  - 429 з retry-after після повторів SDK — AIOverloadedError з тим самим
+    retry_after, адаптивний ліміт падає вдвічі, відро ключа призупинене, і
+    наступний виклик відхиляється без запиту до upstream;
+  - повна черга допуску — миттєва відмова з Retry-After не менше 1;
+  - `POST /leads/{id}/analyze` через httpx.ASGITransport — 503 з Retry-After
+    від upstream, а задача `?async=true` після відмови воркера повертається в
+    чергу не раніше retry_after. Потрібен PostgreSQL (DATABASE_URL); без нього
+    ці перевірки пропускаються з позначкою skip.
+
+Потім навантаження (`--checks-only` — без нього): прямі виклики analyze_lead
+від --concurrency одночасних «менеджерів», БД не потрібна. Звіт: скільки
+викликів пройшло, скільки відхилено швидким 503 (і за скільки мілісекунд),
+скільки закінчилось 429 після повторів SDK, p50/p95 латентності, максимум
+одночасних запитів, що дійшли до upstream, і стан адаптивного ліміту в кінці.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import socket
+import statistics
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+
+import httpx
+import uvicorn
+
+from app import ai
+from app.ai import AIOverloadedError, admission_stats, analyze_lead
+from app.config import settings
+from app.main import app
+from app.models import BusinessDomain, ColdStage, LeadSource
+from app.worker import process_job
+from benchmarks import fake_anthropic
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _percentile(values: list[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+# ── Перевірки ────────────────────────────────────────────────────────────────
+
+# retry-after сценарних 429 у перевірках; більший за backoff першої спроби задачі
+CHECK_RETRY_AFTER_SECONDS = 30
+
+
+class Checks:
+    def __init__(self):
+        self.results: list[tuple[str, str, str]] = []
+
+    def expect(self, name: str, ok: bool, detail: object = "") -> None:
+        self.results.append((name, "ok" if ok else "FAIL", str(detail)))
+
+    def skip(self, name: str, reason: str) -> None:
+        self.results.append((name, "skip", reason))
+
+    @property
+    def failed(self) -> bool:
+        return any(status == "FAIL" for _, status, _ in self.results)
+
+    def print(self) -> None:
+        for name, status, detail in self.results:
+            print(f"{status:>4}  {name}" + (f"  ({detail})" if detail else ""))
+
+
+async def _restart_client(**overrides) -> None:
+    """Новий клієнт — новий контролер допуску з чистим лімітом і відром."""
+    for name, value in overrides.items():
+        setattr(settings, name, value)
+    await ai.close_client()
+    ai.start_client()
+
+
+async def _overloaded() -> AIOverloadedError | None:
+    """Виклик analyze_lead: AIOverloadedError або None, якщо аналіз пройшов."""
+    try:
+        await analyze_lead(source="manual", stage="new", messages_count=1, has_business_domain=False)
+    except AIOverloadedError as e:
+        return e
+    return None
+
+
+def _bucket() -> dict:
+    return next(iter(admission_stats()["buckets"].values()))
+
+
+async def _until(condition, timeout: float = 5.0) -> None:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            raise TimeoutError("condition was not reached")
+        await asyncio.sleep(0.01)
+
+
+async def check_upstream_429(checks: Checks) -> None:
+    fake_anthropic.configure("429", None, retry_after_seconds=3)
+    await _restart_client(AI_MAX_CONCURRENCY=8, AI_ADMISSION_TIMEOUT_SECONDS=1.0)
+
+    error = await _overloaded()
+    checks.expect(
+        "429: AIOverloadedError від upstream",
+        error is not None and error.__cause__ is not None, repr(error),
+    )
+    checks.expect(
+        "429: retry_after з заголовка retry-after",
+        error is not None and error.retry_after_header == "3",
+        error and error.retry_after_header,
+    )
+    stats = admission_stats()
+    checks.expect("429: ліміт упав вдвічі", stats["limit"] == 4, stats["limit"])
+    checks.expect("429: відро призупинене", _bucket()["paused_seconds"] > 2, _bucket())
+
+    # Пауза (3 с) довша за дедлайн черги (1 с) — відмова без запиту до upstream
+    requests = fake_anthropic.stats["requests"]
+    error = await _overloaded()
+    checks.expect(
+        "429: наступний виклик відхилено під час паузи",
+        error is not None and error.__cause__ is None
+        and int(error.retry_after_header) >= 2
+        and fake_anthropic.stats["requests"] == requests,
+        error and error.retry_after_header,
+    )
+
+
+async def check_queue_full(checks: Checks) -> None:
+    fake_anthropic.configure("200:1500", None)
+    await _restart_client(
+        AI_MAX_CONCURRENCY=1, AI_ADMISSION_QUEUE_SIZE=1, AI_ADMISSION_TIMEOUT_SECONDS=5.0,
+    )
+    running = asyncio.create_task(_overloaded())
+    await _until(lambda: admission_stats()["in_flight"] == 1)
+    queued = asyncio.create_task(_overloaded())
+    await _until(lambda: admission_stats()["queued"] == 1)
+
+    started = time.perf_counter()
+    error = await _overloaded()
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    checks.expect(
+        "черга повна: миттєва відмова",
+        error is not None and error.__cause__ is None and elapsed_ms < 100,
+        f"{elapsed_ms:.1f} ms",
+    )
+    checks.expect(
+        "черга повна: Retry-After >= 1",
+        error is not None and int(error.retry_after_header) >= 1,
+        error and error.retry_after_header,
+    )
+    results = await asyncio.gather(running, queued)
+    checks.expect("черга повна: виклик і черговий пройшли", results == [None, None], results)
+
+
+async def check_endpoint(checks: Checks) -> None:
+    names = ("POST /analyze: 503 + Retry-After", "воркер: задача в черзі не раніше retry_after")
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        if not app.state.ready:
+            for name in names:
+                checks.skip(name, "PostgreSQL недоступний")
+            return
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            lead = (await client.post("/leads/", json={"source": "manual"})).json()
+            # Унікальні входи: кеш оцінок не має відповіді, виклик іде в Claude
+            await client.patch(
+                f"/leads/{lead['id']}/messages",
+                json={"messages_count": random.randint(10**6, 10**9)},
+            )
+            fake_anthropic.configure("429", None, retry_after_seconds=CHECK_RETRY_AFTER_SECONDS)
+
+            await _restart_client(AI_MAX_CONCURRENCY=8, AI_ADMISSION_TIMEOUT_SECONDS=1.0)
+            response = await client.post(f"/leads/{lead['id']}/analyze")
+            checks.expect(
+                names[0],
+                response.status_code == 503
+                and response.headers.get("retry-after") == str(CHECK_RETRY_AFTER_SECONDS),
+                f"{response.status_code} Retry-After={response.headers.get('retry-after')}",
+            )
+            response = await client.post(f"/leads/{lead['id']}/analyze")
+            checks.expect(
+                "POST /analyze: 503 під час паузи",
+                response.status_code == 503 and int(response.headers.get("retry-after", 0)) >= 1,
+                f"{response.status_code} Retry-After={response.headers.get('retry-after')}",
+            )
+
+            await _restart_client()
+            job = (await client.post(f"/leads/{lead['id']}/analyze", params={"async": "true"})).json()
+            failed_at = datetime.now(timezone.utc)
+            await process_job(uuid.UUID(job["id"]))
+            job = (await client.get(f"/jobs/{job['id']}")).json()
+            delay = (datetime.fromisoformat(job["run_after"]) - failed_at).total_seconds()
+            checks.expect(
+                names[1],
+                job["status"] == "queued" and delay >= CHECK_RETRY_AFTER_SECONDS - 1,
+                f"{job['status']}, run_after через {delay:.1f} s",
+            )
+
+
+async def run_checks() -> Checks:
+    checks = Checks()
+    settings.AI_MAX_RETRIES = 0
+    settings.AI_ADMISSION_QUEUE_SIZE = 4
+    for check in (check_upstream_429, check_queue_full, check_endpoint):
+        try:
+            await check(checks)
+        except Exception as e:
+            checks.expect(check.__name__, False, repr(e))
+    await ai.close_client()
+    return checks
+
+
+# ── Навантаження ─────────────────────────────────────────────────────────────
+
+async def run(args) -> dict:
+    outcomes = Counter()
+    latencies: dict[str, list[float]] = {"ok": [], "rejected": [], "error": []}
+    retry_after = []
+    limits = []
+    remaining = iter(range(args.requests))
+
+    async def manager() -> None:
+        for _ in remaining:
+            started = time.perf_counter()
+            try:
+                await analyze_lead(
+                    source=random.choice(list(LeadSource)).value,
+                    stage=random.choice(list(ColdStage)).value,
+                    messages_count=random.randint(0, 30),
+                    has_business_domain=random.choice([None, *BusinessDomain]) is not None,
+                )
+                outcome = "ok"
+            except AIOverloadedError as e:
+                outcome = "upstream_429" if e.__cause__ is not None else "rejected"
+                retry_after.append(e.retry_after)
+            except Exception:
+                outcome = "error"
+            elapsed = time.perf_counter() - started
+            outcomes[outcome] += 1
+            latencies["rejected" if outcome == "upstream_429" else outcome].append(elapsed)
+            stats = admission_stats()
+            if stats:
+                limits.append(stats["limit"])
+            if outcome != "ok" and args.think_ms:
+                await asyncio.sleep(args.think_ms / 1000)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(manager() for _ in range(args.concurrency)))
+    duration = time.perf_counter() - started
+
+    def ms(values: list[float], q: float) -> float:
+        return round(_percentile(values, q) * 1000, 1)
+
+    return {
+        "duration_seconds": round(duration, 2),
+        "throughput_rps": round(outcomes["ok"] / duration, 1),
+        "outcomes": dict(outcomes),
+        "latency_ms": {
+            name: {"p50": ms(values, 0.5), "p95": ms(values, 0.95), "max": ms(values, 1.0)}
+            for name, values in latencies.items() if values
+        },
+        "retry_after_median_s": round(statistics.median(retry_after), 2) if retry_after else None,
+        "limit": {"min": min(limits, default=None), "final": limits[-1] if limits else None},
+        "upstream": dict(fake_anthropic.stats),
+        "admission": admission_stats(),
+    }
+
+
+async def main(args) -> int:
+    random.seed(args.seed)
+    port = _free_port()
+    server = uvicorn.Server(uvicorn.Config(
+        fake_anthropic.app, host="127.0.0.1", port=port, log_level="warning",
+    ))
+    serving = asyncio.create_task(server.serve())
+    while not server.started:
+        await asyncio.sleep(0.01)
+
+    settings.ANTHROPIC_API_KEY = "fake-benchmark-key"
+    settings.ANTHROPIC_BASE_URL = f"http://127.0.0.1:{port}"
+    try:
+        checks = await run_checks()
+        checks.print()
+        if args.checks_only:
+            return int(checks.failed)
+
+        fake_anthropic.configure(args.script, args.rpm)
+        fake_anthropic.stats.update(requests=0, errors=0, rate_limited=0, max_in_flight=0)
+        await _restart_client(
+            AI_MAX_RETRIES=args.max_retries,
+            AI_MAX_CONCURRENCY=args.max_concurrency,
+            AI_ADMISSION_QUEUE_SIZE=args.queue_size,
+            AI_ADMISSION_TIMEOUT_SECONDS=args.queue_timeout,
+        )
+        report = await run(args)
+    finally:
+        await ai.close_client()
+        server.should_exit = True
+        await serving
+    print(json.dumps(report, indent=2))
+    return int(checks.failed)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=600)
+    parser.add_argument("--concurrency", type=int, default=64, help="одночасних «менеджерів»")
+    parser.add_argument("--rpm", type=float, default=300, help="квота fake сервера, запитів на хвилину")
+    parser.add_argument("--script", default="200:400x100,429x20,200:1500x30",
+                        help="сценарій відповідей fake сервера (див. benchmarks.fake_anthropic)")
+    parser.add_argument("--max-concurrency", type=int, default=settings.AI_MAX_CONCURRENCY)
+    parser.add_argument("--queue-size", type=int, default=settings.AI_ADMISSION_QUEUE_SIZE)
+    parser.add_argument("--queue-timeout", type=float, default=settings.AI_ADMISSION_TIMEOUT_SECONDS)
+    parser.add_argument("--max-retries", type=int, default=settings.AI_MAX_RETRIES)
+    parser.add_argument("--think-ms", type=float, default=200,
+                        help="пауза «менеджера» після відмови перед наступним запитом")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--checks-only", action="store_true", help="тільки перевірки, без навантаження")
+    sys.exit(asyncio.run(main(parser.parse_args())))
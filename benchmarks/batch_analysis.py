@@ -0,0 +1,70 @@
+"""
+Прогін пакетного AI-аналізу проти fake Anthropic сервера.
+
+    uvicorn benchmarks.fake_anthropic:app --port 8090 &
+    ANTHROPIC_API_KEY=fake ANTHROPIC_BASE_URL=http://127.0.0.1:8090 \\
+        python -m benchmarks.batch_analysis --leads 5000 --batch 1000 --no-cache
+
+Потрібна мігрована БД з DATABASE_URL. Сідує ліди з випадковими входами
+і друкує результат кожного пакета (пропускна здатність, помилки) як JSON.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import uuid
+from datetime import datetime, timezone
+
+import httpx
+from sqlalchemy import delete, insert
+
+from app.db import AsyncSessionLocal
+from app.main import app
+from app.models import Lead, AIScoreCache, LeadSource, BusinessDomain, ColdStage
+from app.services.score_cache import memory_cache
+
+
+async def seed(count: int) -> list[uuid.UUID]:
+    now = datetime.now(timezone.utc)
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "source": random.choice(list(LeadSource)),
+            "stage": random.choice([ColdStage.new, ColdStage.contacted, ColdStage.qualified]),
+            "business_domain": random.choice([None, *BusinessDomain]),
+            "messages_count": random.randint(0, 30),
+            "created_at": now,
+            "updated_at": now,
+        }
+        for _ in range(count)
+    ]
+    async with AsyncSessionLocal() as db:
+        await db.execute(insert(Lead.__table__), rows)
+        await db.commit()
+    return [row["id"] for row in rows]
+
+
+async def main(args) -> None:
+    if args.no_cache:
+        memory_cache.clear()
+        async with AsyncSessionLocal() as db:
+            await db.execute(delete(AIScoreCache))
+            await db.commit()
+
+    ids = await seed(args.leads)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for start in range(0, len(ids), args.batch):
+            batch = [str(i) for i in ids[start:start + args.batch]]
+            response = await client.post("/leads/analyze/batch", json={"lead_ids": batch})
+            print(json.dumps({"batch": start // args.batch, "status": response.status_code,
+                              **response.json()}))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leads", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--no-cache", action="store_true", help="очистити кеш оцінок перед прогоном")
+    asyncio.run(main(parser.parse_args()))
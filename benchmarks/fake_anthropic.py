@@ -0,0 +1,178 @@
+"""
+Локальний fake Anthropic Messages API для навантажувальних прогонів.
+
+Відповідає на POST /v1/messages у форматі Claude; оцінка детермінована
+від тексту запиту, тому однакові входи дають однаковий результат.
+
+    FAKE_LATENCY_MS=800 FAKE_ERROR_RATE=0.05 \\
+        uvicorn benchmarks.fake_anthropic:app --port 8090
+
+і в сервісі: ANTHROPIC_BASE_URL=http://127.0.0.1:8090
+
+Перевантаження для контролю допуску:
+  - FAKE_REQUESTS_PER_MINUTE — квота як у Anthropic: кожна відповідь містить
+    anthropic-ratelimit-requests-limit / -remaining / -reset, понад квоту — 429
+    з retry-after;
+  - FAKE_SCRIPT — сценарій відповідей по черзі (по колу), кроки через кому:
+    `статус[:затримка_мс][xN]`, напр. `200:300x50,429x10,529x2,200:900x20`.
+    Крок 200 без затримки бере FAKE_LATENCY_MS; 429 / 529 відповідають одразу.
+Сценарій і квоту можна змінити без рестарту: PUT /script {"script": ...,
+"requests_per_minute": ..., "retry_after_seconds": ...}; retry-after сценарних
+429 — FAKE_RETRY_AFTER_SECONDS.
+"""
+
+import asyncio
+import hashlib
+import itertools
+import json
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+LATENCY_MS = float(os.getenv("FAKE_LATENCY_MS", "500"))
+JITTER_MS = float(os.getenv("FAKE_JITTER_MS", "100"))
+ERROR_RATE = float(os.getenv("FAKE_ERROR_RATE", "0"))
+RETRY_AFTER_SECONDS = float(os.getenv("FAKE_RETRY_AFTER_SECONDS", "1"))
+
+app = FastAPI(title="Fake Anthropic API")
+
+stats = {"requests": 0, "errors": 0, "rate_limited": 0, "in_flight": 0, "max_in_flight": 0}
+
+
+def parse_script(script: str) -> list[tuple[int, float | None]]:
+    """`200:300x50,429x10` → [(200, 300.0)] * 50 + [(429, None)] * 10."""
+    steps = []
+    for part in filter(None, (p.strip() for p in script.split(","))):
+        step, _, repeat = part.partition("x")
+        status, _, latency = step.partition(":")
+        steps.extend([(int(status), float(latency) if latency else None)] * int(repeat or 1))
+    return steps
+
+
+class Quota:
+    """Квота запитів на хвилину: відро на limit токенів, що повністю наповнюється за хвилину."""
+
+    def __init__(self, per_minute: float):
+        self.limit = per_minute
+        self.tokens = per_minute
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.limit, self.tokens + (now - self.updated) * self.limit / 60)
+        self.updated = now
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def headers(self) -> dict:
+        seconds_to_full = (self.limit - self.tokens) * 60 / self.limit
+        reset = datetime.now(timezone.utc) + timedelta(seconds=seconds_to_full)
+        return {
+            "anthropic-ratelimit-requests-limit": str(int(self.limit)),
+            "anthropic-ratelimit-requests-remaining": str(int(self.tokens)),
+            "anthropic-ratelimit-requests-reset": reset.isoformat().replace("+00:00", "Z"),
+        }
+
+    def retry_after(self) -> float:
+        return (1 - self.tokens) * 60 / self.limit
+
+
+state = {"script": None, "quota": None, "retry_after": RETRY_AFTER_SECONDS}
+
+
+def configure(
+    script: str | None,
+    requests_per_minute: float | None,
+    retry_after_seconds: float | None = None,
+) -> None:
+    steps = parse_script(script) if script else []
+    state["script"] = itertools.cycle(steps) if steps else None
+    state["quota"] = Quota(requests_per_minute) if requests_per_minute else None
+    state["retry_after"] = retry_after_seconds or RETRY_AFTER_SECONDS
+
+
+configure(os.getenv("FAKE_SCRIPT"), float(os.getenv("FAKE_REQUESTS_PER_MINUTE", "0")))
+
+
+def _error(status: int, kind: str, message: str, headers: dict) -> JSONResponse:
+    return JSONResponse(
+        {"type": "error", "error": {"type": kind, "message": message}},
+        status_code=status,
+        headers=headers,
+    )
+
+
+def _score(prompt: str) -> float:
+    digest = hashlib.sha256(prompt.encode()).digest()
+    return round(digest[0] / 255, 2)
+
+
+@app.post("/v1/messages")
+async def messages(request: Request):
+    body = await request.json()
+    prompt = body["messages"][-1]["content"]
+
+    stats["requests"] += 1
+    status, latency_ms = next(state["script"]) if state["script"] else (200, None)
+    quota, headers, retry_after = state["quota"], {}, state["retry_after"]
+    if quota is not None:
+        if not quota.take():
+            status, retry_after = 429, quota.retry_after()
+        headers = quota.headers()
+    if status in (429, 529):
+        stats["rate_limited"] += 1
+        if status == 529:
+            return _error(529, "overloaded_error", "Overloaded", headers)
+        headers["retry-after"] = str(max(1, round(retry_after)))
+        return _error(429, "rate_limit_error", "Number of requests has exceeded your rate limit", headers)
+
+    stats["in_flight"] += 1
+    stats["max_in_flight"] = max(stats["max_in_flight"], stats["in_flight"])
+    try:
+        if latency_ms is None:
+            latency_ms = max(0.0, LATENCY_MS + random.uniform(-JITTER_MS, JITTER_MS))
+        await asyncio.sleep(latency_ms / 1000)
+        if status >= 400 or random.random() < ERROR_RATE:
+            stats["errors"] += 1
+            return _error(status if status >= 400 else 500, "api_error", "fake failure", headers)
+    finally:
+        stats["in_flight"] -= 1
+
+    score = _score(prompt)
+    recommendation = (
+        "transfer_to_sales" if score >= 0.6
+        else "continue_nurturing" if score >= 0.3
+        else "mark_as_lost"
+    )
+    text = json.dumps({"score": score, "recommendation": recommendation, "reason": "Fake analysis."})
+    return JSONResponse({
+        "id": f"msg_{uuid.uuid4().hex}",
+        "type": "message",
+        "role": "assistant",
+        "model": body.get("model", "fake"),
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": len(prompt) // 4, "output_tokens": len(text) // 4},
+    }, headers=headers)
+
+
+@app.get("/stats")
+async def get_stats():
+    return stats
+
+
+@app.put("/script")
+async def set_script(request: Request):
+    """Новий сценарій / квота і скинуті лічильники."""
+    body = await request.json()
+    configure(body.get("script"), body.get("requests_per_minute"), body.get("retry_after_seconds"))
+    stats.update(requests=0, errors=0, rate_limited=0, max_in_flight=0)
+    return {"ok": True}
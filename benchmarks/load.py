@@ -0,0 +1,471 @@
+"""
+Навантажувальний прогін усіх ендпоінтів leads / sales.
+
+    python -m benchmarks.load --leads 20000 --sales 2000 --requests 500 \\
+        --concurrency 16 --ai-latency-ms 300 --truncate
+    python -m benchmarks.load --compare benchmarks/results/load-<before>.json
+
+Потрібен локальний Postgres з міграціями (DATABASE_URL): сервіс спирається на
+ON CONFLICT, RETURNING і pg_notify, тому SQLite-режиму немає.
+
+Застосунок викликається в процесі через httpx.ASGITransport з його lifespan.
+analyze_lead підмінюється fake-функцією з заданою затримкою, тож Claude API
+не потрібен. Сценарії виконуються по черзі, кожен — фіксованою кількістю
+конкурентних клієнтів. Для кожного сценарію звіт містить пропускну здатність,
+p50/p95/p99, коди відповідей і кількість SQL-запитів на запит (лічильник
+before_cursor_execute на engine). Результат пишеться в JSON, щоб прогони
+можна було порівнювати між собою (--compare).
+"""
+
+import argparse
+import asyncio
+import hashlib
+import itertools
+import json
+import random
+import statistics
+import subprocess
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Callable
+
+import httpx
+from sqlalchemy import delete, event, insert, text
+
+from app.db import AsyncSessionLocal, engine, read_engine
+from app.main import app
+from app.models import AIScoreCache, Lead, Sale, LeadSource, BusinessDomain, ColdStage, SaleStage
+from app.schemas.lead import AIResult
+from app.services import pipeline_stats, score_cache
+from app.services.lead_service import encode_search_cursor
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+SEED_BATCH_SIZE = 5000
+
+# Пояснення для фонових лідів з оцінкою — щоб GET /leads/search мав що шукати
+SEED_REASONS = [
+    "Strong budget signal, asked about pricing and onboarding timeline.",
+    "Price objection; compares the offer with a competitor.",
+    "Low engagement, no reply after two follow-up messages.",
+    "Decision maker involved and ready for a product demo.",
+    "Interested in pricing, but the budget is approved only next quarter.",
+    "Competitor contract ends soon, asked for a demo of migration.",
+]
+SEARCH_TERMS = ["pricing", "competitor", "demo -competitor", '"follow-up"', "budget or price"]
+
+# Частка --requests для масових сценаріїв (POST /leads/bulk, .../stage/bulk)
+BULK_WEIGHT = 0.2
+
+
+# ── Fake AI ───────────────────────────────────────────────────────────────────
+
+def fake_analyze_lead(latency_ms: float, jitter_ms: float):
+    """analyze_lead без мережі: затримка + детермінована оцінка від входів."""
+
+    async def analyze_lead(
+        source: str, stage: str, messages_count: int, has_business_domain: bool
+    ) -> AIResult:
+        await asyncio.sleep(max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000)
+        key = f"{source}|{stage}|{messages_count}|{has_business_domain}"
+        score = round(hashlib.sha256(key.encode()).digest()[0] / 255, 2)
+        recommendation = (
+            "transfer_to_sales" if score >= 0.6
+            else "continue_nurturing" if score >= 0.3
+            else "mark_as_lost"
+        )
+        return AIResult(score=score, recommendation=recommendation, reason="benchmark")
+
+    return analyze_lead
+
+
+# ── Seed ──────────────────────────────────────────────────────────────────────
+
+@dataclass
+class Dataset:
+    lead_ids: list[uuid.UUID]
+    # Ліди на стадії new — для PATCH stage (кожен використовується один раз)
+    fresh_lead_ids: list[uuid.UUID]
+    # qualified + score + домен — готові до transfer
+    ready_lead_ids: list[uuid.UUID]
+    sold_lead_ids: list[uuid.UUID]
+    sale_ids: list[uuid.UUID]
+    # new-ліди і new-продажі для POST .../stage/bulk, по bulk_size на запит
+    stage_bulk_lead_ids: list[uuid.UUID]
+    stage_bulk_sale_ids: list[uuid.UUID]
+
+
+def _lead_row(now: datetime, **overrides) -> dict:
+    row = {
+        "id": uuid.uuid4(),
+        "source": random.choice(list(LeadSource)),
+        "stage": random.choice([ColdStage.contacted, ColdStage.qualified]),
+        "business_domain": random.choice([None, *BusinessDomain]),
+        "messages_count": random.randint(0, 30),
+        "ai_score": None,
+        "ai_recommendation": None,
+        "ai_reason": None,
+        "ai_analyzed_at": None,
+        "version": 1,
+        "created_at": now,
+        "updated_at": now,
+    }
+    row.update(overrides)
+    return row
+
+
+async def _insert(db, table, rows: list[dict]) -> None:
+    for start in range(0, len(rows), SEED_BATCH_SIZE):
+        await db.execute(insert(table), rows[start:start + SEED_BATCH_SIZE])
+
+
+def _analyzed(now: datetime, score: float, reason: str) -> dict:
+    return dict(
+        ai_score=score,
+        ai_recommendation=(
+            "transfer_to_sales" if score >= 0.6
+            else "continue_nurturing" if score >= 0.3
+            else "mark_as_lost"
+        ),
+        ai_reason=reason,
+        ai_analyzed_at=now,
+    )
+
+
+async def seed(leads: int, sales: int, per_scenario: int, stage_bulk: int, truncate: bool) -> Dataset:
+    now = datetime.now(timezone.utc)
+    analyzed = _analyzed(now, 0.8, "benchmark")
+    # Половина фонових лідів уже з оцінкою і поясненням
+    bulk = [
+        _lead_row(now, **_analyzed(now, round(random.random(), 2), random.choice(SEED_REASONS)))
+        if random.random() < 0.5 else _lead_row(now)
+        for _ in range(leads)
+    ]
+    fresh = [_lead_row(now, stage=ColdStage.new) for _ in range(per_scenario)]
+    stage_bulk_leads = [_lead_row(now, stage=ColdStage.new) for _ in range(stage_bulk)]
+    ready = [
+        _lead_row(now, stage=ColdStage.qualified, business_domain=BusinessDomain.first, **analyzed)
+        for _ in range(per_scenario)
+    ]
+    sold = [
+        _lead_row(now, stage=ColdStage.transferred, business_domain=BusinessDomain.first, **analyzed)
+        for _ in range(max(sales, per_scenario) + stage_bulk)
+    ]
+    sale_rows = [
+        {
+            "id": uuid.uuid4(),
+            "lead_id": lead["id"],
+            "stage": SaleStage.new,
+            "version": 1,
+            "created_at": now,
+            "updated_at": now,
+        }
+        for lead in sold
+    ]
+
+    async with AsyncSessionLocal() as db:
+        if truncate:
+            await db.execute(text("TRUNCATE leads, sales, analysis_jobs, ai_score_cache, outbox_events, stage_history, pipeline_stats, leads_archive, sales_archive CASCADE"))
+        await _insert(db, Lead.__table__, bulk + fresh + stage_bulk_leads + ready + sold)
+        await _insert(db, Sale.__table__, sale_rows)
+        await db.commit()
+        # Сід пише в обхід сервісу — лічильники воронки перераховуємо
+        await pipeline_stats.reconcile(db)
+
+    return Dataset(
+        lead_ids=[row["id"] for row in bulk],
+        fresh_lead_ids=[row["id"] for row in fresh],
+        ready_lead_ids=[row["id"] for row in ready],
+        sold_lead_ids=[row["id"] for row in sold],
+        sale_ids=[row["id"] for row in sale_rows[stage_bulk:]],
+        stage_bulk_lead_ids=[row["id"] for row in stage_bulk_leads],
+        stage_bulk_sale_ids=[row["id"] for row in sale_rows[:stage_bulk]],
+    )
+
+
+# ── Scenarios ─────────────────────────────────────────────────────────────────
+
+@dataclass
+class Scenario:
+    name: str
+    # i-й запит → (method, url, kwargs для httpx)
+    build: Callable[[int], tuple[str, str, dict]]
+    # Частка від --requests: важкі сценарії (export, batch) ганяємо менше
+    weight: float = 1.0
+
+
+def build_scenarios(data: Dataset, bulk_size: int, batch_size: int) -> list[Scenario]:
+    def any_lead(_):
+        return str(random.choice(data.lead_ids))
+
+    def stage_bulk(ids: list[uuid.UUID], i: int, stage: str) -> dict:
+        chunk = ids[i * bulk_size:(i + 1) * bulk_size]
+        return {"json": {"items": [{"id": str(x), "stage": stage} for x in chunk]}}
+
+    def search_cursor(_):
+        # Середина видачі: у поясненні слово трапляється раз, тож ранг ts_rank_cd
+        # здебільшого 0.1, а випадковий id відтинає частину рівних за рангом
+        return encode_search_cursor(0.1, uuid.uuid4())
+
+    def new_lead(_):
+        return {
+            "source": random.choice(list(LeadSource)).value,
+            "business_domain": random.choice([None, *(d.value for d in BusinessDomain)]),
+        }
+
+    return [
+        Scenario("POST /leads", lambda i: ("POST", "/leads/", {"json": new_lead(i)})),
+        Scenario(
+            "POST /leads/bulk",
+            lambda i: ("POST", "/leads/bulk", {"json": [new_lead(i) for _ in range(bulk_size)]}),
+            weight=BULK_WEIGHT,
+        ),
+        Scenario(
+            "POST /leads/stage/bulk",
+            lambda i: ("POST", "/leads/stage/bulk", stage_bulk(data.stage_bulk_lead_ids, i, "contacted")),
+            weight=BULK_WEIGHT,
+        ),
+        Scenario("GET /leads", lambda i: ("GET", "/leads/", {"params": {"limit": 50}})),
+        Scenario(
+            "GET /leads?stage",
+            lambda i: ("GET", "/leads/", {"params": {"stage": "qualified", "limit": 50}}),
+        ),
+        Scenario(
+            "GET /leads/search",
+            lambda i: ("GET", "/leads/search", {"params": {
+                "q": random.choice(SEARCH_TERMS), "stage": "qualified", "min_score": 0.3, "limit": 50,
+            }}),
+        ),
+        Scenario(
+            "GET /leads/search?cursor",
+            lambda i: ("GET", "/leads/search", {"params": {
+                "q": random.choice(SEARCH_TERMS), "stage": "qualified", "min_score": 0.3, "limit": 50,
+                "cursor": search_cursor(i),
+            }}),
+        ),
+        Scenario(
+            "GET /leads/export",
+            lambda i: ("GET", "/leads/export", {"params": {"source": "manual", "stage": "contacted"}}),
+            weight=0.05,
+        ),
+        Scenario("GET /leads/{id}", lambda i: ("GET", f"/leads/{any_lead(i)}", {})),
+        Scenario(
+            "PATCH /leads/{id}/stage",
+            lambda i: ("PATCH", f"/leads/{data.fresh_lead_ids[i]}/stage", {"json": {"stage": "contacted"}}),
+        ),
+        Scenario(
+            "PATCH /leads/{id}/messages",
+            lambda i: ("PATCH", f"/leads/{any_lead(i)}/messages",
+                       {"json": {"messages_count": random.randint(0, 30)}}),
+        ),
+        Scenario("POST /leads/{id}/analyze", lambda i: ("POST", f"/leads/{any_lead(i)}/analyze", {})),
+        Scenario(
+            "POST /leads/{id}/analyze?async",
+            lambda i: ("POST", f"/leads/{any_lead(i)}/analyze", {"params": {"async": "true"}}),
+        ),
+        Scenario(
+            "POST /leads/analyze/batch",
+            lambda i: ("POST", "/leads/analyze/batch",
+                       {"json": {"lead_ids": [str(x) for x in random.sample(data.lead_ids, batch_size)]}}),
+            weight=0.1,
+        ),
+        Scenario(
+            "POST /leads/{id}/transfer",
+            lambda i: ("POST", f"/leads/{data.ready_lead_ids[i]}/transfer", {}),
+        ),
+        Scenario(
+            "GET /leads/{id}/sale",
+            lambda i: ("GET", f"/leads/{random.choice(data.sold_lead_ids)}/sale", {}),
+        ),
+        Scenario(
+            "GET /sales/export",
+            lambda i: ("GET", "/sales/export", {"params": {"stage": "new"}}),
+            weight=0.05,
+        ),
+        Scenario("GET /sales/{id}", lambda i: ("GET", f"/sales/{random.choice(data.sale_ids)}", {})),
+        Scenario(
+            "PATCH /sales/{id}/stage",
+            lambda i: ("PATCH", f"/sales/{data.sale_ids[i]}/stage", {"json": {"stage": "kyc"}}),
+        ),
+        Scenario(
+            "POST /sales/stage/bulk",
+            lambda i: ("POST", "/sales/stage/bulk", stage_bulk(data.stage_bulk_sale_ids, i, "kyc")),
+            weight=BULK_WEIGHT,
+        ),
+        Scenario("GET /stats/pipeline", lambda i: ("GET", "/stats/pipeline", {})),
+    ]
+
+
+# ── Runner ────────────────────────────────────────────────────────────────────
+
+class QueryCounter:
+    """Рахує SQL-виклики на engine. Сценарії йдуть послідовно, тому дельта = їхні запити."""
+
+    def __init__(self):
+        self.count = 0
+        for target in {engine.sync_engine, read_engine.sync_engine}:
+            event.listen(target, "before_cursor_execute", self._on_execute)
+
+    def _on_execute(self, *args) -> None:
+        self.count += 1
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def run_scenario(
+    client: httpx.AsyncClient,
+    scenario: Scenario,
+    requests: int,
+    concurrency: int,
+    queries: QueryCounter,
+) -> dict:
+    counter = itertools.count()
+    latencies: list[float] = []
+    statuses: Counter = Counter()
+
+    async def worker():
+        while (i := next(counter)) < requests:
+            method, url, kwargs = scenario.build(i)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, url, **kwargs)
+                statuses[str(response.status_code)] += 1
+            except Exception as e:
+                statuses[type(e).__name__] += 1
+            latencies.append(time.perf_counter() - started)
+
+    queries_before = queries.count
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, requests))))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    def ms(value: float) -> float:
+        return round(value * 1000, 2)
+
+    return {
+        "name": scenario.name,
+        "requests": requests,
+        "concurrency": concurrency,
+        "duration_seconds": round(elapsed, 3),
+        "throughput_rps": round(requests / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": ms(statistics.fmean(latencies)) if latencies else 0.0,
+            "p50": ms(_percentile(latencies, 0.50)),
+            "p95": ms(_percentile(latencies, 0.95)),
+            "p99": ms(_percentile(latencies, 0.99)),
+            "max": ms(latencies[-1]) if latencies else 0.0,
+        },
+        "statuses": dict(statuses),
+        "db_queries_per_request": round((queries.count - queries_before) / requests, 2),
+    }
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(current: dict, baseline_path: Path) -> None:
+    """Друкує зміну rps і p95 відносно попереднього прогону."""
+    baseline = {s["name"]: s for s in json.loads(baseline_path.read_text())["scenarios"]}
+    print(f"\n{'scenario':34} {'rps':>18} {'p95 ms':>22} {'queries/req':>14}")
+    for s in current["scenarios"]:
+        old = baseline.get(s["name"])
+        if old is None:
+            continue
+        print(
+            f"{s['name']:34} "
+            f"{old['throughput_rps']:>8} → {s['throughput_rps']:<7} "
+            f"{old['latency_ms']['p95']:>10} → {s['latency_ms']['p95']:<9} "
+            f"{old['db_queries_per_request']:>5} → {s['db_queries_per_request']:<5}"
+        )
+
+
+async def reset_score_cache() -> None:
+    score_cache.memory_cache.clear()
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(AIScoreCache))
+        await db.commit()
+
+
+async def main(args) -> None:
+    random.seed(args.seed)
+    score_cache.analyze_lead = fake_analyze_lead(args.ai_latency_ms, args.ai_jitter_ms)
+
+    # Запити на сценарій — це і розмір пулів ідентифікаторів, які витрачаються
+    stage_bulk = max(1, int(args.requests * BULK_WEIGHT)) * args.bulk_size
+    data = await seed(args.leads, args.sales, args.requests, stage_bulk, args.truncate)
+    scenarios = build_scenarios(data, args.bulk_size, min(args.batch_size, len(data.lead_ids)))
+    if args.only:
+        scenarios = [s for s in scenarios if any(pattern in s.name for pattern in args.only)]
+
+    queries = QueryCounter()
+    results = []
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+            for scenario in scenarios:
+                if args.no_score_cache:
+                    await reset_score_cache()
+                requests = max(1, int(args.requests * scenario.weight))
+                result = await run_scenario(client, scenario, requests, args.concurrency, queries)
+                results.append(result)
+                print(
+                    f"{result['name']:34} {result['throughput_rps']:>8} rps  "
+                    f"p50 {result['latency_ms']['p50']:>8}  p95 {result['latency_ms']['p95']:>8}  "
+                    f"p99 {result['latency_ms']['p99']:>8} ms  "
+                    f"q/req {result['db_queries_per_request']:>5}  {result['statuses']}"
+                )
+
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "git_revision": _git_revision(),
+        "config": {
+            key: value for key, value in vars(args).items() if key not in ("output", "compare")
+        },
+        "scenarios": results,
+    }
+    output = Path(args.output) if args.output else (
+        RESULTS_DIR / f"load-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"\nresults: {output}")
+
+    if args.compare:
+        compare(report, Path(args.compare))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--leads", type=int, default=10_000, help="фонових лідів у БД")
+    parser.add_argument("--sales", type=int, default=1_000, help="продажів у БД")
+    parser.add_argument("--requests", type=int, default=500, help="запитів на сценарій")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--ai-latency-ms", type=float, default=300)
+    parser.add_argument("--ai-jitter-ms", type=float, default=50)
+    parser.add_argument("--bulk-size", type=int, default=100, help="елементів у POST /leads/bulk і .../stage/bulk")
+    parser.add_argument("--batch-size", type=int, default=100, help="лідів у POST /leads/analyze/batch")
+    parser.add_argument("--no-score-cache", action="store_true",
+                        help="очищати кеш оцінок (LRU і таблицю) перед кожним сценарієм")
+    parser.add_argument("--truncate", action="store_true", help="очистити таблиці перед сідом")
+    parser.add_argument("--only", nargs="+", help="тільки сценарії, що містять ці підрядки")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="файл результатів (за замовчуванням benchmarks/results/)")
+    parser.add_argument("--compare", help="попередній JSON для порівняння")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,90 @@
+"""
+Мікробенчмарк серіалізації сторінки лідів: стандартний шлях FastAPI
+проти швидкого (рядки → orjson).
+
+    python -m benchmarks.serialization [--sizes 1000 10000 100000] [--repeat 5]
+
+Стандартний шлях: ORM-об'єкти Lead → LeadPage (from_attributes) →
+model_dump(mode="json") → json.dumps, як це робить FastAPI з response_model.
+Швидкий: кортежі колонок → app.schemas.fast.encode_lead_page.
+БД не потрібна — вимірюється тільки CPU серіалізації; результат обох шляхів
+перевіряється на побайтну рівність.
+"""
+
+import argparse
+import json
+import random
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from app.models import Lead, LeadSource, BusinessDomain, ColdStage
+from app.schemas.fast import LEAD_FIELDS, encode_lead_page
+from app.schemas.lead import LeadPage
+
+
+def make_rows(count: int) -> list[tuple]:
+    now = datetime.now(timezone.utc)
+    rows = []
+    for i in range(count):
+        analyzed = random.random() < 0.7
+        rows.append((
+            uuid.uuid4(),
+            random.choice(list(LeadSource)),
+            random.choice(list(ColdStage)),
+            random.choice([None, *BusinessDomain]),
+            random.randint(0, 50),
+            round(random.random(), 2) if analyzed else None,
+            "continue_nurturing" if analyzed else None,
+            "The lead shows steady engagement but no business domain yet." if analyzed else None,
+            now - timedelta(minutes=i) if analyzed else None,
+            random.randint(1, 5),
+            now - timedelta(hours=i),
+            now - timedelta(minutes=i),
+        ))
+    return rows
+
+
+def standard_path(leads: list[Lead]) -> bytes:
+    page = LeadPage.model_validate({"items": leads, "next_cursor": None})
+    content = page.model_dump(mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode()
+
+
+def fast_path(rows: list[tuple]) -> bytes:
+    return encode_lead_page(rows, None)
+
+
+def measure(fn, arg, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn(arg)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def main(args) -> None:
+    results = []
+    for size in args.sizes:
+        rows = make_rows(size)
+        leads = [Lead(**dict(zip(LEAD_FIELDS, row))) for row in rows]
+        assert standard_path(leads) == fast_path(rows), "wire format differs"
+
+        standard = measure(standard_path, leads, args.repeat)
+        fast = measure(fast_path, rows, args.repeat)
+        results.append({
+            "rows": size,
+            "standard_ms": round(standard * 1000, 2),
+            "fast_ms": round(fast * 1000, 2),
+            "speedup": round(standard / fast, 1),
+        })
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=5)
+    main(parser.parse_args())
@@ -0,0 +1,232 @@
+"""
+Час холодного старту API-процесу: імпорт app.main і перші запити.
+
+    python -m benchmarks.startup [--runs 5] [--paths /leads/?limit=1 /stats/pipeline]
+    python -m benchmarks.startup --compare benchmarks/results/startup-<before>.json
+
+Кожен вимір — у свіжому процесі, як при старті нового пода:
+  - import: `import app.main` у чистому інтерпретаторі (медіана з --runs),
+    кількість завантажених модулів і які з важких опційних (anthropic, numpy)
+    потрапили в процес; профіль -X importtime згрупований за пакетами;
+  - server: uvicorn з app.main:app — скільки від запуску процесу до першої
+    відповіді /health і до 200 від /ready (пули БД прогріті), потім латентність
+    першого і наступних запитів до кожного з --paths.
+Без доступної БД /ready не стане 200 — в звіті буде null, решта вимірів працює.
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+import httpx
+
+ROOT = Path(__file__).parent.parent
+RESULTS_DIR = Path(__file__).parent / "results"
+
+# Опційні залежності, які API-процес не має вантажити на старті
+HEAVY_MODULES = ("anthropic", "numpy")
+
+_IMPORT_SNIPPET = f"""
+import json, sys, time
+started = time.perf_counter()
+import app.main
+seconds = time.perf_counter() - started
+print(json.dumps({{
+    "seconds": seconds,
+    "modules": len(sys.modules),
+    "heavy": [m for m in {HEAVY_MODULES!r} if m in sys.modules],
+}}))
+"""
+
+
+def _python(*args: str, **kwargs) -> subprocess.CompletedProcess:
+    return subprocess.run(
+        [sys.executable, *args], cwd=ROOT, capture_output=True, text=True, check=True, **kwargs
+    )
+
+
+def measure_import(runs: int) -> dict:
+    samples = [json.loads(_python("-c", _IMPORT_SNIPPET).stdout) for _ in range(runs)]
+    seconds = sorted(s["seconds"] for s in samples)
+    return {
+        "median_ms": round(statistics.median(seconds) * 1000, 1),
+        "min_ms": round(seconds[0] * 1000, 1),
+        "modules": samples[-1]["modules"],
+        "heavy_modules": samples[-1]["heavy"],
+    }
+
+
+def import_profile(top: int) -> list[dict]:
+    """Власний час імпорту (-X importtime), сумований по верхньорівневих пакетах."""
+    stderr = _python("-X", "importtime", "-c", "import app.main").stderr
+    by_package = Counter()
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, _, name = line.removeprefix("import time:").split("|")
+        by_package[name.strip().split(".")[0]] += int(self_us)
+    return [{"package": name, "ms": round(us / 1000, 1)} for name, us in by_package.most_common(top)]
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(client: httpx.Client, path: str, status: int, deadline: float) -> bool:
+    while time.perf_counter() < deadline:
+        try:
+            if client.get(path).status_code == status:
+                return True
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    return False
+
+
+def measure_server(paths: list[str], repeat: int, timeout: float) -> dict:
+    port = _free_port()
+    started = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=ROOT,
+        env=os.environ.copy(),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    result = {"serving_ms": None, "ready_ms": None, "requests": {}}
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=timeout) as client:
+            deadline = started + timeout
+            if not _wait_for(client, "/health", 200, deadline):
+                return result
+            result["serving_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            if _wait_for(client, "/ready", 200, deadline):
+                result["ready_ms"] = round((time.perf_counter() - started) * 1000, 1)
+
+            for path in paths:
+                timings, statuses = [], Counter()
+                for _ in range(repeat + 1):
+                    request_started = time.perf_counter()
+                    try:
+                        statuses[client.get(path).status_code] += 1
+                    except httpx.TransportError:
+                        # uvicorn закриває з'єднання після необробленого винятку
+                        statuses["error"] += 1
+                    timings.append(time.perf_counter() - request_started)
+                result["requests"][path] = {
+                    "first_ms": round(timings[0] * 1000, 2),
+                    "next_median_ms": round(statistics.median(timings[1:]) * 1000, 2),
+                    "statuses": dict(statuses),
+                }
+    finally:
+        process.terminate()
+        process.wait(timeout=10)
+    return result
+
+
+def _median_of(runs: list[dict], *path: str) -> float | None:
+    values = []
+    for run in runs:
+        for key in path:
+            run = run.get(key) if run else None
+        if run is not None:
+            values.append(run)
+    return round(statistics.median(values), 2) if values else None
+
+
+def _git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def compare(current: dict, baseline_path: Path) -> None:
+    baseline = json.loads(baseline_path.read_text())
+    rows = [
+        ("import median ms", baseline["import"]["median_ms"], current["import"]["median_ms"]),
+        ("modules loaded", baseline["import"]["modules"], current["import"]["modules"]),
+        ("serving ms", baseline["server"]["serving_ms"], current["server"]["serving_ms"]),
+        ("ready ms", baseline["server"]["ready_ms"], current["server"]["ready_ms"]),
+    ]
+    for path, stats in current["server"]["requests"].items():
+        old = baseline["server"]["requests"].get(path)
+        if old:
+            rows.append((f"first {path} ms", old["first_ms"], stats["first_ms"]))
+    print()
+    for name, old, new in rows:
+        print(f"{name:34} {old!s:>10} → {new!s:<10}")
+
+
+def main(args) -> None:
+    imports = measure_import(args.runs)
+    print(
+        f"import app.main: median {imports['median_ms']} ms, min {imports['min_ms']} ms, "
+        f"{imports['modules']} modules, heavy: {imports['heavy_modules'] or 'none'}"
+    )
+    profile = import_profile(args.top)
+    for entry in profile:
+        print(f"  {entry['package']:28} {entry['ms']:>8} ms")
+
+    runs = [measure_server(args.paths, args.repeat, args.timeout) for _ in range(args.runs)]
+    server = {
+        "serving_ms": _median_of(runs, "serving_ms"),
+        "ready_ms": _median_of(runs, "ready_ms"),
+        "requests": {
+            path: {
+                "first_ms": _median_of(runs, "requests", path, "first_ms"),
+                "next_median_ms": _median_of(runs, "requests", path, "next_median_ms"),
+                "statuses": runs[-1]["requests"].get(path, {}).get("statuses"),
+            }
+            for path in args.paths
+        },
+    }
+    print(f"server: /health after {server['serving_ms']} ms, /ready after {server['ready_ms']} ms")
+    for path, stats in server["requests"].items():
+        print(
+            f"  {path:34} first {stats['first_ms']} ms, then {stats['next_median_ms']} ms  "
+            f"{stats['statuses']}"
+        )
+
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "git_revision": _git_revision(),
+        "config": {
+            key: value for key, value in vars(args).items() if key not in ("output", "compare")
+        },
+        "import": {**imports, "profile": profile},
+        "server": server,
+    }
+    output = Path(args.output) if args.output else (
+        RESULTS_DIR / f"startup-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.json"
+    )
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2, ensure_ascii=False))
+    print(f"\nresults: {output}")
+
+    if args.compare:
+        compare(report, Path(args.compare))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5, help="свіжих процесів на кожен вимір")
+    parser.add_argument("--paths", nargs="+", default=["/leads/?limit=1", "/stats/pipeline"])
+    parser.add_argument("--repeat", type=int, default=20, help="запитів після першого на шлях")
+    parser.add_argument("--top", type=int, default=10, help="пакетів у профілі імпорту")
+    parser.add_argument("--timeout", type=float, default=30.0, help="секунд на старт сервера")
+    parser.add_argument("--output", help="файл результатів (за замовчуванням benchmarks/results/)")
+    parser.add_argument("--compare", help="попередній JSON для порівняння")
+    main(parser.parse_args())